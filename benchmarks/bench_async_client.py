@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark: classification wall time for the thread-blocking OllamaClient
+(one request at a time) versus AsyncOllamaClient multiplexing requests over
+its connection pool, against a fake Ollama server with OLLAMA_NUM_PARALLEL
+request slots.
+
+Usage: python benchmarks/bench_async_client.py [email_count] [num_parallel]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fake_ollama_server import FakeOllamaServer
+from benchmarks.stub_clients import make_email
+from config.settings import settings
+
+
+def measure(label, num_parallel, classify):
+    with FakeOllamaServer(num_parallel=num_parallel) as server, \
+         patch.object(settings, 'ollama_host', server.host), \
+         patch.object(settings, 'ollama_num_parallel', num_parallel, create=True), \
+         patch.object(settings, 'classification_cache_file', None, create=True):
+        start = time.perf_counter()
+        results = classify()
+        elapsed = time.perf_counter() - start
+
+    assert all(result['category'] == 'work' for result in results)
+    print(f"{label:<24} | {elapsed:>8.2f} | {len(results) / elapsed:>8.1f} | {server.state.peak_active:>13}")
+
+
+def run_benchmark(email_count: int = 32, num_parallel: int = 4):
+    from src.ollama_client import OllamaClient
+    from src.async_ollama_client import AsyncOllamaClient
+
+    emails = [make_email(i) for i in range(email_count)]
+
+    print(f"Classifying {email_count} emails against a fake Ollama server with {num_parallel} slots")
+    print(f"{'client':<24} | {'time (s)':>8} | {'emails/s':>8} | {'peak requests':>13}")
+    print("-" * 64)
+
+    def classify_sync():
+        client = OllamaClient()
+        return [client.classify_email(email) for email in emails]
+
+    def classify_async():
+        client = AsyncOllamaClient()
+        return asyncio.run(client.classify_emails(emails))
+
+    measure("sync, one thread", num_parallel, classify_sync)
+    measure("async, one event loop", num_parallel, classify_async)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    parallel = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    run_benchmark(count, parallel)
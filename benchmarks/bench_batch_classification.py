@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark: classification throughput (emails/s) versus batch size, using
+OllamaClient.classify_emails against a local fake Ollama server.
+
+Usage: python benchmarks/bench_batch_classification.py [email_count]
+"""
+
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fake_ollama_server import FakeOllamaServer
+from benchmarks.stub_clients import make_email
+from config.settings import settings
+
+BATCH_SIZES = [1, 2, 4, 8, 16]
+
+
+def run_benchmark(email_count: int = 32):
+    from src.ollama_client import OllamaClient
+
+    emails = [make_email(i) for i in range(email_count)]
+
+    print(f"Classifying {email_count} emails against a fake Ollama server")
+    print(f"{'batch size':>10} | {'requests':>8} | {'prompt tokens':>13} | {'time (s)':>8} | {'emails/s':>8}")
+    print("-" * 60)
+
+    for batch_size in BATCH_SIZES:
+        with FakeOllamaServer() as server, \
+             patch.object(settings, 'ollama_host', server.host), \
+             patch.object(settings, 'classification_cache_file', None, create=True):
+            client = OllamaClient()
+
+            start = time.perf_counter()
+            for offset in range(0, email_count, batch_size):
+                chunk = emails[offset:offset + batch_size]
+                if len(chunk) == 1:
+                    results = [client.classify_email(chunk[0])]
+                else:
+                    results = client.classify_emails(chunk)
+                assert all(result['category'] == 'work' for result in results)
+            elapsed = time.perf_counter() - start
+
+        print(f"{batch_size:>10} | {server.state.request_count:>8} | {server.state.prompt_tokens:>13} | "
+              f"{elapsed:>8.2f} | {email_count / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    run_benchmark(count)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GmailClient.get_unread_emails wall-clock time versus batch size,
+against a local fake Gmail server with simulated network latency, then full
+versus metadata-first fetching when only some emails need their body.
+
+Usage: python benchmarks/bench_gmail_fetch.py [message_count] [latency_ms] [body_fraction]
+"""
+
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fake_gmail_server import FakeGmailServer
+from config.settings import settings
+
+BATCH_SIZES = [1, 5, 10, 25, 50, 100]
+
+
+def run_benchmark(message_count: int = 100, latency: float = 0.02):
+    print(f"Fetching {message_count} unread emails, {latency * 1000:.0f} ms simulated RTT")
+    print(f"{'batch size':>10} | {'requests':>8} | {'wall time (s)':>13} | {'emails/s':>8}")
+    print("-" * 50)
+
+    for batch_size in BATCH_SIZES:
+        with FakeGmailServer(message_count=message_count, latency=latency) as server, \
+             patch.object(settings, 'gmail_fetch_batch_size', batch_size, create=True):
+            client = server.make_client()
+
+            start = time.perf_counter()
+            emails = client.get_unread_emails(max_results=message_count)
+            elapsed = time.perf_counter() - start
+
+            assert len(emails) == message_count
+            print(f"{batch_size:>10} | {server.state.request_count:>8} | "
+                  f"{elapsed:>13.3f} | {len(emails) / elapsed:>8.1f}")
+
+
+def run_format_benchmark(message_count: int = 100, latency: float = 0.02, body_fraction: float = 0.3):
+    needs_body = int(message_count * body_fraction)
+    print(f"\nFull versus metadata-first fetch, {needs_body} of {message_count} emails need a body")
+    print(f"{'mode':>14} | {'requests':>8} | {'KB received':>11} | {'wall time (s)':>13}")
+    print("-" * 56)
+
+    for label, metadata_first in (('full', False), ('metadata-first', True)):
+        with FakeGmailServer(message_count=message_count, latency=latency) as server, \
+             patch.object(settings, 'gmail_metadata_first', metadata_first, create=True):
+            client = server.make_client()
+
+            start = time.perf_counter()
+            emails = client.get_unread_emails(max_results=message_count)
+            client.load_bodies(emails[:needs_body])
+            elapsed = time.perf_counter() - start
+
+            assert all(email['body'] for email in emails[:needs_body])
+            print(f"{label:>14} | {server.state.request_count:>8} | "
+                  f"{server.state.bytes_sent / 1024:>11.1f} | {elapsed:>13.3f}")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    fraction = float(sys.argv[3]) if len(sys.argv) > 3 else 0.3
+    run_benchmark(count, latency_ms / 1000)
+    run_format_benchmark(count, latency_ms / 1000, fraction)
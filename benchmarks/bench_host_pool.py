@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: classification throughput with one Ollama host versus a pool of
+several, each a fake server with a single request slot. Worker threads share
+one OllamaClient, which routes each request to the least-busy healthy host
+that has the model loaded.
+
+Usage: python benchmarks/bench_host_pool.py [email_count] [host_count]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fake_ollama_server import FakeOllamaServer
+from benchmarks.stub_clients import make_email
+from config.settings import settings
+
+
+def measure(label, emails, host_count):
+    from src.ollama_client import OllamaClient
+
+    with ExitStack() as stack:
+        servers = [stack.enter_context(FakeOllamaServer(num_parallel=1)) for _ in range(host_count)]
+        stack.enter_context(patch.object(settings, 'ollama_host', servers[0].host))
+        stack.enter_context(patch.object(settings, 'ollama_hosts', [s.host for s in servers], create=True))
+        stack.enter_context(patch.object(settings, 'classification_cache_file', None, create=True))
+        client = OllamaClient()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=host_count * 2) as executor:
+            results = list(executor.map(client.classify_email, emails))
+        elapsed = time.perf_counter() - start
+
+    assert all(result['category'] == 'work' for result in results)
+    spread = '/'.join(str(server.state.request_count) for server in servers)
+    print(f"{label:<16} | {elapsed:>8.2f} | {len(emails) / elapsed:>8.1f} | {spread:>16}")
+    return client.get_host_stats()
+
+
+def run_benchmark(email_count: int = 24, host_count: int = 3):
+    emails = [make_email(i) for i in range(email_count)]
+
+    print(f"Classifying {email_count} emails with {host_count * 2} worker threads")
+    print(f"{'hosts':<16} | {'time (s)':>8} | {'emails/s':>8} | {'requests/host':>16}")
+    print("-" * 58)
+
+    measure("1 host", emails, 1)
+    stats = measure(f"{host_count} hosts (pool)", emails, host_count)
+
+    print("\nPer-host latency in the pool")
+    for host, host_stats in stats['hosts'].items():
+        print(f"  {host:<24} served {host_stats['served']:>3}, "
+              f"avg {host_stats['avg_latency'] * 1000:>6.0f} ms, max {host_stats['max_latency'] * 1000:>6.0f} ms")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    hosts = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    run_benchmark(count, hosts)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: body extraction over a corpus of synthetic Gmail payloads
+(plain, nested multipart with attachments, large HTML-only newsletters and
+very long plain-text threads), comparing the previous top-level-only
+extractor with the recursive walker, with and without a byte budget.
+
+Usage: python benchmarks/bench_mime_body.py [iterations]
+"""
+
+import base64
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.mime_body import DEFAULT_BODY_MAX_BYTES, extract_body
+
+
+def legacy_extract_body(payload) -> str:
+    body = ""
+
+    if 'parts' in payload:
+        for part in payload['parts']:
+            if part['mimeType'] == 'text/plain':
+                data = part['body']['data']
+                body = base64.urlsafe_b64decode(data).decode('utf-8')
+                break
+            elif part['mimeType'] == 'text/html':
+                data = part['body']['data']
+                body = base64.urlsafe_b64decode(data).decode('utf-8')
+    else:
+        if payload['mimeType'] == 'text/plain':
+            data = payload['body']['data']
+            body = base64.urlsafe_b64decode(data).decode('utf-8')
+
+    return body
+
+
+def leaf(mime_type, text, filename=''):
+    return {
+        'mimeType': mime_type,
+        'filename': filename,
+        'headers': [{'name': 'Content-Type', 'value': f'{mime_type}; charset="UTF-8"'}],
+        'body': {'data': base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')}
+    }
+
+
+def container(mime_type, *parts):
+    return {'mimeType': mime_type, 'filename': '', 'headers': [], 'body': {'size': 0}, 'parts': list(parts)}
+
+
+def build_corpus():
+    paragraph = "Thanks for the update on the quarterly plan, a few notes inline below. " * 10
+    newsletter = ('<table width="100%"><tr><td style="font-family: Arial; padding: 16px">'
+                  f'<p>{paragraph}</p><a href="https://example.com/track?id=123">Read more</a>'
+                  '</td></tr></table>') * 60
+    return {
+        'short plain': leaf('text/plain', paragraph),
+        'nested + attachment': container(
+            'multipart/mixed',
+            container('multipart/alternative', leaf('text/plain', paragraph * 3),
+                      leaf('text/html', f'<p>{paragraph * 3}</p>')),
+            leaf('application/pdf', 'x' * 400_000, filename='report.pdf')
+        ),
+        'HTML-only newsletter': container('multipart/alternative', leaf('text/html', newsletter)),
+        'long plain thread': leaf('text/plain', (paragraph + '\n> ') * 400)
+    }
+
+
+def run_benchmark(iterations: int = 200):
+    corpus = build_corpus()
+    extractors = [
+        ('legacy', legacy_extract_body),
+        ('walker, no budget', lambda payload: extract_body(payload, None)),
+        (f'walker, {DEFAULT_BODY_MAX_BYTES // 1024} KB budget', extract_body)
+    ]
+
+    print(f"Body extraction, mean of {iterations} runs per payload (microseconds)")
+    print(f"{'payload':<22} | " + " | ".join(f"{label:>22}" for label, _ in extractors))
+    print("-" * (25 + 25 * len(extractors)))
+    for name, payload in corpus.items():
+        timings = [
+            timeit.timeit(lambda: extract(payload), number=iterations) / iterations * 1e6
+            for _, extract in extractors
+        ]
+        print(f"{name:<22} | " + " | ".join(f"{timing:>22.1f}" for timing in timings))
+
+    print("\nExtracted body length (characters)")
+    for name, payload in corpus.items():
+        lengths = [len(extract(payload)) for _, extract in extractors]
+        print(f"{name:<22} | " + " | ".join(f"{length:>22}" for length in lengths))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    run_benchmark(count)
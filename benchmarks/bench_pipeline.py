@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark: EmailProcessor.process_emails cycle time versus worker count and
+Ollama concurrency, using stubbed clients that sleep to simulate Gmail round
+trips and model inference.
+
+Usage: python benchmarks/bench_pipeline.py [email_count]
+"""
+
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.stub_clients import SlowGmailClient, SlowOllamaClient
+from config.settings import settings
+
+CONFIGURATIONS = [(1, 1), (2, 1), (4, 1), (4, 2), (8, 2), (8, 4)]
+
+
+def run_benchmark(email_count: int = 20):
+    from src.email_processor import EmailProcessor
+
+    print(f"Processing {email_count} emails "
+          "(Gmail 50 ms/call, classify 200 ms, generate 400 ms)")
+    print(f"{'workers':>7} | {'ollama slots':>12} | {'cycle (s)':>9} | {'emails/s':>8} | {'peak inference':>14}")
+    print("-" * 63)
+
+    for workers, slots in CONFIGURATIONS:
+        gmail = SlowGmailClient(email_count=email_count)
+        ollama = SlowOllamaClient()
+
+        with patch('src.email_processor.GmailClient', return_value=gmail), \
+             patch('src.email_processor.OllamaClient', return_value=ollama), \
+             patch.object(settings, 'email_worker_count', workers, create=True), \
+             patch.object(settings, 'ollama_max_concurrency', slots, create=True), \
+             patch.object(settings, 'max_emails_per_check', email_count):
+            processor = EmailProcessor()
+
+            start = time.perf_counter()
+            summary = processor.process_emails()
+            elapsed = time.perf_counter() - start
+
+        assert summary['drafts_created'] == email_count
+        print(f"{workers:>7} | {slots:>12} | {elapsed:>9.2f} | "
+              f"{email_count / elapsed:>8.1f} | {ollama.max_in_flight:>14}")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    run_benchmark(count)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: reply time-to-first-token for long email threads, sending the whole
+body (quoted history, signature and all) versus the cleaned, token-budgeted
+body from the prompt builder. The fake Ollama server charges per evaluated
+prompt token, with the stable system prompt already cached.
+
+Usage: python benchmarks/bench_prompt_budget.py [email_count] [quoted_replies]
+"""
+
+import os
+import statistics
+import sys
+
+import ollama
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.bench_prompt_prefix import time_to_first_token
+from benchmarks.fake_ollama_server import FakeOllamaServer
+from benchmarks.stub_clients import make_email
+from src.ollama_client import REPLY_SYSTEM_PROMPT
+from src.prompt_builder import REPLY_BODY_TOKENS, build_reply_prompt, estimate_tokens
+
+CLASSIFICATION = {"category": "work", "priority": "medium", "action_needed": "reply"}
+
+
+def make_thread(index: int, quoted_replies: int) -> str:
+    latest = f"Hi Michael, could we move item {index} to Thursday afternoon instead?\n\nThanks,\nAnna\n"
+    signature = "--\nAnna Smith | Head of Operations | Example Ltd\n+44 20 7946 0000\nSent from my iPhone\n"
+    history = ''.join(
+        f"\nOn Mon, {n + 1} Mar 2025 at 09:00, Colleague <colleague{n}@example.com> wrote:\n"
+        + "> Following up on the previous note about scheduling and the agenda.\n" * 6
+        for n in range(quoted_replies)
+    )
+    return latest + signature + history
+
+
+def full_thread_prompt(email: dict) -> str:
+    # The reply prompt as built before the prompt builder: the raw body, untrimmed.
+    return (
+        "Original Email:\n"
+        f"Subject: {email['subject']}\n"
+        f"From: {email['sender']}\n"
+        f"Body: {email['body']}\n\n"
+        "Email Classification:\n"
+        "Category: work\nPriority: medium\nAction: reply\n\n"
+        "Generate a response:"
+    )
+
+
+def measure(label, emails, build_prompt):
+    prompts = [build_prompt(email) for email in emails]
+    with FakeOllamaServer() as server:
+        client = ollama.Client(host=server.host)
+        samples = [
+            time_to_first_token(client.chat(
+                model='llama3:8b',
+                messages=[{'role': 'system', 'content': REPLY_SYSTEM_PROMPT},
+                          {'role': 'user', 'content': prompt}],
+                stream=True,
+                keep_alive='30m'
+            ))
+            for prompt in prompts
+        ]
+    tokens = statistics.mean(estimate_tokens(prompt) for prompt in prompts)
+    print(f"{label:<20} | {tokens:>13.0f} | "
+          f"{statistics.mean(samples) * 1000:>9.0f} | {statistics.median(samples) * 1000:>10.0f}")
+
+
+def run_benchmark(email_count: int = 10, quoted_replies: int = 8):
+    emails = [make_email(i) for i in range(email_count)]
+    for index, email in enumerate(emails):
+        email['body'] = make_thread(index, quoted_replies)
+
+    print(f"Reply time to first token over {email_count} threads with {quoted_replies} quoted replies each")
+    print(f"{'body':<20} | {'prompt tokens':>13} | {'mean (ms)':>9} | {'median (ms)':>10}")
+    print("-" * 62)
+
+    measure("full thread", emails, full_thread_prompt)
+    measure("cleaned + budgeted", emails,
+            lambda email: build_reply_prompt(email, CLASSIFICATION, REPLY_BODY_TOKENS))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    replies = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    run_benchmark(count, replies)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time-to-first-token for classification and reply prompts, comparing
+the old layout (instructions interpolated around the email, sent to
+/api/generate) with the stable system prompt + per-email user message sent to
+/api/chat. The fake Ollama server models llama.cpp's single-slot prefix cache,
+so only the stable layout gets to reuse the evaluated instruction block.
+
+Usage: python benchmarks/bench_prompt_prefix.py [email_count]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+import ollama
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fake_ollama_server import FakeOllamaServer
+from benchmarks.stub_clients import make_email
+from src.ollama_client import (
+    CLASSIFICATION_SYSTEM_PROMPT, REPLY_SYSTEM_PROMPT,
+    build_classification_prompt, build_reply_prompt
+)
+
+LEGACY_CLASSIFICATION_PROMPT = """
+        Analyze this email and classify it:
+
+        Subject: {subject}
+        From: {sender}
+        Body: {body}...
+
+        Classify this email and respond with ONLY a JSON object:
+        {{
+            "category": "spam|personal|work|urgent|promotional|newsletter",
+            "priority": "high|medium|low",
+            "requires_response": true|false,
+            "sentiment": "positive|neutral|negative",
+            "action_needed": "reply|acknowledge|schedule|ignore"
+        }}
+        """
+
+LEGACY_REPLY_PROMPT = """
+        You are Michael Sigamani's personal AI assistant. Generate a professional email response.
+
+        Original Email:
+        Subject: {subject}
+        From: {sender}
+        Body: {body}
+
+        Email Classification:
+        Category: work
+        Priority: medium
+        Action: reply
+
+        Guidelines:
+        - Be professional and concise
+        - Match the tone of the original email
+        - If it's a meeting request, suggest alternative times
+        - If it's a question, provide helpful information
+        - If it's promotional/spam, politely decline
+        - Keep responses under 150 words
+        - Sign as "Michael" or "Best regards, Michael"
+
+        Generate a response:
+        """
+
+CLASSIFICATION = {"category": "work", "priority": "medium", "action_needed": "reply"}
+
+
+def time_to_first_token(stream) -> float:
+    start = time.perf_counter()
+    for chunk in stream:
+        text = chunk['message']['content'] if 'message' in chunk and chunk['message'] else chunk.get('response')
+        if text:
+            elapsed = time.perf_counter() - start
+            stream.close()
+            return elapsed
+    return time.perf_counter() - start
+
+
+def legacy_requests(client, emails, template):
+    for email in emails:
+        prompt = template.format(subject=email['subject'], sender=email['sender'], body=email['body'][:500])
+        yield lambda prompt=prompt: client.generate(model='llama3:8b', prompt=prompt, stream=True)
+
+
+def stable_requests(client, emails, system, build):
+    for email in emails:
+        messages = [{'role': 'system', 'content': system}, {'role': 'user', 'content': build(email)}]
+        yield lambda messages=messages: client.chat(model='llama3:8b', messages=messages,
+                                                    stream=True, keep_alive='30m')
+
+
+def measure(label, make_requests):
+    with FakeOllamaServer() as server:
+        client = ollama.Client(host=server.host)
+        samples = [time_to_first_token(request()) for request in make_requests(client)]
+    evaluated = server.state.evaluated_tokens / server.state.request_count
+    print(f"{label:<28} | {statistics.mean(samples) * 1000:>9.0f} | "
+          f"{statistics.median(samples) * 1000:>10.0f} | {evaluated:>16.0f}")
+
+
+def run_benchmark(email_count: int = 10):
+    emails = [make_email(i) for i in range(email_count)]
+    for email in emails:
+        email['body'] = f"Hi Michael, following up on item {email['id']}. " * 8
+
+    print(f"Time to first token over {email_count} emails (fake Ollama, prefix-cached slot)")
+    print(f"{'layout':<28} | {'mean (ms)':>9} | {'median (ms)':>10} | {'evaluated tok/req':>16}")
+    print("-" * 74)
+
+    measure("classify: interpolated", lambda c: legacy_requests(c, emails, LEGACY_CLASSIFICATION_PROMPT))
+    measure("classify: system prefix", lambda c: stable_requests(
+        c, emails, CLASSIFICATION_SYSTEM_PROMPT, build_classification_prompt))
+    measure("reply: interpolated", lambda c: legacy_requests(c, emails, LEGACY_REPLY_PROMPT))
+    measure("reply: system prefix", lambda c: stable_requests(
+        c, emails, REPLY_SYSTEM_PROMPT, lambda e: build_reply_prompt(e, CLASSIFICATION)))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    run_benchmark(count)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start cost of the daemon, measured in fresh interpreters so
+import time is included. Reports the time to import the processor module, to
+construct EmailProcessor() (ready to run a cycle), and the deferred costs paid
+on first use: loading credentials and building the Gmail service, then
+importing ollama and probing the (fake) server.
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+
+import json
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fake_ollama_server import FakeOllamaServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CHILD = """
+import json, sys, time
+from unittest.mock import patch
+
+start = time.perf_counter()
+from config.settings import settings
+from src.email_processor import EmailProcessor
+imported = time.perf_counter()
+
+with patch.object(settings, 'gmail_token_file', sys.argv[1], create=True), \\
+     patch.object(settings, 'ollama_host', sys.argv[2], create=True):
+    processor = EmailProcessor()
+    ready = time.perf_counter()
+    processor.gmail_client.service
+    gmail = time.perf_counter()
+    processor.ollama_client.is_available()
+    ollama = time.perf_counter()
+
+print(json.dumps({
+    'import': imported - start,
+    'EmailProcessor()': ready - imported,
+    'first Gmail use': gmail - ready,
+    'first Ollama use': ollama - gmail
+}))
+"""
+
+
+def write_token(directory: str) -> str:
+    from google.oauth2.credentials import Credentials
+
+    path = os.path.join(directory, 'token.pickle')
+    with open(path, 'wb') as token:
+        pickle.dump(Credentials(token='benchmark-token'), token)
+    return path
+
+
+def measure_once(token_file: str, ollama_host: str) -> dict:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, token_file, ollama_host],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_benchmark(runs: int = 5):
+    with tempfile.TemporaryDirectory() as directory, FakeOllamaServer() as server:
+        token_file = write_token(directory)
+        samples = [measure_once(token_file, server.host) for _ in range(runs)]
+
+    print(f"Daemon startup over {runs} fresh interpreters")
+    print(f"{'phase':<20} | {'median (ms)':>11} | {'min (ms)':>8}")
+    print("-" * 46)
+    for phase in samples[0]:
+        values = [sample[phase] * 1000 for sample in samples]
+        print(f"{phase:<20} | {statistics.median(values):>11.1f} | {min(values):>8.1f}")
+
+    ready = [(sample['import'] + sample['EmailProcessor()']) * 1000 for sample in samples]
+    print(f"{'ready (total)':<20} | {statistics.median(ready):>11.1f} | {min(ready):>8.1f}")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    run_benchmark(count)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latency of the first classification after start-up, with the model
+cold versus preloaded by OllamaClient.warm_up(), against a fake Ollama server
+that charges a one-off load time per model. The warm-up overlaps a simulated
+Gmail authentication and fetch, as it does in EmailProcessor.
+
+Usage: python benchmarks/bench_warm_up.py [load_seconds] [gmail_seconds]
+"""
+
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.fake_ollama_server import FakeOllamaServer
+from benchmarks.stub_clients import make_email
+from config.settings import settings
+
+
+def measure(label, load_seconds, gmail_seconds, warm_up):
+    from src.ollama_client import OllamaClient
+
+    with FakeOllamaServer(loaded_models=[], load_time=load_seconds) as server, \
+         patch.object(settings, 'ollama_host', server.host), \
+         patch.object(settings, 'classification_cache_file', None, create=True):
+        client = OllamaClient()
+
+        start = time.perf_counter()
+        warmer = threading.Thread(target=client.warm_up) if warm_up else None
+        if warmer:
+            warmer.start()
+        time.sleep(gmail_seconds)
+        if warmer:
+            warmer.join()
+
+        email_start = time.perf_counter()
+        client.classify_email(make_email(0))
+        first_email = time.perf_counter() - email_start
+        total = time.perf_counter() - start
+
+    stats = client.get_model_stats()['models'][client.model]['classification']
+    print(f"{label:<12} | {first_email:>15.2f} | {total:>16.2f} | {stats['cold_requests']:>14}")
+
+
+def run_benchmark(load_seconds: float = 3.0, gmail_seconds: float = 1.0):
+    print(f"First classification after start-up (model load {load_seconds:.1f}s, "
+          f"Gmail fetch {gmail_seconds:.1f}s)")
+    print(f"{'start-up':<12} | {'first email (s)':>15} | {'start to done (s)':>16} | {'cold requests':>14}")
+    print("-" * 68)
+
+    measure("cold", load_seconds, gmail_seconds, warm_up=False)
+    measure("warmed up", load_seconds, gmail_seconds, warm_up=True)
+
+
+if __name__ == "__main__":
+    load = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    gmail = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    run_benchmark(load, gmail)
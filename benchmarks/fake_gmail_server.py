@@ -0,0 +1,214 @@
+"""
+Local stand-in for the Gmail REST API used by the benchmarks.
+
+Serves just enough of users.messages (list/get, full and metadata formats)
+and the HTTP batch endpoint for GmailClient to run unmodified, with a
+configurable per-request latency to simulate the network round trip to Google.
+"""
+
+import base64
+import json
+import re
+import socket
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+
+def _encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+
+def make_message(message_id: str) -> dict:
+    body = f"Hello, this is synthetic message {message_id}. " * 20
+    html = ('<html><body><table width="100%" style="font-family: Arial, sans-serif">'
+            f'<tr><td style="padding: 12px">{body}</td></tr></table></body></html>') * 4
+    return {
+        'id': message_id,
+        'threadId': f'thread_{message_id}',
+        'snippet': body[:100],
+        'labelIds': ['UNREAD', 'INBOX'],
+        'payload': {
+            'mimeType': 'multipart/alternative',
+            'headers': [
+                {'name': 'Subject', 'value': f'Benchmark message {message_id}'},
+                {'name': 'From', 'value': 'sender@example.com'},
+                {'name': 'Date', 'value': 'Fri, 27 Jun 2025 09:10:25 +0100'},
+                {'name': 'Received', 'value': 'from mail.example.com by mx.google.com; ' * 3},
+                {'name': 'DKIM-Signature', 'value': 'v=1; a=rsa-sha256; ' + 'b' * 340}
+            ],
+            'body': {'size': 0},
+            'parts': [
+                {'mimeType': 'text/plain', 'body': {'data': _encode(body)}},
+                {'mimeType': 'text/html', 'body': {'data': _encode(html)}}
+            ]
+        }
+    }
+
+
+def metadata_view(message: dict, header_names: list) -> dict:
+    """What users.messages.get returns for format=metadata."""
+    wanted = {name.lower() for name in header_names}
+    headers = [h for h in message['payload']['headers'] if not wanted or h['name'].lower() in wanted]
+    return {
+        'id': message['id'],
+        'threadId': message['threadId'],
+        'snippet': message['snippet'],
+        'labelIds': message['labelIds'],
+        'payload': {'mimeType': message['payload']['mimeType'], 'headers': headers}
+    }
+
+
+class FakeGmailState:
+    def __init__(self, message_count: int = 100, latency: float = 0.02, per_item_cost: float = 0.001):
+        self.latency = latency
+        self.per_item_cost = per_item_cost
+        self.messages = {f'msg_{i}': make_message(f'msg_{i}') for i in range(message_count)}
+        self.unread = set(self.messages)
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    def handle(self, method: str, path: str, query: dict, body: bytes):
+        """Returns (status, payload) for a single (non-batch) API call."""
+        time.sleep(self.per_item_cost)
+
+        if method == 'GET' and path == '/gmail/v1/users/me/messages':
+            max_results = int(query.get('maxResults', ['100'])[0])
+            ids = sorted(self.unread, key=lambda m: int(m.split('_')[1]))[:max_results]
+            return 200, {'messages': [{'id': m, 'threadId': f'thread_{m}'} for m in ids]}
+
+        match = re.fullmatch(r'/gmail/v1/users/me/messages/([^/]+)', path)
+        if method == 'GET' and match:
+            message = self.messages.get(match.group(1))
+            if message is None:
+                return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+            if query.get('format', ['full'])[0] == 'metadata':
+                return 200, metadata_view(message, query.get('metadataHeaders', []))
+            return 200, message
+
+        return 404, {'error': {'code': 404, 'message': f'Unsupported {method} {path}'}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def _reply(self, status: int, content: bytes, content_type: str):
+        with self.server.state.lock:
+            self.server.state.bytes_sent += len(content)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _dispatch(self, method: str):
+        state = self.server.state
+        with state.lock:
+            state.request_count += 1
+        time.sleep(state.latency)
+
+        body = self._read_body()
+        url = urlparse(self.path)
+
+        if method == 'POST' and (url.path == '/batch' or url.path.startswith('/batch/')):
+            content, boundary = _handle_batch(state, self.headers['Content-Type'], body)
+            self._reply(200, content, f'multipart/mixed; boundary={boundary}')
+            return
+
+        status, payload = state.handle(method, url.path, parse_qs(url.query), body)
+        self._reply(status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+
+def _handle_batch(state: FakeGmailState, content_type: str, body: bytes):
+    envelope = BytesParser(policy=HTTP).parsebytes(
+        f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + body
+    )
+    boundary = 'batch_fake_gmail_boundary'
+    parts = []
+
+    for part in envelope.iter_parts():
+        content_id = part['Content-ID']
+        raw = part.get_payload(decode=False)
+        request_line, _, rest = raw.partition('\n')
+        method, target, _ = request_line.strip().split(' ', 2)
+        sub_body = rest.split('\n\n', 1)[1].encode('utf-8') if '\n\n' in rest else b''
+        url = urlparse(target)
+
+        status, payload = state.handle(method, url.path, parse_qs(url.query), sub_body)
+        response = json.dumps(payload)
+        parts.append(
+            f'--{boundary}\r\n'
+            'Content-Type: application/http\r\n'
+            f'Content-ID: <response-{content_id[1:]}\r\n\r\n'
+            f'HTTP/1.1 {status} {"OK" if status < 300 else "Error"}\r\n'
+            'Content-Type: application/json; charset=UTF-8\r\n'
+            f'Content-Length: {len(response)}\r\n\r\n'
+            f'{response}\r\n'
+        )
+
+    parts.append(f'--{boundary}--\r\n')
+    return ''.join(parts).encode('utf-8'), boundary
+
+
+class FakeGmailServer:
+    def __init__(self, **state_kwargs):
+        self.state = FakeGmailState(**state_kwargs)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.httpd.state = self.state
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def root_url(self) -> str:
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}/'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def build_service(self):
+        document = json.loads(get_static_doc('gmail', 'v1'))
+        document['rootUrl'] = self.root_url
+        return build_from_document(document, http=httplib2.Http())
+
+    def make_client(self):
+        from src.gmail_client import GmailClient
+        from src.gmail_quota import GmailRequestExecutor
+
+        client = GmailClient.__new__(GmailClient)
+        client.service = self.build_service()
+        client.history_id = None
+        client._pending_ids = {}
+        client.http_pool = None
+        # No limiter: the benchmarks measure transport cost, not quota pacing.
+        client.executor = GmailRequestExecutor(units_per_second=1e9)
+        return client
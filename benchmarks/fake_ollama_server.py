@@ -0,0 +1,270 @@
+"""
+Local stand-in for the Ollama HTTP API used by the benchmarks.
+
+Implements /api/generate, /api/chat, /api/embed, /api/tags and /api/ps with a
+simple cost model: a one-off load time per model, a fixed per-request overhead,
+prompt evaluation time per prompt token and generation time per output token. Like llama.cpp, the server keeps the
+last evaluated prompt in a single KV-cache slot and only pays for tokens past
+the longest common prefix. Responses are synthesised from the prompt so
+OllamaClient's parsing runs unmodified, streamed as NDJSON when asked.
+"""
+
+import json
+import re
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CLASSIFICATION = {
+    "category": "work",
+    "priority": "medium",
+    "requires_response": True,
+    "sentiment": "neutral",
+    "action_needed": "reply"
+}
+REPLY = ("Thanks for your email. I'd be glad to help - could you share a few times "
+         "that work for you next week? Best regards, Michael")
+
+
+def tokenize(text: str) -> list:
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def render_chat(messages: list) -> str:
+    return ''.join(f"<|{m.get('role', 'user')}|>\n{m.get('content', '')}\n" for m in messages) + '<|assistant|>\n'
+
+
+def synthesise_output(prompt: str) -> str:
+    if 'JSON array' in prompt:
+        count = len(re.findall(r'^\s*Email \d+:', prompt, re.MULTILINE))
+        return json.dumps([dict(CLASSIFICATION, index=i + 1) for i in range(count)])
+    if 'JSON object' in prompt:
+        return json.dumps(CLASSIFICATION)
+    return REPLY
+
+
+class FakeOllamaState:
+    # Defaults approximate a mid-size model on a CPU box.
+    def __init__(self, request_overhead: float = 0.05, prompt_token_cost: float = 0.004,
+                 output_token_cost: float = 0.02, models=('llama3:8b',), num_parallel: int = None,
+                 loaded_models=None, load_time: float = 0.0):
+        self.request_overhead = request_overhead
+        self.prompt_token_cost = prompt_token_cost
+        self.output_token_cost = output_token_cost
+        self.models = list(models)
+        # Models resident in memory, as reported by /api/ps; others pay load_time first.
+        self.loaded_models = set(self.models if loaded_models is None else loaded_models)
+        self.load_time = load_time
+        self.loads = 0
+        self.request_count = 0
+        self.prompt_tokens = 0
+        self.evaluated_tokens = 0
+        self.output_tokens = 0
+        self.cached_prompt = []
+        self.lock = threading.Lock()
+        # Like OLLAMA_NUM_PARALLEL: requests beyond the slot count queue on the server.
+        self.slots = threading.BoundedSemaphore(num_parallel) if num_parallel else None
+        self.active = 0
+        self.peak_active = 0
+
+    @contextmanager
+    def slot(self):
+        if self.slots is not None:
+            self.slots.acquire()
+        with self.lock:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active -= 1
+            if self.slots is not None:
+                self.slots.release()
+
+    def load(self, model: str) -> bool:
+        """Marks the model as loaded and returns whether it had to be loaded."""
+        with self.lock:
+            if model in self.loaded_models:
+                return False
+            self.loaded_models.add(model)
+            self.loads += 1
+            return True
+
+    def evaluate(self, prompt: str) -> int:
+        """Records a request and returns how many prompt tokens must be evaluated."""
+        tokens = tokenize(prompt)
+        with self.lock:
+            common = 0
+            for cached, token in zip(self.cached_prompt, tokens):
+                if cached != token:
+                    break
+                common += 1
+            self.cached_prompt = tokens
+            self.request_count += 1
+            self.prompt_tokens += len(tokens)
+            self.evaluated_tokens += len(tokens) - common
+        return len(tokens) - common
+
+    def record_output(self, output_tokens: int):
+        with self.lock:
+            self.output_tokens += output_tokens
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def _reply_json(self, payload: dict, status: int = 200):
+        content = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        state = self.server.state
+        if self.path == '/api/tags':
+            self._reply_json({'models': [{'name': m, 'model': m} for m in state.models]})
+        elif self.path == '/api/ps':
+            with state.lock:
+                loaded = sorted(state.loaded_models)
+            self._reply_json({'models': [{'name': m, 'model': m} for m in loaded]})
+        else:
+            self._reply_json({'error': 'not found'}, 404)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        request = self._read_json()
+        if self.path == '/api/generate':
+            prompt = request.get('prompt', '')
+            if request.get('system'):
+                prompt = render_chat([{'role': 'system', 'content': request['system']},
+                                      {'role': 'user', 'content': prompt}])
+            self._complete(request, prompt, lambda text: {'response': text})
+        elif self.path == '/api/chat':
+            prompt = render_chat(request.get('messages', []))
+            self._complete(request, prompt,
+                           lambda text: {'message': {'role': 'assistant', 'content': text}})
+        elif self.path == '/api/embed':
+            with self.server.state.slot():
+                self._embed(request)
+        else:
+            self._reply_json({'error': 'not found'}, 404)
+
+    def _embed(self, request: dict):
+        state = self.server.state
+        if state.load(request.get('model')):
+            time.sleep(state.load_time)
+        texts = request.get('input', [])
+        texts = [texts] if isinstance(texts, str) else texts
+        time.sleep(state.request_overhead)
+        # Bag-of-words vectors: texts sharing words come out similar.
+        embeddings = []
+        for text in texts:
+            vector = [0.0] * 64
+            for token in tokenize(text):
+                vector[hash(token) % 64] += 1.0
+            embeddings.append(vector)
+        self._reply_json({'model': request.get('model'), 'embeddings': embeddings})
+
+    def _complete(self, request: dict, prompt: str, wrap):
+        with self.server.state.slot():
+            self._generate(request, prompt, wrap)
+
+    def _generate(self, request: dict, prompt: str, wrap):
+        state = self.server.state
+        if state.load(request.get('model')):
+            time.sleep(state.load_time)
+        output = synthesise_output(prompt)
+        output_pieces = tokenize(output)
+
+        evaluated = state.evaluate(prompt)
+        time.sleep(state.request_overhead + evaluated * state.prompt_token_cost)
+
+        final = {'model': request.get('model'), 'done': True,
+                 'prompt_eval_count': evaluated, 'eval_count': len(output_pieces)}
+
+        if not request.get('stream', True):
+            time.sleep(len(output_pieces) * state.output_token_cost)
+            state.record_output(len(output_pieces))
+            self._reply_json(dict(final, **wrap(output)))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        produced = 0
+        try:
+            for piece in output_pieces:
+                time.sleep(state.output_token_cost)
+                produced += 1
+                self._write_chunk(dict({'model': request.get('model'), 'done': False}, **wrap(piece)))
+            self._write_chunk(dict(final, **wrap('')))
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client hung up early; stop generating like Ollama does.
+            self.close_connection = True
+        finally:
+            state.record_output(produced)
+
+    def _write_chunk(self, payload: dict):
+        line = json.dumps(payload).encode('utf-8') + b'\n'
+        self.wfile.write(f'{len(line):x}\r\n'.encode('ascii') + line + b'\r\n')
+        self.wfile.flush()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is not a server error.
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeOllamaServer:
+    def __init__(self, **state_kwargs):
+        self.state = FakeOllamaState(**state_kwargs)
+        self.httpd = _Server(('127.0.0.1', 0), _Handler)
+        self.httpd.state = self.state
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05},
+                                       daemon=True)
+
+    @property
+    def host(self) -> str:
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,95 @@
+"""
+Stub Gmail and Ollama clients with artificial latency for processor benchmarks.
+"""
+
+import threading
+import time
+from typing import Dict, List
+
+
+def make_email(index: int) -> Dict:
+    return {
+        'id': f'msg_{index}',
+        'thread_id': f'thread_{index}',
+        'subject': f'Benchmark message {index}',
+        'sender': 'sender@example.com',
+        'date': 'Fri, 27 Jun 2025 09:10:25 +0100',
+        'body': 'Can we schedule a meeting next week?',
+        'snippet': 'Can we schedule a meeting next week?'
+    }
+
+
+class SlowGmailClient:
+    def __init__(self, email_count: int = 20, latency: float = 0.05):
+        self.latency = latency
+        self.emails = [make_email(i) for i in range(email_count)]
+        self.service = object()
+        self.http_pool = None
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def get_unread_emails(self, max_results: int = 10) -> List[Dict]:
+        self._call()
+        return self.emails[:max_results]
+
+    def create_draft_reply(self, original_email: Dict, reply_content: str) -> bool:
+        self._call()
+        return True
+
+    def send_reply(self, original_email: Dict, reply_content: str) -> bool:
+        self._call()
+        return True
+
+    def mark_as_read(self, message_id: str) -> bool:
+        self._call()
+        return True
+
+    def mark_many_as_read(self, message_ids: List[str]) -> Dict[str, bool]:
+        self._call()
+        return dict.fromkeys(message_ids, True)
+
+
+class SlowOllamaClient:
+    def __init__(self, classify_latency: float = 0.2, generate_latency: float = 0.4):
+        self.classify_latency = classify_latency
+        self.generate_latency = generate_latency
+        self.model = 'stub'
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _infer(self, latency: float):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(latency)
+        with self._lock:
+            self.in_flight -= 1
+
+    def is_available(self) -> bool:
+        return True
+
+    def warm_up(self) -> Dict[str, float]:
+        return {}
+
+    def classify_email(self, email_data: Dict) -> Dict:
+        self._infer(self.classify_latency)
+        return {
+            "category": "work",
+            "priority": "medium",
+            "requires_response": True,
+            "sentiment": "neutral",
+            "action_needed": "reply"
+        }
+
+    def generate_email_response(self, email_data: Dict, classification: Dict) -> str:
+        self._infer(self.generate_latency)
+        return "Thanks for reaching out. Best regards, Michael"
+
+    def should_auto_respond(self, classification: Dict) -> bool:
+        return False
@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class AcknowledgementBuffer:
+    def __init__(self, flush_fn: Callable[[List[str]], Dict[str, bool]],
+                 on_result: Optional[Callable[[str, object, bool], None]] = None,
+                 max_size: int = 500, max_age_seconds: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.flush_fn = flush_fn
+        self.on_result = on_result
+        self.max_size = max_size
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self.flushes = 0
+        self.acknowledged = 0
+        self.failed = 0
+        self._pending: Dict[str, object] = {}
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def add(self, message_id: str, payload: object = None):
+        with self._lock:
+            if not self._pending:
+                self._oldest = self.clock()
+            self._pending[message_id] = payload
+            due = (
+                len(self._pending) >= self.max_size or
+                self.clock() - self._oldest >= self.max_age_seconds
+            )
+        
+        if due:
+            self.flush()
+    
+    def flush(self) -> Dict[str, bool]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._oldest = None
+        
+        if not pending:
+            return {}
+        
+        results = self.flush_fn(list(pending))
+        
+        with self._lock:
+            self.flushes += 1
+            for message_id in pending:
+                if results.get(message_id, False):
+                    self.acknowledged += 1
+                else:
+                    self.failed += 1
+        
+        if self.on_result:
+            for message_id, payload in pending.items():
+                self.on_result(message_id, payload, results.get(message_id, False))
+        
+        return results
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'flushes': self.flushes,
+                'acknowledged': self.acknowledged,
+                'failed': self.failed
+            }
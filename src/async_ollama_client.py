@@ -0,0 +1,281 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Union
+from src.json_parsing import JsonStreamScanner
+from src.ollama_client import (
+    OllamaClient, UNAVAILABLE_RESPONSE, REPLY_MAX_TOKENS, FALLBACK_CLASSIFICATION,
+    REPLY_BODY_TOKENS, REPLY_SYSTEM_PROMPT, estimate_tokens, build_reply_prompt
+)
+from config.settings import settings
+
+# Ollama serves four requests per model at once unless OLLAMA_NUM_PARALLEL says otherwise.
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_REQUEST_TIMEOUT = 120.0
+
+
+class AsyncOllamaClient(OllamaClient):
+    def __init__(self):
+        super().__init__()
+        # The host pool is synchronous, so the async client always talks to ollama_host.
+        self.pool = None
+        self.max_in_flight = max(1, getattr(settings, 'ollama_num_parallel', DEFAULT_MAX_IN_FLIGHT))
+        self.request_timeout = getattr(settings, 'ollama_request_timeout', DEFAULT_REQUEST_TIMEOUT)
+        self.request_stats = Counter()
+        self._in_flight = 0
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+    
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            import ollama
+            # One keep-alive connection per request slot, reused across requests.
+            self._client = ollama.AsyncClient(
+                host=self.host,
+                limits=httpx.Limits(max_connections=self.max_in_flight,
+                                    max_keepalive_connections=self.max_in_flight)
+            )
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    async def is_available(self) -> bool:
+        return await self.health.check_async(self.client.list)
+    
+    def get_request_stats(self) -> Dict:
+        stats = dict(self.request_stats)
+        stats['in_flight'] = self._in_flight
+        stats['max_in_flight'] = self.max_in_flight
+        return stats
+    
+    async def generate_response(self, prompt: str, context: Optional[str] = None,
+                                stop_after_json: Union[bool, type] = False, max_tokens: Optional[int] = None,
+                                format: Optional[Union[str, Dict]] = None,
+                                system: Optional[str] = None, model: Optional[str] = None,
+                                timeout: Optional[float] = None) -> str:
+        import ollama
+        
+        if not self.health.allow_request():
+            print("Skipping generation: Ollama circuit breaker is open")
+            return UNAVAILABLE_RESPONSE
+        
+        full_prompt = f"Context: {context}\n\n{prompt}" if context else prompt
+        options = {'num_predict': max_tokens} if max_tokens else None
+        format = format if self.structured_output else None
+        timeout = self.request_timeout if timeout is None else timeout
+        
+        try:
+            # Cancelling the caller cancels the request and releases its slot.
+            async with self._slots:
+                self._in_flight += 1
+                self.request_stats['peak_in_flight'] = max(
+                    self.request_stats['peak_in_flight'], self._in_flight
+                )
+                try:
+                    try:
+                        text = await asyncio.wait_for(
+                            self._generate(full_prompt, options, stop_after_json, format, system, model),
+                            timeout
+                        )
+                    except ollama.ResponseError as e:
+                        if format is None:
+                            raise
+                        # Servers that predate structured outputs reject the format field.
+                        print(f"Structured output unsupported, retrying without it: {e}")
+                        self.structured_output = False
+                        text = await asyncio.wait_for(
+                            self._generate(full_prompt, options, stop_after_json, None, system, model),
+                            timeout
+                        )
+                finally:
+                    self._in_flight -= 1
+            
+            self.request_stats['completed'] += 1
+            self.health.record_success()
+            return text
+        
+        except asyncio.CancelledError:
+            self.request_stats['cancelled'] += 1
+            raise
+        
+        except asyncio.TimeoutError:
+            self.request_stats['timed_out'] += 1
+            self.health.record_failure()
+            print(f"Error generating response: no answer within {timeout}s")
+            return UNAVAILABLE_RESPONSE
+        
+        except ollama.ResponseError as e:
+            # The server answered, so this says nothing about its availability.
+            self.health.record_success()
+            print(f"Error generating response: {e}")
+            return UNAVAILABLE_RESPONSE
+        
+        except Exception as e:
+            self.health.record_failure()
+            print(f"Error generating response: {e}")
+            return UNAVAILABLE_RESPONSE
+    
+    async def _generate(self, prompt: str, options: Optional[Dict], stop_after_json: Union[bool, type],
+                        format: Optional[Union[str, Dict]], system: Optional[str],
+                        model: Optional[str] = None) -> str:
+        stream = getattr(settings, 'ollama_stream_responses', True)
+        model = model or self.model
+        
+        if system is None:
+            response = await self.client.generate(
+                model=model,
+                prompt=prompt,
+                stream=stream,
+                options=options,
+                format=format,
+                keep_alive=self.keep_alive
+            )
+            content = lambda chunk: chunk['response']
+        else:
+            response = await self.client.chat(
+                model=model,
+                messages=[
+                    {'role': 'system', 'content': system},
+                    {'role': 'user', 'content': prompt}
+                ],
+                stream=stream,
+                options=options,
+                format=format,
+                keep_alive=self.keep_alive
+            )
+            content = lambda chunk: chunk['message']['content']
+        
+        if not stream:
+            return content(response)
+        
+        return await self._consume_stream(response, content, stop_after_json)
+    
+    async def _consume_stream(self, stream, content, stop_after_json: Union[bool, type]) -> str:
+        # True accepts any JSON value; a type only accepts values of that type.
+        expected_type = (dict, list) if stop_after_json is True else stop_after_json
+        scanner = JsonStreamScanner(expected_type) if stop_after_json else None
+        parts = []
+        
+        try:
+            async for chunk in stream:
+                text = content(chunk)
+                parts.append(text)
+                if scanner is not None and scanner.feed(text):
+                    self.early_stops += 1
+                    return scanner.value_text()
+        finally:
+            # Also runs on timeout or cancellation, dropping the connection so
+            # Ollama stops generating for a caller that has gone away.
+            close = getattr(stream, 'aclose', None)
+            if close:
+                await close()
+        
+        return ''.join(parts)
+    
+    async def warm_up(self, models: Optional[List[str]] = None) -> Dict[str, Optional[float]]:
+        timings = {}
+        for model in dict.fromkeys(models or [self.classification_model, self.model]):
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(
+                    self.client.generate(model=model, prompt='', keep_alive=self.keep_alive),
+                    self.request_timeout
+                )
+            except Exception as e:
+                print(f"Error warming up {model}: {e}")
+                timings[model] = None
+                continue
+            
+            timings[model] = time.perf_counter() - start
+            with self._stats_lock:
+                self._mark_warm(model, time.perf_counter())
+        
+        with self._stats_lock:
+            self.warm_up_stats.update(timings)
+        return timings
+    
+    async def embed(self, texts: List[str], model: str) -> Optional[List[List[float]]]:
+        import ollama
+        
+        if not self.health.allow_request():
+            return None
+        
+        try:
+            async with self._slots:
+                response = await asyncio.wait_for(
+                    self.client.embed(model=model, input=texts, keep_alive=self.keep_alive),
+                    self.request_timeout
+                )
+        except ollama.ResponseError as e:
+            self.health.record_success()
+            print(f"Error embedding {len(texts)} texts: {e}")
+            return None
+        except asyncio.TimeoutError:
+            self.health.record_failure()
+            print(f"Error embedding {len(texts)} texts: no answer within {self.request_timeout}s")
+            return None
+        except Exception as e:
+            self.health.record_failure()
+            print(f"Error embedding {len(texts)} texts: {e}")
+            return None
+        
+        self.health.record_success()
+        return response['embeddings']
+    
+    async def classify_email(self, email_data: Dict) -> Dict:
+        cached = self._cached_classification(email_data)
+        if cached is not None:
+            return cached
+        
+        try:
+            if self.cascade:
+                try:
+                    candidate = await self._request_classification(email_data, self.classification_model)
+                except ValueError:
+                    candidate = None
+                classification = self._accept_candidate(candidate)
+                if classification is None:
+                    classification = await self._request_classification(email_data, self.model)
+            else:
+                classification = await self._request_classification(email_data, self.classification_model)
+        except Exception as e:
+            print(f"Error classifying email: {e}")
+            return dict(FALLBACK_CLASSIFICATION)
+        
+        if self.classification_cache is not None:
+            self.classification_cache.put(email_data, classification)
+        
+        return classification
+    
+    async def _request_classification(self, email_data: Dict, model: str) -> Dict:
+        prompt, request = self._classification_request(email_data, model)
+        start = time.perf_counter()
+        response = await self.generate_response(prompt, **request)
+        latency = time.perf_counter() - start
+        self._record_prompt('classification', email_data, estimate_tokens(prompt), latency)
+        self._record_model('classification', model, latency)
+        return self._parse_classification(response)
+    
+    async def classify_emails(self, emails: List[Dict]) -> List[Dict]:
+        # Concurrent single-email requests fill the server's parallel slots, which
+        # replaces the prompt batching the synchronous client relies on.
+        return list(await asyncio.gather(*(self.classify_email(email) for email in emails)))
+    
+    async def generate_email_response(self, email_data: Dict, classification: Dict) -> str:
+        prompt = build_reply_prompt(
+            email_data, classification, getattr(settings, 'reply_body_tokens', REPLY_BODY_TOKENS)
+        )
+        start = time.perf_counter()
+        response = await self.generate_response(
+            prompt,
+            max_tokens=getattr(settings, 'reply_max_tokens', REPLY_MAX_TOKENS),
+            system=REPLY_SYSTEM_PROMPT,
+            model=self.model
+        )
+        latency = time.perf_counter() - start
+        self._record_prompt('reply', email_data, estimate_tokens(prompt), latency)
+        self._record_model('reply', self.model, latency)
+        return response
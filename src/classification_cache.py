@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+BODY_PREFIX_CHARS = 500
+
+
+class ClassificationCache:
+    def __init__(self, path: str, model: str, max_entries: int = 10000):
+        self.path = path
+        self.model = model
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS classifications ('
+            'key TEXT PRIMARY KEY, model TEXT NOT NULL, '
+            'result TEXT NOT NULL, last_used REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_classifications_last_used '
+            'ON classifications (last_used)'
+        )
+        # Results from a previous model are never valid for the current one.
+        self._conn.execute('DELETE FROM classifications WHERE model != ?', (model,))
+        self._conn.commit()
+    
+    def make_key(self, email_data: Dict) -> str:
+        digest = hashlib.sha256()
+        for field in (self.model, email_data.get('subject', ''), email_data.get('sender', ''),
+                      email_data.get('body', '')[:BODY_PREFIX_CHARS]):
+            digest.update(field.encode('utf-8', 'surrogatepass'))
+            digest.update(b'\x1f')
+        return digest.hexdigest()
+    
+    def get(self, email_data: Dict) -> Optional[Dict]:
+        key = self.make_key(email_data)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT result FROM classifications WHERE key = ?', (key,)
+            ).fetchone()
+            
+            if row is None:
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            self._conn.execute(
+                'UPDATE classifications SET last_used = ? WHERE key = ?', (time.time(), key)
+            )
+            self._conn.commit()
+        
+        return json.loads(row[0])
+    
+    def put(self, email_data: Dict, classification: Dict):
+        key = self.make_key(email_data)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO classifications (key, model, result, last_used) '
+                'VALUES (?, ?, ?, ?)',
+                (key, self.model, json.dumps(classification), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+    
+    def _evict(self):
+        count = self._conn.execute('SELECT COUNT(*) FROM classifications').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM classifications WHERE key IN ('
+                'SELECT key FROM classifications ORDER BY last_used LIMIT ?)',
+                (excess,)
+            )
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM classifications').fetchone()[0]
+    
+    def stats(self) -> Dict:
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'max_entries': self.max_entries
+        }
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
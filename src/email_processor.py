@@ -1,8 +1,14 @@
 import logging
-from typing import List, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import List, Dict, Optional
 from datetime import datetime
 from src.gmail_client import GmailClient
 from src.ollama_client import OllamaClient
+from src.pre_classifier import PreClassifier, DEFAULT_PROMOTIONAL_DOMAINS
+from src.acknowledgement_buffer import AcknowledgementBuffer
+from src.job_store import JobStore, CLASSIFIED, GENERATED, DRAFTED, SENT, ACKNOWLEDGED
 from config.settings import settings
 
 logging.basicConfig(level=settings.log_level, filename=settings.log_file)
@@ -12,9 +18,78 @@ class EmailProcessor:
     def __init__(self):
         self.gmail_client = GmailClient()
         self.ollama_client = OllamaClient()
+        self.pre_classifier = PreClassifier(
+            list(DEFAULT_PROMOTIONAL_DOMAINS) + list(getattr(settings, 'promotional_domains', [])),
+            getattr(settings, 'automated_senders', [])
+        ) if getattr(settings, 'pre_classifier_enabled', True) else None
         
+        embedding_index_file = getattr(settings, 'embedding_index_file', None)
+        self.embedding_classifier = (
+            self._create_embedding_classifier(embedding_index_file) if embedding_index_file else None
+        )
+        
+        job_store_file = getattr(settings, 'job_store_file', None)
+        self.job_store = JobStore(job_store_file) if job_store_file else None
+        
+        # httplib2 transports are not thread-safe, so without a transport pool Gmail
+        # calls are serialised; a separate semaphore caps requests to the Ollama server.
+        self._gmail_lock = threading.Lock()
+        self._ollama_slots = threading.BoundedSemaphore(
+            max(1, getattr(settings, 'ollama_max_concurrency', 1))
+        )
+        
+        self.ack_buffer = AcknowledgementBuffer(
+            self._mark_many_as_read,
+            on_result=self._on_acknowledged,
+            max_size=getattr(settings, 'gmail_ack_batch_size', 500),
+            max_age_seconds=getattr(settings, 'gmail_ack_flush_seconds', 30)
+        ) if getattr(settings, 'gmail_batch_acknowledge', True) else None
+        
+        # Models load in the background while Gmail authenticates and fetches,
+        # so the first real email is not the one that pays for the load.
+        self._warm_up_thread = None
+        if getattr(settings, 'ollama_warm_up', True):
+            self._warm_up_thread = threading.Thread(target=self._warm_up, name='ollama-warm-up', daemon=True)
+            self._warm_up_thread.start()
+    
+    def _create_embedding_classifier(self, path: str):
+        # NumPy is only imported when the embedding index is enabled.
+        from src.embedding_classifier import EmbeddingClassifier, DEFAULT_EMBEDDING_MODEL
+        from src.embedding_index import (
+            EmbeddingIndex, DEFAULT_MAX_ENTRIES, DEFAULT_NEIGHBOURS, DEFAULT_MIN_SIMILARITY
+        )
+        
+        model = getattr(settings, 'ollama_embedding_model', DEFAULT_EMBEDDING_MODEL)
+        index = EmbeddingIndex(
+            path,
+            model,
+            max_entries=getattr(settings, 'embedding_index_max_entries', DEFAULT_MAX_ENTRIES),
+            neighbours=getattr(settings, 'embedding_neighbours', DEFAULT_NEIGHBOURS),
+            min_similarity=getattr(settings, 'embedding_min_similarity', DEFAULT_MIN_SIMILARITY)
+        )
+        return EmbeddingClassifier(self.ollama_client, index, model)
+    
+    def _warm_up(self):
         if not self.ollama_client.is_available():
-            logger.warning("Ollama is not available. Email processing will be limited.")
+            logger.warning("Ollama is not available; skipping model warm-up")
+            return
+        
+        try:
+            timings = self.ollama_client.warm_up()
+        except Exception as e:
+            logger.error(f"Error warming up Ollama models: {e}")
+            return
+        
+        logger.info(f"Ollama models warmed up: {timings}")
+    
+    def _wait_for_warm_up(self):
+        if self._warm_up_thread is None:
+            return
+        
+        self._warm_up_thread.join(getattr(settings, 'ollama_warm_up_timeout', 120))
+        if self._warm_up_thread.is_alive():
+            logger.warning("Ollama warm-up is still running; processing anyway")
+        self._warm_up_thread = None
     
     def process_emails(self) -> Dict:
         logger.info("Starting email processing cycle")
@@ -27,24 +102,64 @@ class EmailProcessor:
             logger.info("No unread emails found")
             return {"processed": 0, "responded": 0, "drafts_created": 0}
         
+        self._wait_for_warm_up()
+        
+        if not self.ollama_client.is_available():
+            logger.warning("Ollama is not available. Email processing will be limited.")
+        
         processed_count = 0
         responded_count = 0
         drafts_created = 0
         
-        for email in unread_emails:
-            try:
-                result = self._process_single_email(email)
-                processed_count += 1
-                
-                if result['action'] == 'responded':
-                    responded_count += 1
-                elif result['action'] == 'draft_created':
-                    drafts_created += 1
-                
-                logger.info(f"Processed email: {email['subject'][:50]}... - Action: {result['action']}")
-                
-            except Exception as e:
-                logger.error(f"Error processing email {email['id']}: {e}")
+        if self.job_store:
+            self.job_store.record_fetched(email['id'] for email in unread_emails)
+        
+        classifications = self._classify_upfront(unread_emails)
+        
+        worker_count = max(1, getattr(settings, 'email_worker_count', 1))
+        if worker_count > 1 and len(unread_emails) > 1:
+            with ThreadPoolExecutor(max_workers=worker_count,
+                                    thread_name_prefix='email-worker') as executor:
+                results = list(executor.map(
+                    self._process_email_safely,
+                    unread_emails,
+                    [classifications.get(email['id']) for email in unread_emails]
+                ))
+        else:
+            results = [
+                self._process_email_safely(email, classifications.get(email['id']))
+                for email in unread_emails
+            ]
+        
+        replies = [result['reply'] for result in results if result and result['action'] == 'reply_pending']
+        if replies:
+            delivered = self._deliver_replies(replies)
+            results = [
+                delivered[result['reply']['email']['id']]
+                if result and result['action'] == 'reply_pending' else result
+                for result in results
+            ]
+        
+        if self.ack_buffer is not None:
+            self.ack_buffer.flush()
+        
+        if self.embedding_classifier is not None:
+            self.embedding_classifier.flush()
+        
+        if self.job_store:
+            self.job_store.flush()
+            self.job_store.prune(getattr(settings, 'job_store_retention_days', 30) * 86400)
+        
+        for result in results:
+            if result is None:
+                continue
+            
+            processed_count += 1
+            
+            if result['action'] == 'responded':
+                responded_count += 1
+            elif result['action'] == 'draft_created':
+                drafts_created += 1
         
         summary = {
             "processed": processed_count,
@@ -56,56 +171,265 @@ class EmailProcessor:
         logger.info(f"Email processing complete: {summary}")
         return summary
     
-    def _process_single_email(self, email: Dict) -> Dict:
-        if not self.ollama_client.is_available():
-            self.gmail_client.mark_as_read(email['id'])
-            return {"action": "marked_read", "reason": "ollama_unavailable"}
+    def _classify_upfront(self, emails: List[Dict]) -> Dict[str, Dict]:
+        classifications = {}
+        needs_llm = []
+        for email in emails:
+            job = self.job_store.get(email['id']) if self.job_store else None
+            if job and job['classification'] is not None:
+                classifications[email['id']] = job['classification']
+                continue
+            
+            classification = self.pre_classifier.classify(email) if self.pre_classifier else None
+            if classification is None:
+                needs_llm.append(email)
+            else:
+                logger.info(f"Email pre-classified by rules: {classification}")
+                classifications[email['id']] = classification
+        
+        if not needs_llm or not self.ollama_client.is_available():
+            return classifications
         
-        classification = self.ollama_client.classify_email(email)
+        if self.embedding_classifier is not None:
+            needs_llm = self._classify_by_embedding(needs_llm, classifications)
+            if not needs_llm:
+                return classifications
         
-        logger.info(f"Email classified: {classification}")
+        # Only mail headed for the LLM needs its body; fetch those in one batch.
+        self._load_bodies(needs_llm)
+        needs_llm = [email for email in needs_llm if 'body' in email]
+        
+        batch_size = getattr(settings, 'classification_batch_size', 1)
+        if batch_size < 2 or len(needs_llm) < 2:
+            return classifications
+        
+        for start in range(0, len(needs_llm), batch_size):
+            chunk = needs_llm[start:start + batch_size]
+            try:
+                with self._ollama_slots:
+                    results = self.ollama_client.classify_emails(chunk)
+            except Exception as e:
+                logger.error(f"Error batch-classifying {len(chunk)} emails: {e}")
+                continue
+            
+            for email, classification in zip(chunk, results):
+                logger.info(f"Email classified: {classification}")
+                classifications[email['id']] = classification
+        
+        return classifications
+    
+    def _classify_by_embedding(self, emails: List[Dict], classifications: Dict[str, Dict]) -> List[Dict]:
+        try:
+            with self._ollama_slots:
+                matches = self.embedding_classifier.lookup_many(emails)
+        except Exception as e:
+            logger.error(f"Error looking up {len(emails)} emails in the embedding index: {e}")
+            return emails
+        
+        remaining = []
+        for email, classification in zip(emails, matches):
+            if classification is None:
+                remaining.append(email)
+            else:
+                logger.info(f"Email classified by nearest neighbours: {classification}")
+                classifications[email['id']] = classification
+        return remaining
+    
+    def _gmail_guard(self):
+        # The pool only exists once the client has authenticated, so decide per call.
+        return self._gmail_lock if self.gmail_client.http_pool is None else nullcontext()
+    
+    def _load_bodies(self, emails: List[Dict]):
+        try:
+            with self._gmail_guard():
+                self.gmail_client.load_bodies(emails)
+        except Exception as e:
+            # Bodies that failed here are downloaded individually when first read.
+            logger.error(f"Error downloading {len(emails)} email bodies: {str(e)}")
+    
+    def _require_body(self, email: Dict):
+        if 'body' in email:
+            return
+        with self._gmail_guard():
+            # Raises if the download fails, so the email stays unread for the next
+            # cycle instead of being classified or answered from an empty body.
+            email['body']
+    
+    def _process_email_safely(self, email: Dict, classification: Optional[Dict] = None) -> Optional[Dict]:
+        try:
+            result = self._process_single_email(email, classification)
+        except Exception as e:
+            logger.error(f"Error processing email {email['id']}: {e}")
+            return None
+        
+        logger.info(f"Processed email: {email['subject'][:50]}... - Action: {result['action']}")
+        return result
+    
+    def _process_single_email(self, email: Dict, classification: Optional[Dict] = None) -> Dict:
+        job = (self.job_store.get(email['id']) if self.job_store else None) or {}
+        stage = job.get('stage')
+        
+        if stage == ACKNOWLEDGED:
+            self._mark_as_read(email)
+            return job['result']
+        
+        if classification is None:
+            classification = job.get('classification')
+        
+        if classification is None:
+            if not self.ollama_client.is_available():
+                self._mark_as_read(email)
+                return {"action": "marked_read", "reason": "ollama_unavailable"}
+            
+            self._require_body(email)
+            with self._ollama_slots:
+                classification = self.ollama_client.classify_email(email)
+            
+            logger.info(f"Email classified: {classification}")
+        
+        if job.get('classification') is None:
+            self._record(email, CLASSIFIED, classification=classification)
+            if self.embedding_classifier is not None:
+                self.embedding_classifier.learn(email, classification)
         
         if classification['action_needed'] == 'ignore':
-            self.gmail_client.mark_as_read(email['id'])
-            return {"action": "ignored", "classification": classification}
+            return self._acknowledge(email, {"action": "ignored", "classification": classification})
         
         if not classification['requires_response']:
-            self.gmail_client.mark_as_read(email['id'])
-            return {"action": "marked_read", "classification": classification}
+            return self._acknowledge(email, {"action": "marked_read", "classification": classification})
+        
+        response_content = job.get('response')
+        if response_content is None:
+            self._require_body(email)
+            with self._ollama_slots:
+                response_content = self.ollama_client.generate_email_response(email, classification)
+            self._record(email, GENERATED, response=response_content)
+        else:
+            logger.info(f"Resuming email {email['id']} from stage '{stage}' without regenerating")
         
-        response_content = self.ollama_client.generate_email_response(email, classification)
+        sent_result = {
+            "action": "responded", 
+            "classification": classification,
+            "auto_sent": True
+        }
+        draft_result = {
+            "action": "draft_created",
+            "classification": classification,
+            "response_preview": response_content[:100] + "..."
+        }
+        
+        if stage == SENT:
+            return self._acknowledge(email, sent_result)
+        if stage == DRAFTED:
+            return self._acknowledge(email, draft_result)
         
         should_auto_send = (
             settings.auto_send_responses and 
             self.ollama_client.should_auto_respond(classification)
         )
         
+        if getattr(settings, 'gmail_batch_replies', False):
+            # Delivered together with the rest of the cycle's replies.
+            return {"action": "reply_pending", "reply": {
+                "email": email,
+                "content": response_content,
+                "send": bool(should_auto_send),
+                "sent_result": sent_result,
+                "draft_result": draft_result
+            }}
+        
         if should_auto_send:
-            success = self.gmail_client.send_reply(email, response_content)
+            with self._gmail_guard():
+                success = self.gmail_client.send_reply(email, response_content)
             if success:
-                self.gmail_client.mark_as_read(email['id'])
-                return {
-                    "action": "responded", 
-                    "classification": classification,
-                    "auto_sent": True
-                }
+                self._record(email, SENT, durable=True)
+                return self._acknowledge(email, sent_result)
         
-        success = self.gmail_client.create_draft_reply(email, response_content)
+        with self._gmail_guard():
+            success = self.gmail_client.create_draft_reply(email, response_content)
         if success:
-            self.gmail_client.mark_as_read(email['id'])
-            return {
-                "action": "draft_created",
-                "classification": classification,
-                "response_preview": response_content[:100] + "..."
-            }
+            self._record(email, DRAFTED, durable=True)
+            return self._acknowledge(email, draft_result)
         
         return {"action": "failed", "classification": classification}
     
+    def _deliver_replies(self, replies: List[Dict]) -> Dict[str, Dict]:
+        try:
+            with self._gmail_guard():
+                outcomes = self.gmail_client.submit_replies(
+                    [(reply['email'], reply['content'], reply['send']) for reply in replies]
+                )
+        except Exception as e:
+            logger.error(f"Error submitting {len(replies)} replies: {str(e)}")
+            outcomes = {}
+        
+        delivered = {}
+        fallback_drafts = []
+        for reply in replies:
+            email = reply['email']
+            if outcomes.get(email['id']):
+                stage, result = (SENT, reply['sent_result']) if reply['send'] else (DRAFTED, reply['draft_result'])
+                self._record(email, stage, durable=True)
+                delivered[email['id']] = self._acknowledge(email, result)
+            elif reply['send']:
+                fallback_drafts.append(dict(reply, send=False))
+            else:
+                delivered[email['id']] = {
+                    "action": "failed",
+                    "classification": reply['draft_result']['classification']
+                }
+        
+        if fallback_drafts:
+            delivered.update(self._deliver_replies(fallback_drafts))
+        
+        return delivered
+    
+    def _record(self, email: Dict, stage: str, **fields):
+        if self.job_store:
+            self.job_store.record(email['id'], stage, **fields)
+    
+    def _acknowledge(self, email: Dict, result: Dict) -> Dict:
+        self._mark_as_read(email, result)
+        return result
+    
+    def _mark_as_read(self, email: Dict, result: Optional[Dict] = None) -> bool:
+        if self.ack_buffer is not None:
+            self.ack_buffer.add(email['id'], result)
+            return True
+        
+        with self._gmail_guard():
+            success = self.gmail_client.mark_as_read(email['id'])
+        self._on_acknowledged(email['id'], result, success)
+        return success
+    
+    def _mark_many_as_read(self, message_ids: List[str]) -> Dict[str, bool]:
+        try:
+            with self._gmail_guard():
+                return self.gmail_client.mark_many_as_read(message_ids)
+        except Exception as e:
+            logger.error(f"Error marking {len(message_ids)} emails as read: {str(e)}")
+            return dict.fromkeys(message_ids, False)
+    
+    def _on_acknowledged(self, message_id: str, result: Optional[Dict], success: bool):
+        if not success:
+            logger.warning(f"Could not mark email {message_id} as read; it will be retried next cycle")
+        elif result is not None and self.job_store:
+            self.job_store.record(message_id, ACKNOWLEDGED, result=result)
+    
     def get_processing_stats(self) -> Dict:
         return {
-            "gmail_authenticated": self.gmail_client.service is not None,
+            "gmail_authenticated": self.gmail_client.authenticated,
+            "gmail_quota": self.gmail_client.get_quota_stats(),
             "ollama_available": self.ollama_client.is_available(),
+            "ollama_health": self.ollama_client.get_health_stats(),
+            "ollama_hosts": self.ollama_client.get_host_stats(),
+            "classification_parsing": self.ollama_client.get_parse_stats(),
+            "prompts": self.ollama_client.get_prompt_stats(),
+            "models": self.ollama_client.get_model_stats(),
+            "pre_classifier": self.pre_classifier.stats() if self.pre_classifier else None,
+            "embedding_index": self.embedding_classifier.stats() if self.embedding_classifier else None,
             "auto_send_enabled": settings.auto_send_responses,
             "check_interval": settings.check_interval_minutes,
+            "worker_count": max(1, getattr(settings, 'email_worker_count', 1)),
             "model": settings.ollama_model
         }
\ No newline at end of file
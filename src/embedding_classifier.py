@@ -0,0 +1,70 @@
+import threading
+from typing import Dict, List, Optional
+
+DEFAULT_EMBEDDING_MODEL = 'nomic-embed-text'
+SNIPPET_CHARS = 300
+
+
+def embedding_text(email_data: Dict) -> str:
+    # Metadata-only emails carry Gmail's snippet, so no body download is needed.
+    snippet = email_data.get('snippet') or ''
+    return (
+        f"Subject: {email_data.get('subject', '')}\n"
+        f"From: {email_data.get('sender', '')}\n"
+        f"{snippet[:SNIPPET_CHARS]}"
+    )
+
+
+class EmbeddingClassifier:
+    def __init__(self, ollama_client, index, model: str = DEFAULT_EMBEDDING_MODEL):
+        self.ollama_client = ollama_client
+        self.index = index
+        self.model = model
+        # Vectors of emails the index could not answer, kept until their LLM label arrives.
+        self._pending: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def lookup_many(self, emails: List[Dict]) -> List[Optional[Dict]]:
+        with self._lock:
+            self._pending.clear()
+        return self._lookup(emails)
+    
+    def _lookup(self, emails: List[Dict]) -> List[Optional[Dict]]:
+        if not emails:
+            return []
+        
+        vectors = self.ollama_client.embed([embedding_text(email) for email in emails], self.model)
+        if vectors is None or len(vectors) != len(emails):
+            return [None] * len(emails)
+        
+        results = []
+        for email, vector in zip(emails, vectors):
+            classification = self.index.query(vector)
+            if classification is None:
+                with self._lock:
+                    self._pending[email['id']] = vector
+            results.append(classification)
+        return results
+    
+    def classify(self, email_data: Dict) -> Dict:
+        classification = self._lookup([email_data])[0]
+        if classification is None:
+            classification = self.ollama_client.classify_email(email_data)
+            self.learn(email_data, classification)
+        return classification
+    
+    def learn(self, email_data: Dict, classification: Dict):
+        # Only labels the index missed are learned; its own answers and rule hits are not.
+        with self._lock:
+            vector = self._pending.pop(email_data['id'], None)
+        
+        if vector is None or classification.get('category') == 'unknown':
+            return
+        
+        self.index.add(vector, classification)
+    
+    def flush(self):
+        self.index.flush()
+    
+    def stats(self) -> Dict:
+        return dict(self.index.stats(), model=self.model)
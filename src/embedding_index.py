@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_NEIGHBOURS = 5
+DEFAULT_MIN_SIMILARITY = 0.92
+
+
+class EmbeddingIndex:
+    def __init__(self, path: str, model: str, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 neighbours: int = DEFAULT_NEIGHBOURS, min_similarity: float = DEFAULT_MIN_SIMILARITY):
+        # Vectors live in a fixed-size memory-mapped .npy ring buffer; labels and
+        # the write position are kept in a JSON sidecar saved by flush().
+        self.path = path
+        self.meta_path = path + '.json'
+        self.model = model
+        self.max_entries = max_entries
+        self.neighbours = neighbours
+        self.min_similarity = min_similarity
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._labels: List[Optional[str]] = []
+        self._size = 0
+        self._next = 0
+        self._dirty = False
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._load()
+    
+    def _load(self):
+        if not (os.path.exists(self.path) and os.path.exists(self.meta_path)):
+            return
+        
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            vectors = np.load(self.path, mmap_mode='r+')
+        except (OSError, ValueError) as e:
+            print(f"Discarding unreadable embedding index: {e}")
+            return
+        
+        # Embeddings from a different model or index size cannot be compared.
+        if meta.get('model') != self.model or vectors.shape[0] != self.max_entries:
+            return
+        
+        self._vectors = vectors
+        self._labels = meta['labels'] + [None] * (self.max_entries - len(meta['labels']))
+        self._size = meta['size']
+        self._next = meta['next']
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def _normalise(self, vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def add(self, vector: Sequence[float], label: Dict):
+        vector = self._normalise(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.lib.format.open_memmap(
+                    self.path, mode='w+', dtype=np.float32, shape=(self.max_entries, vector.shape[0])
+                )
+                self._labels = [None] * self.max_entries
+                self._size = 0
+                self._next = 0
+            
+            # Once full, the oldest entry is overwritten.
+            self._vectors[self._next] = vector
+            self._labels[self._next] = json.dumps(label, sort_keys=True)
+            self._next = (self._next + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+            self._dirty = True
+    
+    def query(self, vector: Sequence[float]) -> Optional[Dict]:
+        vector = self._normalise(vector)
+        with self._lock:
+            if not self._size or self._vectors.shape[1] != vector.shape[0]:
+                self.misses += 1
+                return None
+            
+            similarities = self._vectors[:self._size] @ vector
+            k = min(self.neighbours, self._size)
+            nearest = np.argpartition(-similarities, k - 1)[:k]
+            votes = Counter(
+                self._labels[i] for i in nearest if similarities[i] >= self.min_similarity
+            )
+            
+            # Only similar neighbours vote, and the winner needs a majority of all k.
+            label, count = votes.most_common(1)[0] if votes else (None, 0)
+            if count * 2 <= k:
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+        
+        return json.loads(label)
+    
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            
+            self._vectors.flush()
+            meta = {
+                'model': self.model,
+                'size': self._size,
+                'next': self._next,
+                'labels': self._labels[:self._size]
+            }
+            temporary = self.meta_path + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump(meta, f)
+            os.replace(temporary, self.meta_path)
+            self._dirty = False
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -1,25 +1,94 @@
 import os
+import json
 import pickle
 import base64
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Dict, Optional
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 from googleapiclient.errors import HttpError
+from src.gmail_pool import GmailHttpPool
+from src.mime_body import DEFAULT_BODY_MAX_BYTES, extract_body
+from src.gmail_quota import GmailRequestExecutor, quota_units, retry_kind
 from config.settings import settings
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.modify',
           'https://www.googleapis.com/auth/gmail.compose']
 
+# Gmail rejects HTTP batches with more than 100 sub-requests.
+GMAIL_BATCH_LIMIT = 100
+# messages.batchModify accepts at most 1000 message IDs per call.
+BATCH_MODIFY_LIMIT = 1000
+DEFAULT_FETCH_BATCH_SIZE = 50
+HISTORY_TYPES = ['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved']
+SKIPPED_LABELS = {'SPAM', 'TRASH', 'DRAFT'}
+# Extra headers kept on each email for rule-based pre-classification.
+RETAINED_HEADERS = ('list-unsubscribe', 'list-id', 'precedence', 'auto-submitted', 'reply-to')
+METADATA_HEADERS = ['Subject', 'From', 'Date', 'List-Unsubscribe', 'List-Id',
+                    'Precedence', 'Auto-Submitted', 'Reply-To']
+
+
+@lru_cache(maxsize=1)
+def load_discovery_document() -> Optional[Dict]:
+    from googleapiclient.discovery_cache import get_static_doc
+    
+    document = get_static_doc('gmail', 'v1')
+    return json.loads(document) if document else None
+
+
+class LazyEmail(dict):
+    # Email dict fetched with format='metadata'; the body is downloaded the
+    # first time email['body'] is read (dict.get() does not trigger it).
+    def __init__(self, *args, loader=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loader = loader
+    
+    def __missing__(self, key):
+        if key != 'body' or self.loader is None:
+            raise KeyError(key)
+        body = self.loader(self['id'])
+        if body is None:
+            # Nothing is cached, so the next read tries the download again.
+            raise KeyError(f"body of {self['id']} could not be downloaded")
+        self['body'] = body
+        return body
+
+
 class GmailClient:
     def __init__(self):
+        # Credentials and the service are loaded on first use so constructing
+        # the client (and the processor around it) stays cheap.
         self.service = None
-        self.authenticate()
+        self.http_pool = None
+        self.history_id = None
+        self._pending_ids = {}
+        self.executor = GmailRequestExecutor(
+            units_per_second=getattr(settings, 'gmail_quota_units_per_second', 250),
+            max_retries=getattr(settings, 'gmail_max_retries', 5),
+            base_delay=getattr(settings, 'gmail_retry_base_delay', 1.0),
+            max_delay=getattr(settings, 'gmail_retry_max_delay', 32.0)
+        )
+    
+    @property
+    def service(self):
+        if self._service is None:
+            self.authenticate()
+        return self._service
+    
+    @service.setter
+    def service(self, service):
+        self._service = service
+    
+    @property
+    def authenticated(self) -> bool:
+        return self._service is not None
     
     def authenticate(self):
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build, build_from_document
+        
         creds = None
         
         if os.path.exists(settings.gmail_token_file):
@@ -43,111 +112,264 @@ class GmailClient:
             with open(settings.gmail_token_file, 'wb') as token:
                 pickle.dump(creds, token)
         
-        self.service = build('gmail', 'v1', credentials=creds)
+        document = load_discovery_document()
+        if document is None:
+            self.service = build('gmail', 'v1', credentials=creds)
+        else:
+            self.service = build_from_document(document, credentials=creds)
+        self.http_pool = GmailHttpPool(creds, size=getattr(settings, 'gmail_pool_size', 4))
+    
+    def _execute(self, request, units: Optional[int] = None, retry: bool = True):
+        return self.executor.execute(request, units=units, retry=retry, http_pool=self.http_pool)
+    
+    def get_quota_stats(self) -> Dict:
+        return self.executor.snapshot()
     
     def get_unread_emails(self, max_results: int = 10) -> List[Dict]:
         try:
-            results = self.service.users().messages().list(
-                userId='me',
-                q='is:unread',
-                maxResults=max_results
-            ).execute()
-            
-            messages = results.get('messages', [])
-            emails = []
-            
-            for message in messages:
-                email_data = self.get_email_details(message['id'])
-                if email_data:
-                    emails.append(email_data)
+            if getattr(settings, 'gmail_incremental_sync', False):
+                message_ids = self._get_unread_ids_incremental(max_results)
+            else:
+                message_ids = self._list_unread_ids(max_results)
             
-            return emails
+            metadata_only = getattr(settings, 'gmail_metadata_first', True)
+            return self.get_emails_details(message_ids, metadata_only=metadata_only)
         
         except HttpError as error:
             print(f'An error occurred: {error}')
             return []
     
-    def get_email_details(self, message_id: str) -> Optional[Dict]:
-        try:
-            message = self.service.users().messages().get(
-                userId='me', 
-                id=message_id,
-                format='full'
-            ).execute()
-            
-            payload = message['payload']
-            headers = payload.get('headers', [])
-            
-            email_data = {
-                'id': message_id,
-                'thread_id': message['threadId'],
-                'subject': '',
-                'sender': '',
-                'date': '',
-                'body': '',
-                'snippet': message.get('snippet', '')
+    def _list_unread_ids(self, max_results: Optional[int] = None) -> List[str]:
+        message_ids = []
+        page_token = None
+        
+        while True:
+            request_args = {
+                'userId': 'me',
+                'q': 'is:unread',
+                'maxResults': max_results or 500
             }
+            if page_token:
+                request_args['pageToken'] = page_token
             
-            for header in headers:
-                name = header['name'].lower()
-                if name == 'subject':
-                    email_data['subject'] = header['value']
-                elif name == 'from':
-                    email_data['sender'] = header['value']
-                elif name == 'date':
-                    email_data['date'] = header['value']
+            results = self._execute(self.service.users().messages().list(**request_args))
             
-            email_data['body'] = self._extract_body(payload)
+            message_ids.extend(message['id'] for message in results.get('messages', []))
+            page_token = results.get('nextPageToken')
             
-            return email_data
+            # A bounded listing is a single page; an unbounded one walks every page.
+            if max_results or not page_token:
+                return message_ids
+    
+    def _get_unread_ids_incremental(self, max_results: int) -> List[str]:
+        if self.history_id is not None:
+            try:
+                self._apply_history(self.history_id)
+            except HttpError as error:
+                if error.resp.status != 404:
+                    raise
+                print(f'History {self.history_id} has expired, running a full sync')
+                self.history_id = None
+        
+        if self.history_id is None:
+            # Take the cursor before listing so nothing that arrives mid-sync is missed.
+            profile = self._execute(self.service.users().getProfile(userId='me'))
+            self._pending_ids = dict.fromkeys(self._list_unread_ids())
+            self.history_id = profile['historyId']
+        
+        return list(self._pending_ids)[:max_results]
+    
+    def _apply_history(self, start_history_id: str):
+        page_token = None
+        
+        while True:
+            request_args = {
+                'userId': 'me',
+                'startHistoryId': start_history_id,
+                'historyTypes': HISTORY_TYPES
+            }
+            if page_token:
+                request_args['pageToken'] = page_token
+            
+            results = self._execute(self.service.users().history().list(**request_args))
+            
+            for record in results.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    self._track_message(added['message'])
+                for labelled in record.get('labelsAdded', []):
+                    self._track_message(labelled['message'])
+                for unlabelled in record.get('labelsRemoved', []):
+                    if 'UNREAD' in unlabelled.get('labelIds', []):
+                        self._pending_ids.pop(unlabelled['message']['id'], None)
+                for deleted in record.get('messagesDeleted', []):
+                    self._pending_ids.pop(deleted['message']['id'], None)
+            
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                self.history_id = results.get('historyId', self.history_id)
+                return
+    
+    def _track_message(self, message: Dict):
+        labels = set(message.get('labelIds', []))
+        if 'UNREAD' in labels and not labels & SKIPPED_LABELS:
+            self._pending_ids.setdefault(message['id'])
+        else:
+            self._pending_ids.pop(message['id'], None)
+    
+    def get_email_details(self, message_id: str, metadata_only: bool = False) -> Optional[Dict]:
+        try:
+            message = self._execute(self._message_request(message_id, metadata_only))
+            
+            return self._parse_message(message_id, message, metadata_only)
         
         except HttpError as error:
             print(f'An error occurred getting email details: {error}')
             return None
     
-    def _extract_body(self, payload) -> str:
-        body = ""
-        
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if part['mimeType'] == 'text/plain':
-                    data = part['body']['data']
-                    body = base64.urlsafe_b64decode(data).decode('utf-8')
-                    break
-                elif part['mimeType'] == 'text/html':
-                    data = part['body']['data']
-                    body = base64.urlsafe_b64decode(data).decode('utf-8')
-        else:
-            if payload['mimeType'] == 'text/plain':
-                data = payload['body']['data']
-                body = base64.urlsafe_b64decode(data).decode('utf-8')
+    def get_emails_details(self, message_ids: List[str], metadata_only: bool = False) -> List[Dict]:
+        batch_size = min(
+            getattr(settings, 'gmail_fetch_batch_size', DEFAULT_FETCH_BATCH_SIZE),
+            GMAIL_BATCH_LIMIT
+        )
         
-        return body
-    
-    def create_draft_reply(self, original_email: Dict, reply_content: str) -> bool:
-        try:
-            message = MIMEMultipart()
-            message['to'] = original_email['sender']
-            message['subject'] = f"Re: {original_email['subject']}"
+        fetched = {}
+        if batch_size > 1:
+            self._fetch_batches(message_ids, batch_size, fetched, metadata_only)
+        
+        emails = []
+        for message_id in message_ids:
+            if message_id in fetched:
+                email_data = fetched[message_id]
+            else:
+                email_data = self.get_email_details(message_id, metadata_only)
             
-            message.attach(MIMEText(reply_content, 'plain'))
+            if email_data:
+                emails.append(email_data)
+        
+        return emails
+    
+    def load_bodies(self, emails: List[Dict]):
+        missing = [email for email in emails if 'body' not in email]
+        if not missing:
+            return
+        
+        bodies = {email['id']: email for email in self.get_emails_details([email['id'] for email in missing])}
+        for email in missing:
+            # Failed downloads stay unset and are retried when the body is first read.
+            if email['id'] in bodies:
+                email['body'] = bodies[email['id']]['body']
+    
+    def _load_body(self, message_id: str) -> Optional[str]:
+        email_data = self.get_email_details(message_id)
+        return email_data['body'] if email_data else None
+    
+    def _message_request(self, message_id: str, metadata_only: bool):
+        if metadata_only:
+            return self.service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format='metadata',
+                metadataHeaders=METADATA_HEADERS
+            )
+        return self.service.users().messages().get(
+            userId='me',
+            id=message_id,
+            format='full'
+        )
+    
+    def _fetch_batches(self, message_ids: List[str], batch_size: int,
+                       fetched: Dict[str, Optional[Dict]], metadata_only: bool = False):
+        pending = list(message_ids)
+        retries = getattr(settings, 'gmail_batch_retries', 2)
+        retry_delay = getattr(settings, 'gmail_batch_retry_delay', 1.0)
+        
+        for attempt in range(retries + 1):
+            if attempt:
+                self.executor.record(retries=len(pending))
+                time.sleep(retry_delay * 2 ** (attempt - 1))
             
-            raw_message = base64.urlsafe_b64encode(
-                message.as_bytes()
-            ).decode('utf-8')
+            retry = []
+            for start in range(0, len(pending), batch_size):
+                self._fetch_batch(pending[start:start + batch_size], fetched, retry, metadata_only)
             
-            draft = {
-                'message': {
-                    'raw': raw_message,
-                    'threadId': original_email['thread_id']
-                }
-            }
+            pending = retry
+            if not pending:
+                return
+        
+        # Messages still throttled are left out of fetched and fetched one by one.
+    
+    def _fetch_batch(self, message_ids: List[str], fetched: Dict[str, Optional[Dict]],
+                     retry: List[str], metadata_only: bool = False):
+        def callback(request_id, response, exception):
+            if isinstance(exception, HttpError) and retry_kind(exception):
+                self.executor.record(**{retry_kind(exception): 1})
+                retry.append(request_id)
+                return
             
-            self.service.users().drafts().create(
-                userId='me',
-                body=draft
-            ).execute()
+            if exception is not None:
+                print(f'An error occurred getting email details: {exception}')
+                fetched[request_id] = None
+                return
             
+            try:
+                fetched[request_id] = self._parse_message(request_id, response, metadata_only)
+            except (KeyError, TypeError, ValueError) as error:
+                print(f'An error occurred parsing email {request_id}: {error}')
+                fetched[request_id] = None
+        
+        try:
+            batch = self.service.new_batch_http_request(callback=callback)
+            units = 0
+            for message_id in message_ids:
+                request = self._message_request(message_id, metadata_only)
+                units += quota_units(request)
+                batch.add(request, request_id=message_id)
+            self._execute(batch, units=units, retry=False)
+        
+        except HttpError as error:
+            # Messages without a batch response are fetched one by one.
+            print(f'An error occurred in batch fetch: {error}')
+    
+    def _parse_message(self, message_id: str, message: Dict, metadata_only: bool = False) -> Dict:
+        payload = message['payload']
+        headers = payload.get('headers', [])
+        
+        email_data = {
+            'id': message_id,
+            'thread_id': message['threadId'],
+            'subject': '',
+            'sender': '',
+            'date': '',
+            'body': '',
+            'snippet': message.get('snippet', ''),
+            'labels': message.get('labelIds', []),
+            'headers': {}
+        }
+        
+        for header in headers:
+            name = header['name'].lower()
+            if name == 'subject':
+                email_data['subject'] = header['value']
+            elif name == 'from':
+                email_data['sender'] = header['value']
+            elif name == 'date':
+                email_data['date'] = header['value']
+            elif name in RETAINED_HEADERS:
+                email_data['headers'][name] = header['value']
+        
+        if metadata_only:
+            del email_data['body']
+            return LazyEmail(email_data, loader=self._load_body)
+        
+        email_data['body'] = extract_body(
+            payload, getattr(settings, 'gmail_body_max_bytes', DEFAULT_BODY_MAX_BYTES)
+        )
+        
+        return email_data
+    
+    def create_draft_reply(self, original_email: Dict, reply_content: str) -> bool:
+        try:
+            self._execute(self._reply_request(original_email, reply_content, send=False))
             return True
         
         except HttpError as error:
@@ -156,41 +378,144 @@ class GmailClient:
     
     def send_reply(self, original_email: Dict, reply_content: str) -> bool:
         try:
-            message = MIMEMultipart()
-            message['to'] = original_email['sender']
-            message['subject'] = f"Re: {original_email['subject']}"
-            
-            message.attach(MIMEText(reply_content, 'plain'))
-            
-            raw_message = base64.urlsafe_b64encode(
-                message.as_bytes()
-            ).decode('utf-8')
-            
-            send_message = {
-                'raw': raw_message,
-                'threadId': original_email['thread_id']
-            }
-            
-            self.service.users().messages().send(
-                userId='me',
-                body=send_message
-            ).execute()
-            
+            self._execute(self._reply_request(original_email, reply_content, send=True))
             return True
         
         except HttpError as error:
             print(f'An error occurred sending email: {error}')
             return False
     
+    def submit_replies(self, replies: List[Tuple[Dict, str, bool]]) -> Dict[str, bool]:
+        pending = {email['id']: (email, content, send) for email, content, send in replies}
+        results = {}
+        retries = getattr(settings, 'gmail_batch_retries', 2)
+        retry_delay = getattr(settings, 'gmail_batch_retry_delay', 1.0)
+        
+        for attempt in range(retries + 1):
+            if attempt:
+                self.executor.record(retries=len(pending))
+                time.sleep(retry_delay * 2 ** (attempt - 1))
+            
+            retry = {}
+            items = list(pending.items())
+            for start in range(0, len(items), GMAIL_BATCH_LIMIT):
+                self._submit_batch(dict(items[start:start + GMAIL_BATCH_LIMIT]), results, retry)
+            
+            pending = retry
+            if not pending:
+                break
+        
+        if pending:
+            self.executor.record(gave_up=len(pending))
+        for message_id in pending:
+            results[message_id] = False
+        
+        # Replies without any batch response are submitted one by one.
+        for email, content, send in replies:
+            if email['id'] not in results:
+                submit = self.send_reply if send else self.create_draft_reply
+                results[email['id']] = submit(email, content)
+        
+        return results
+    
+    def _submit_batch(self, replies: Dict[str, Tuple[Dict, str, bool]],
+                      results: Dict[str, bool], retry: Dict[str, Tuple[Dict, str, bool]]):
+        def callback(request_id, response, exception):
+            if exception is None:
+                results[request_id] = True
+            elif isinstance(exception, HttpError) and retry_kind(exception):
+                self.executor.record(**{retry_kind(exception): 1})
+                retry[request_id] = replies[request_id]
+            else:
+                action = 'sending email' if replies[request_id][2] else 'creating draft'
+                print(f'An error occurred {action}: {exception}')
+                results[request_id] = False
+        
+        try:
+            batch = self.service.new_batch_http_request(callback=callback)
+            units = 0
+            for message_id, (email, content, send) in replies.items():
+                request = self._reply_request(email, content, send)
+                units += quota_units(request)
+                batch.add(request, request_id=message_id)
+            self._execute(batch, units=units, retry=False)
+        
+        except HttpError as error:
+            print(f'An error occurred in batch submit: {error}')
+    
+    def _reply_request(self, original_email: Dict, reply_content: str, send: bool):
+        message = MIMEMultipart()
+        message['to'] = original_email['sender']
+        message['subject'] = f"Re: {original_email['subject']}"
+        
+        message.attach(MIMEText(reply_content, 'plain'))
+        
+        raw_message = base64.urlsafe_b64encode(
+            message.as_bytes()
+        ).decode('utf-8')
+        
+        reply = {
+            'raw': raw_message,
+            'threadId': original_email['thread_id']
+        }
+        
+        if send:
+            return self.service.users().messages().send(userId='me', body=reply)
+        return self.service.users().drafts().create(userId='me', body={'message': reply})
+    
     def mark_as_read(self, message_id: str) -> bool:
         try:
-            self.service.users().messages().modify(
+            self._execute(self.service.users().messages().modify(
                 userId='me',
                 id=message_id,
                 body={'removeLabelIds': ['UNREAD']}
-            ).execute()
+            ))
             return True
         
         except HttpError as error:
             print(f'An error occurred marking email as read: {error}')
-            return False
\ No newline at end of file
+            return False
+    
+    def mark_many_as_read(self, message_ids: List[str]) -> Dict[str, bool]:
+        results = {}
+        
+        for start in range(0, len(message_ids), BATCH_MODIFY_LIMIT):
+            chunk = message_ids[start:start + BATCH_MODIFY_LIMIT]
+            try:
+                self._execute(self.service.users().messages().batchModify(
+                    userId='me',
+                    body={'ids': chunk, 'removeLabelIds': ['UNREAD']}
+                ))
+                results.update(dict.fromkeys(chunk, True))
+            
+            except HttpError as error:
+                # batchModify is all-or-nothing; retry individually for per-message results.
+                print(f'An error occurred batch marking emails as read: {error}')
+                for message_id in chunk:
+                    results[message_id] = self.mark_as_read(message_id)
+        
+        return results
+    
+    def watch(self, topic_name: str, label_ids: Optional[List[str]] = None) -> Optional[Dict]:
+        try:
+            return self._execute(self.service.users().watch(
+                userId='me',
+                body={
+                    'topicName': topic_name,
+                    'labelIds': label_ids or ['INBOX'],
+                    'labelFilterBehavior': 'INCLUDE'
+                }
+            ))
+        
+        except HttpError as error:
+            print(f'An error occurred starting mailbox watch: {error}')
+            return None
+    
+    def stop_watch(self) -> bool:
+        try:
+            self._execute(self.service.users().stop(userId='me'))
+            return True
+        
+        except HttpError as error:
+            print(f'An error occurred stopping mailbox watch: {error}')
+            return False
@@ -0,0 +1,73 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+
+class GmailHttpPool:
+    def __init__(self, credentials, size: int = 4, timeout: Optional[float] = None,
+                 http_factory: Optional[Callable[[], object]] = None):
+        self.credentials = credentials
+        self.size = max(1, size)
+        self.timeout = timeout
+        # Each pooled transport keeps its own keep-alive connection but they all
+        # authorise with the one shared credential.
+        self.http_factory = http_factory or self._authorized_http
+        self.created = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.refreshes = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+    
+    def _authorized_http(self):
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        
+        return AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self.timeout))
+    
+    @contextmanager
+    def connection(self):
+        http = self._checkout()
+        try:
+            yield http
+        finally:
+            self._idle.put(http)
+    
+    def _checkout(self):
+        self._refresh_credentials()
+        
+        with self._lock:
+            self.checkouts += 1
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                if self.created < self.size:
+                    self.created += 1
+                    return self.http_factory()
+                self.waits += 1
+        
+        return self._idle.get()
+    
+    def _refresh_credentials(self):
+        # Refresh once up front rather than letting every transport race on a 401.
+        if self.credentials.valid:
+            return
+        
+        with self._refresh_lock:
+            if not self.credentials.valid:
+                from google.auth.transport.requests import Request
+                self.credentials.refresh(Request())
+                self.refreshes += 1
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'size': self.size,
+                'created': self.created,
+                'idle': self._idle.qsize(),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'refreshes': self.refreshes
+            }
@@ -0,0 +1,142 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Optional
+from googleapiclient.errors import HttpError
+
+# Gmail API quota units per method; the per-user limit is 250 units/second.
+QUOTA_UNITS = {
+    'gmail.users.getProfile': 1,
+    'gmail.users.watch': 100,
+    'gmail.users.stop': 50,
+    'gmail.users.history.list': 2,
+    'gmail.users.messages.list': 5,
+    'gmail.users.messages.get': 5,
+    'gmail.users.messages.modify': 5,
+    'gmail.users.messages.batchModify': 50,
+    'gmail.users.messages.send': 100,
+    'gmail.users.drafts.create': 10
+}
+DEFAULT_QUOTA_UNITS = 5
+USER_QUOTA_UNITS_PER_SECOND = 250
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+
+def quota_units(request) -> int:
+    return QUOTA_UNITS.get(getattr(request, 'methodId', None), DEFAULT_QUOTA_UNITS)
+
+
+def error_reason(error: HttpError) -> str:
+    try:
+        return json.loads(error.content)['error']['errors'][0]['reason']
+    except (ValueError, KeyError, IndexError, TypeError):
+        return ''
+
+
+def retry_kind(error: HttpError) -> Optional[str]:
+    status = error.resp.status
+    if status == 429 or (status == 403 and error_reason(error) in RATE_LIMIT_REASONS):
+        return 'rate_limited'
+    if status in RETRYABLE_STATUSES:
+        return 'server_errors'
+    return None
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+    
+    def acquire(self, units: float) -> float:
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            # Tokens are reserved up front, so concurrent callers queue behind each other.
+            self.tokens -= units
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+
+class GmailRequestExecutor:
+    def __init__(self, units_per_second: float = USER_QUOTA_UNITS_PER_SECOND,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 32.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep,
+                 jitter: Callable[[], float] = random.random):
+        self.bucket = TokenBucket(units_per_second, clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.jitter = jitter
+        self.stats = Counter()
+        self._lock = threading.Lock()
+    
+    def execute(self, request, units: Optional[int] = None, retry: bool = True, http_pool=None):
+        units = quota_units(request) if units is None else units
+        attempt = 0
+        
+        while True:
+            waited = self.bucket.acquire(units)
+            self._count(requests=1, quota_units=units, limiter_waits=int(waited > 0),
+                        limiter_wait_seconds=waited)
+            
+            try:
+                if http_pool is None:
+                    return request.execute()
+                with http_pool.connection() as http:
+                    return request.execute(http=http)
+            except HttpError as error:
+                kind = retry_kind(error)
+                if kind is None:
+                    raise
+                
+                self._count(**{kind: 1})
+                if not retry or attempt >= self.max_retries:
+                    self._count(gave_up=1)
+                    raise
+                
+                self._count(retries=1)
+                self.sleep(self.backoff_delay(attempt, error))
+                attempt += 1
+    
+    def backoff_delay(self, attempt: int, error: Optional[HttpError] = None) -> float:
+        retry_after = error.resp.get('retry-after') if error is not None else None
+        if retry_after:
+            try:
+                return min(self.max_delay, float(retry_after))
+            except (TypeError, ValueError):
+                pass
+        
+        # Full jitter keeps concurrent workers from retrying in lockstep.
+        return self.jitter() * min(self.max_delay, self.base_delay * 2 ** attempt)
+    
+    def record(self, **amounts):
+        # For failures seen outside execute(), such as throttled batch sub-requests.
+        self._count(**amounts)
+    
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self.stats[name] += amount
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['limiter_wait_seconds'] = round(stats.get('limiter_wait_seconds', 0.0), 3)
+        return stats
@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+FETCHED = 'fetched'
+CLASSIFIED = 'classified'
+GENERATED = 'generated'
+DRAFTED = 'drafted'
+SENT = 'sent'
+ACKNOWLEDGED = 'acknowledged'
+
+
+class JobStore:
+    def __init__(self, path: str, commit_every: int = 50, commit_interval: float = 1.0):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._pending_writes = 0
+        self._last_commit = time.monotonic()
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'message_id TEXT PRIMARY KEY, stage TEXT NOT NULL, '
+            'classification TEXT, response TEXT, result TEXT, '
+            'updated_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+    
+    def get(self, message_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT stage, classification, response, result FROM jobs WHERE message_id = ?',
+                (message_id,)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        stage, classification, response, result = row
+        return {
+            'stage': stage,
+            'classification': json.loads(classification) if classification else None,
+            'response': response,
+            'result': json.loads(result) if result else None
+        }
+    
+    def record_fetched(self, message_ids: Iterable[str]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO jobs (message_id, stage, updated_at) VALUES (?, ?, ?)',
+                [(message_id, FETCHED, now) for message_id in message_ids]
+            )
+            self._conn.commit()
+    
+    def record(self, message_id: str, stage: str, classification: Optional[Dict] = None,
+               response: Optional[str] = None, result: Optional[Dict] = None,
+               durable: bool = False):
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (message_id, stage, classification, response, result, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(message_id) DO UPDATE SET '
+                'stage = excluded.stage, '
+                'classification = COALESCE(excluded.classification, classification), '
+                'response = COALESCE(excluded.response, response), '
+                'result = COALESCE(excluded.result, result), '
+                'updated_at = excluded.updated_at',
+                (
+                    message_id,
+                    stage,
+                    json.dumps(classification) if classification is not None else None,
+                    response,
+                    json.dumps(result) if result is not None else None,
+                    time.time()
+                )
+            )
+            self._pending_writes += 1
+            
+            # Inference results are cheap to lose and committed in batches;
+            # external side effects (drafts, sends) must be durable at once so
+            # a crash can never repeat them.
+            if (durable or self._pending_writes >= self.commit_every or
+                    time.monotonic() - self._last_commit >= self.commit_interval):
+                self._commit()
+    
+    def flush(self):
+        with self._lock:
+            if self._pending_writes:
+                self._commit()
+    
+    def _commit(self):
+        self._conn.commit()
+        self._pending_writes = 0
+        self._last_commit = time.monotonic()
+    
+    def prune(self, older_than_seconds: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM jobs WHERE stage = ? AND updated_at < ?',
+                (ACKNOWLEDGED, time.time() - older_than_seconds)
+            )
+            self._commit()
+            return cursor.rowcount
+    
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,101 @@
+import json
+from typing import Optional, Tuple, Union
+
+
+# Tracks bracket depth over streamed text to spot where the first JSON value ends.
+class JsonStreamScanner:
+    def __init__(self, expected_type: Union[type, Tuple[type, ...]] = (dict, list)):
+        self.expected_type = expected_type
+        self.text = ''
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, chunk: str) -> bool:
+        self.text += chunk
+        
+        while self.end is None and self._position < len(self.text):
+            position = self._position
+            char = self.text[position]
+            self._position += 1
+            
+            if self.start is None:
+                if char in '{[':
+                    self.start = position
+                    self._depth = 1
+                continue
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._close(position + 1)
+        
+        return self.end is not None
+    
+    def _close(self, end: int):
+        try:
+            value = json.loads(self.text[self.start:end])
+        except ValueError:
+            value = None
+        
+        if isinstance(value, self.expected_type):
+            self.end = end
+            return
+        
+        # Balanced prose such as "[email 1]" is not the answer; rescan from just
+        # after its opening bracket so a value nested inside it is still found.
+        self._position = self.start + 1
+        self.start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+    
+    def value_text(self) -> Optional[str]:
+        if self.end is None:
+            return None
+        return self.text[self.start:self.end]
+
+
+_decoder = json.JSONDecoder()
+
+
+def extract_json(text: str, expected_type: type = dict):
+    text = text.strip()
+    
+    try:
+        value = json.loads(text)
+        if isinstance(value, expected_type):
+            return value
+    except ValueError:
+        pass
+    
+    opener = '{' if expected_type is dict else '['
+    position = text.find(opener)
+    while position != -1:
+        try:
+            value, _ = _decoder.raw_decode(text, position)
+            if isinstance(value, expected_type):
+                return value
+        except ValueError:
+            pass
+        position = text.find(opener, position + 1)
+    
+    raise ValueError(f"No JSON {expected_type.__name__} found in model output")
@@ -0,0 +1,216 @@
+import logging
+import socket
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Callable, Dict, Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+WATCH_RENEW_SECONDS = 24 * 60 * 60
+
+
+class NotificationSource(ABC):
+    def start(self):
+        pass
+    
+    @abstractmethod
+    def wait(self, timeout: float) -> int:
+        pass
+    
+    def close(self):
+        pass
+
+
+class SocketNotificationSource(NotificationSource):
+    # Local stand-in for Pub/Sub: any UDP datagram to the port is a mailbox change.
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self._sock = None
+    
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((self.host, self.port))
+        self.port = self._sock.getsockname()[1]
+    
+    def wait(self, timeout: float) -> int:
+        self._sock.settimeout(max(timeout, 0.001))
+        try:
+            self._sock.recv(4096)
+        except socket.timeout:
+            return 0
+        
+        received = 1
+        self._sock.setblocking(False)
+        try:
+            while True:
+                self._sock.recv(4096)
+                received += 1
+        except BlockingIOError:
+            pass
+        return received
+    
+    def close(self):
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+
+class PubSubNotificationSource(NotificationSource):
+    def __init__(self, gmail_client, topic: str, subscription: str,
+                 renew_seconds: float = WATCH_RENEW_SECONDS):
+        try:
+            from google.cloud import pubsub_v1
+        except ImportError as error:
+            raise ImportError(
+                "google-cloud-pubsub is required for the 'pubsub' notification source. "
+                "Install it or set NOTIFICATION_SOURCE=poll."
+            ) from error
+        
+        self.gmail_client = gmail_client
+        self.topic = topic
+        self.subscription = subscription
+        self.renew_seconds = renew_seconds
+        self.subscriber = pubsub_v1.SubscriberClient()
+        self._watch_renewed_at = None
+    
+    def start(self):
+        self._renew_watch()
+    
+    def _renew_watch(self):
+        # Gmail watches lapse after seven days; renewing daily keeps them alive.
+        if self.gmail_client.watch(self.topic) is not None:
+            self._watch_renewed_at = time.monotonic()
+    
+    def wait(self, timeout: float) -> int:
+        if (self._watch_renewed_at is None or
+                time.monotonic() - self._watch_renewed_at > self.renew_seconds):
+            self._renew_watch()
+        
+        try:
+            response = self.subscriber.pull(
+                request={'subscription': self.subscription, 'max_messages': 100},
+                timeout=max(timeout, 1.0)
+            )
+        except Exception as error:
+            if type(error).__name__ != 'DeadlineExceeded':
+                logger.warning(f"Pub/Sub pull failed: {error}")
+                time.sleep(min(timeout, 5.0))
+            return 0
+        
+        ack_ids = [message.ack_id for message in response.received_messages]
+        if ack_ids:
+            self.subscriber.acknowledge(
+                request={'subscription': self.subscription, 'ack_ids': ack_ids}
+            )
+        return len(ack_ids)
+    
+    def close(self):
+        self.gmail_client.stop_watch()
+        self.subscriber.close()
+
+
+def build_notification_source(gmail_client) -> Optional[NotificationSource]:
+    source = getattr(settings, 'notification_source', 'poll')
+    
+    if source == 'pubsub':
+        return PubSubNotificationSource(
+            gmail_client,
+            topic=settings.pubsub_topic,
+            subscription=settings.pubsub_subscription
+        )
+    if source == 'socket':
+        return SocketNotificationSource(port=getattr(settings, 'notification_socket_port', 8765))
+    return None
+
+
+class MailboxDaemon:
+    def __init__(self, processor, source: Optional[NotificationSource] = None,
+                 poll_interval: Optional[float] = None, debounce_seconds: Optional[float] = None,
+                 max_debounce_seconds: Optional[float] = None,
+                 on_cycle: Optional[Callable[[str, Dict], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.processor = processor
+        self.source = source
+        self.poll_interval = (
+            poll_interval if poll_interval is not None
+            else settings.check_interval_minutes * 60
+        )
+        self.debounce_seconds = (
+            debounce_seconds if debounce_seconds is not None
+            else getattr(settings, 'notification_debounce_seconds', 2.0)
+        )
+        self.max_debounce_seconds = (
+            max_debounce_seconds if max_debounce_seconds is not None
+            else getattr(settings, 'notification_max_debounce_seconds', 10.0)
+        )
+        self.on_cycle = on_cycle
+        self.clock = clock
+        self.stop_event = threading.Event()
+        self.stats = {'notifications': 0, 'startup_cycles': 0, 'notification_cycles': 0, 'poll_cycles': 0}
+    
+    def run(self, run_immediately: bool = True):
+        if self.source:
+            self.source.start()
+        
+        try:
+            if run_immediately:
+                self._run_cycle('startup')
+            
+            next_poll = self.clock() + self.poll_interval
+            while not self.stop_event.is_set():
+                remaining = max(0.0, next_poll - self.clock())
+                
+                if self.source:
+                    received = self.source.wait(remaining)
+                else:
+                    received = 0
+                    self.stop_event.wait(remaining)
+                
+                if self.stop_event.is_set():
+                    break
+                
+                if received:
+                    self.stats['notifications'] += received + self._debounce()
+                    trigger = 'notification'
+                elif self.clock() >= next_poll:
+                    trigger = 'poll'
+                else:
+                    continue
+                
+                self._run_cycle(trigger)
+                next_poll = self.clock() + self.poll_interval
+        finally:
+            if self.source:
+                self.source.close()
+    
+    def stop(self):
+        self.stop_event.set()
+    
+    def _debounce(self) -> int:
+        # Gmail sends a burst of notifications per change; wait for a quiet gap.
+        received = 0
+        deadline = self.clock() + self.max_debounce_seconds
+        while not self.stop_event.is_set():
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                break
+            burst = self.source.wait(min(self.debounce_seconds, remaining))
+            if not burst:
+                break
+            received += burst
+        return received
+    
+    def _run_cycle(self, trigger: str):
+        self.stats[f'{trigger}_cycles'] += 1
+        try:
+            result = self.processor.process_emails()
+        except Exception as e:
+            logger.error(f"Error in {trigger} processing cycle: {e}")
+            return
+        
+        logger.info(f"Processing cycle ({trigger}) complete: {result}")
+        if self.on_cycle:
+            self.on_cycle(trigger, result)
@@ -0,0 +1,85 @@
+import base64
+import codecs
+import re
+from html import unescape
+from typing import Dict, Optional
+
+DEFAULT_BODY_MAX_BYTES = 16384
+# Markup typically carries several bytes per byte of visible text.
+HTML_BUDGET_FACTOR = 4
+
+CHARSET = re.compile(r'charset\s*=\s*"?([\w.:-]+)"?', re.IGNORECASE)
+HIDDEN_BLOCKS = re.compile(r'<(script|style|head)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+COMMENTS = re.compile(r'<!--.*?-->', re.DOTALL)
+LINE_BREAKS = re.compile(r'<(?:br|/p|/div|/tr|/li|/h[1-6])\b[^>]*>', re.IGNORECASE)
+TAGS = re.compile(r'<[^>]*>')
+
+
+def find_part(payload: Dict, mime_type: str) -> Optional[Dict]:
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        if (part.get('mimeType') == mime_type and not part.get('filename')
+                and part.get('body', {}).get('data')):
+            return part
+        stack.extend(reversed(part.get('parts', [])))
+    return None
+
+
+def part_charset(part: Dict) -> str:
+    for header in part.get('headers', []):
+        if header['name'].lower() == 'content-type':
+            match = CHARSET.search(header['value'])
+            if match:
+                try:
+                    return codecs.lookup(match.group(1)).name
+                except LookupError:
+                    break
+    return 'utf-8'
+
+
+def decode_part(part: Dict, max_bytes: Optional[int] = None) -> str:
+    data = part['body']['data']
+    truncated = False
+    
+    if max_bytes:
+        # Only decode the base64 needed for the budget, 4 characters per 3 bytes.
+        limit = -(-max_bytes // 3) * 4
+        if len(data) > limit:
+            data = data[:limit]
+            truncated = True
+    
+    raw = base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+    if max_bytes and len(raw) > max_bytes:
+        raw = raw[:max_bytes]
+        truncated = True
+    
+    # A non-final decode drops a multi-byte character cut by the budget.
+    decoder = codecs.getincrementaldecoder(part_charset(part))(errors='replace')
+    return decoder.decode(raw, final=not truncated)
+
+
+def html_to_text(html: str) -> str:
+    # A byte budget can cut the document inside a tag.
+    cut = html.rfind('<')
+    if cut > html.rfind('>'):
+        html = html[:cut]
+    
+    text = HIDDEN_BLOCKS.sub('', html)
+    text = COMMENTS.sub('', text)
+    text = TAGS.sub('', LINE_BREAKS.sub('\n', text))
+    lines = (' '.join(line.split()) for line in unescape(text).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def extract_body(payload: Dict, max_bytes: Optional[int] = DEFAULT_BODY_MAX_BYTES) -> str:
+    plain = find_part(payload, 'text/plain')
+    if plain is not None:
+        return decode_part(plain, max_bytes)
+    
+    html = find_part(payload, 'text/html')
+    if html is not None:
+        text = html_to_text(decode_part(html, max_bytes and max_bytes * HTML_BUDGET_FACTOR))
+        return text[:max_bytes] if max_bytes else text
+    
+    return ''
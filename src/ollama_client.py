@@ -1,96 +1,684 @@
-import ollama
-from typing import Dict, Optional
+import json
+import re
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple, Union
+from src.classification_cache import ClassificationCache
+from src.json_parsing import JsonStreamScanner, extract_json
+from src.ollama_health import OllamaHealth
+from src.ollama_pool import OllamaHostPool, DEFAULT_PS_TTL_SECONDS, DEFAULT_COLD_HOST_PENALTY
+from src.prompt_builder import (
+    CLASSIFICATION_BODY_TOKENS, REPLY_BODY_TOKENS, estimate_tokens,
+    build_classification_prompt, build_batch_classification_prompt, build_reply_prompt
+)
 from config.settings import settings
 
+UNAVAILABLE_RESPONSE = "I apologize, but I'm unable to generate a response at this time."
+
+# Token caps: classification output is a small JSON object, replies are asked
+# to stay under 150 words (~200 tokens) so the cap only trims runaway output.
+CLASSIFICATION_MAX_TOKENS = 160
+REPLY_MAX_TOKENS = 300
+PROMPT_LOG_SIZE = 1000
+
+# Idle keep-alive covers the wait until the next poll plus some slack, so models
+# stay loaded between cycles without pinning memory long after the last one.
+KEEP_ALIVE_MARGIN_SECONDS = 120
+DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)?')
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, None: 1, '': 1}
+
+# Cascade defaults: the classification model's answer is kept unless it is unsure
+# or the email is in a category where a wrong label is expensive.
+CASCADE_MIN_CONFIDENCE = 0.7
+ESCALATION_CATEGORIES = ('urgent', 'work')
+
+CLASSIFICATION_VALUES = {
+    "category": {"spam", "personal", "work", "urgent", "promotional", "newsletter"},
+    "priority": {"high", "medium", "low"},
+    "requires_response": {True, False},
+    "sentiment": {"positive", "neutral", "negative"},
+    "action_needed": {"reply", "acknowledge", "schedule", "ignore"}
+}
+
+
+FALLBACK_CLASSIFICATION = {
+    "category": "unknown",
+    "priority": "medium",
+    "requires_response": False,
+    "sentiment": "neutral",
+    "action_needed": "ignore"
+}
+
+CLASSIFICATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        field: {"type": "boolean"} if field == "requires_response"
+        else {"type": "string", "enum": sorted(allowed)}
+        for field, allowed in CLASSIFICATION_VALUES.items()
+    },
+    "required": list(CLASSIFICATION_VALUES)
+}
+
+BATCH_CLASSIFICATION_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": dict(CLASSIFICATION_SCHEMA["properties"], index={"type": "integer"}),
+        "required": ["index"] + list(CLASSIFICATION_VALUES)
+    }
+}
+
+CASCADE_CLASSIFICATION_SCHEMA = dict(
+    CLASSIFICATION_SCHEMA,
+    properties=dict(CLASSIFICATION_SCHEMA["properties"], confidence={"type": "number"}),
+    required=CLASSIFICATION_SCHEMA["required"] + ["confidence"]
+)
+
+CASCADE_BATCH_CLASSIFICATION_SCHEMA = dict(
+    BATCH_CLASSIFICATION_SCHEMA,
+    items=dict(
+        BATCH_CLASSIFICATION_SCHEMA["items"],
+        properties=dict(BATCH_CLASSIFICATION_SCHEMA["items"]["properties"], confidence={"type": "number"}),
+        required=BATCH_CLASSIFICATION_SCHEMA["items"]["required"] + ["confidence"]
+    )
+)
+
+
+# System prompts are kept byte-for-byte stable and sent ahead of the per-email
+# content, so Ollama can reuse the evaluated prefix from its KV cache.
+CLASSIFICATION_SYSTEM_PROMPT = """You classify emails for Michael Sigamani's personal AI assistant.
+
+Analyze the email you are given and classify it. Respond with ONLY a JSON object:
+{
+    "category": "spam|personal|work|urgent|promotional|newsletter",
+    "priority": "high|medium|low",
+    "requires_response": true|false,
+    "sentiment": "positive|neutral|negative",
+    "action_needed": "reply|acknowledge|schedule|ignore"
+}"""
+
+BATCH_CLASSIFICATION_SYSTEM_PROMPT = """You classify emails for Michael Sigamani's personal AI assistant.
+
+You are given several numbered emails. Classify each one and respond with ONLY a JSON array containing one object per email, in order:
+[
+    {
+        "index": 1,
+        "category": "spam|personal|work|urgent|promotional|newsletter",
+        "priority": "high|medium|low",
+        "requires_response": true|false,
+        "sentiment": "positive|neutral|negative",
+        "action_needed": "reply|acknowledge|schedule|ignore"
+    }
+]"""
+
+CONFIDENCE_INSTRUCTION = """
+
+Also include "confidence": a number from 0 to 1 saying how sure you are of the classification."""
+
+CASCADE_CLASSIFICATION_SYSTEM_PROMPT = CLASSIFICATION_SYSTEM_PROMPT + CONFIDENCE_INSTRUCTION
+
+CASCADE_BATCH_CLASSIFICATION_SYSTEM_PROMPT = BATCH_CLASSIFICATION_SYSTEM_PROMPT + CONFIDENCE_INSTRUCTION
+
+REPLY_SYSTEM_PROMPT = """You are Michael Sigamani's personal AI assistant. Generate a professional email response to the email you are given.
+
+Guidelines:
+- Be professional and concise
+- Match the tone of the original email
+- If it's a meeting request, suggest alternative times
+- If it's a question, provide helpful information
+- If it's promotional/spam, politely decline
+- Keep responses under 150 words
+- Sign as "Michael" or "Best regards, Michael"
+"""
+
+
+def keep_alive_for_interval(interval_seconds: float) -> str:
+    return f"{int(interval_seconds + KEEP_ALIVE_MARGIN_SECONDS)}s"
+
+
+def keep_alive_seconds(keep_alive) -> Optional[float]:
+    # Ollama takes seconds or a Go duration; a negative value never unloads.
+    if isinstance(keep_alive, (int, float)):
+        seconds = float(keep_alive)
+    else:
+        text = str(keep_alive).strip()
+        parts = DURATION_PART.findall(text)
+        if not parts or ''.join(number + unit for number, unit in parts) != text.lstrip('-'):
+            return None
+        seconds = sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+        seconds = -seconds if text.startswith('-') else seconds
+    return None if seconds < 0 else seconds
+
+
+def is_valid_classification(item) -> bool:
+    if not isinstance(item, dict) or not isinstance(item.get('requires_response'), bool):
+        return False
+    
+    return all(
+        isinstance(item.get(field), (str, bool)) and item[field] in allowed
+        for field, allowed in CLASSIFICATION_VALUES.items()
+    )
+
 class OllamaClient:
     def __init__(self):
-        self.client = ollama.Client(host=settings.ollama_host)
+        # The ollama package is slow to import, so the client is created on first use.
+        self.client = None
+        self.host = settings.ollama_host
         self.model = settings.ollama_model
+        # A small, fast model can take over classification; replies stay on ollama_model.
+        self.classification_model = getattr(settings, 'ollama_classification_model', None) or self.model
+        self.cascade = (
+            bool(getattr(settings, 'classification_cascade', False)) and
+            self.classification_model != self.model
+        )
+        self.min_confidence = getattr(settings, 'cascade_min_confidence', CASCADE_MIN_CONFIDENCE)
+        self.escalation_categories = set(
+            getattr(settings, 'cascade_escalation_categories', ESCALATION_CATEGORIES)
+        )
+        self.health = self._create_health()
+        
+        # With several hosts the pool routes each request; otherwise ollama_host is used directly.
+        hosts = list(getattr(settings, 'ollama_hosts', None) or [])
+        self.pool = OllamaHostPool(
+            hosts,
+            health_factory=self._create_health,
+            ps_ttl_seconds=getattr(settings, 'ollama_ps_ttl_seconds', DEFAULT_PS_TTL_SECONDS),
+            cold_host_penalty=getattr(settings, 'ollama_cold_host_penalty', DEFAULT_COLD_HOST_PENALTY)
+        ) if len(hosts) > 1 else None
+        
+        cache_file = getattr(settings, 'classification_cache_file', None)
+        self.classification_cache = ClassificationCache(
+            cache_file,
+            f"{self.classification_model}>{self.model}" if self.cascade else self.classification_model,
+            max_entries=getattr(settings, 'classification_cache_max_entries', 10000)
+        ) if cache_file else None
+        
+        self.early_stops = 0
+        self.structured_output = getattr(settings, 'ollama_structured_output', True)
+        self.keep_alive = getattr(settings, 'ollama_keep_alive', None) or keep_alive_for_interval(
+            getattr(settings, 'check_interval_minutes', 5) * 60
+        )
+        self.parse_stats = Counter()
+        self.prompt_log = deque(maxlen=PROMPT_LOG_SIZE)
+        self.model_stats = {}
+        self.routing_stats = Counter()
+        self.warm_up_stats = {}
+        # When each model is expected to unload; requests after that pay the load.
+        self._warm_until = {}
+        self._stats_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        if self._client is None:
+            import ollama
+            self._client = ollama.Client(host=self.host)
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    def _create_health(self) -> OllamaHealth:
+        return OllamaHealth(
+            ttl_seconds=getattr(settings, 'ollama_health_ttl_seconds', 30),
+            failure_threshold=getattr(settings, 'ollama_failure_threshold', 3),
+            cooldown_seconds=getattr(settings, 'ollama_cooldown_seconds', 60)
+        )
     
     def is_available(self) -> bool:
+        if self.pool is not None:
+            return self.pool.is_available()
+        return self.health.check(self.client.list)
+    
+    def get_health_stats(self) -> Dict:
+        return self.health.snapshot()
+    
+    def get_host_stats(self) -> Optional[Dict]:
+        return self.pool.stats() if self.pool is not None else None
+    
+    def _call(self, model: str, request):
+        if self.pool is None:
+            return request(self.client)
+        # The pool fails over to another host on connection errors.
+        return self.pool.call(model, request)
+    
+    def get_parse_stats(self) -> Dict:
+        stats = dict(self.parse_stats)
+        attempts = stats.get('attempts', 0)
+        stats['failure_rate'] = stats.get('failed', 0) / attempts if attempts else 0.0
+        stats['recovery_rate'] = stats.get('recovered', 0) / attempts if attempts else 0.0
+        return stats
+    
+    def get_prompt_stats(self) -> Dict:
+        with self._stats_lock:
+            entries = list(self.prompt_log)
+        
+        stats = {}
+        for task in sorted({entry['task'] for entry in entries}):
+            task_entries = [entry for entry in entries if entry['task'] == task]
+            count = len(task_entries)
+            stats[task] = {
+                'count': count,
+                'avg_prompt_tokens': sum(e['prompt_tokens'] for e in task_entries) / count,
+                'avg_body_tokens': sum(e['body_tokens'] for e in task_entries) / count,
+                'avg_latency': sum(e['latency'] for e in task_entries) / count
+            }
+        return stats
+    
+    def get_model_stats(self) -> Dict:
+        with self._stats_lock:
+            usage = {key: dict(counts) for key, counts in self.model_stats.items()}
+            routing = dict(self.routing_stats)
+        
+        models = {}
+        for (task, model), counts in sorted(usage.items()):
+            cold = counts.get('cold_requests', 0)
+            warm = counts['requests'] - cold
+            models.setdefault(model, {})[task] = {
+                'requests': counts['requests'],
+                'avg_latency': counts['latency'] / counts['requests'],
+                'cold_requests': cold,
+                'avg_cold_latency': counts['cold_latency'] / cold if cold else None,
+                'avg_warm_latency': (counts['latency'] - counts.get('cold_latency', 0)) / warm if warm else None
+            }
+        
+        kept = routing.get('classification_model', 0)
+        escalated = routing.get('escalated', 0)
+        small = models.get(self.classification_model, {}).get('classification')
+        large = models.get(self.model, {}).get('classification')
+        latency_saved = None
+        if self.cascade and small and large:
+            # Kept answers skipped a large-model call; escalations paid for both.
+            latency_saved = (
+                kept * (large['avg_latency'] - small['avg_latency']) -
+                escalated * small['avg_latency']
+            )
+        
+        return {
+            'classification_model': self.classification_model,
+            'generation_model': self.model,
+            'cascade': self.cascade,
+            'models': models,
+            'kept_by_classification_model': kept,
+            'escalated': escalated,
+            'escalation_rate': escalated / (kept + escalated) if kept + escalated else 0.0,
+            'estimated_latency_saved': latency_saved,
+            'keep_alive': self.keep_alive,
+            'warm_up': dict(self.warm_up_stats)
+        }
+    
+    def _record_model(self, task: str, model: str, latency: float, requests: int = 1):
+        now = time.perf_counter()
+        with self._stats_lock:
+            warm_until = self._warm_until.get(model)
+            cold = warm_until is None or now - latency > warm_until
+            counts = self.model_stats.setdefault((task, model), Counter())
+            counts['requests'] += requests
+            counts['latency'] += latency
+            if cold:
+                counts['cold_requests'] += requests
+                counts['cold_latency'] += latency
+            self._mark_warm(model, now)
+    
+    def _mark_warm(self, model: str, now: float):
+        seconds = keep_alive_seconds(self.keep_alive)
+        self._warm_until[model] = float('inf') if seconds is None else now + seconds
+    
+    def warm_up(self, models: Optional[List[str]] = None) -> Dict[str, Optional[float]]:
+        timings = {}
+        for model in dict.fromkeys(models or [self.classification_model, self.model]):
+            if self.pool is None:
+                timings[model] = self._load_model(self.client, model, self.host)
+            else:
+                timings[model] = self.pool.warm_up(
+                    model, lambda host: self._load_model(host.client, model, host.host)
+                )
+            
+            if timings[model] is not None:
+                with self._stats_lock:
+                    self._mark_warm(model, time.perf_counter())
+        
+        with self._stats_lock:
+            self.warm_up_stats.update(timings)
+        return timings
+    
+    def _load_model(self, client, model: str, host: str) -> Optional[float]:
+        start = time.perf_counter()
         try:
-            self.client.list()
-            return True
-        except Exception:
-            return False
+            # An empty prompt makes Ollama load the model without generating.
+            client.generate(model=model, prompt='', keep_alive=self.keep_alive)
+        except Exception as e:
+            print(f"Error warming up {model} on {host}: {e}")
+            return None
+        return time.perf_counter() - start
+    
+    def _record_prompt(self, task: str, email_data: Dict, prompt_tokens: int, latency: float):
+        entry = {
+            'email_id': email_data.get('id'),
+            'task': task,
+            'prompt_tokens': prompt_tokens,
+            'body_tokens': estimate_tokens(email_data['body']),
+            'latency': latency
+        }
+        with self._stats_lock:
+            self.prompt_log.append(entry)
     
-    def generate_response(self, prompt: str, context: Optional[str] = None) -> str:
+    def _parse_json(self, text: str, expected_type: type = dict):
+        try:
+            value = json.loads(text.strip())
+            outcome = 'clean' if isinstance(value, expected_type) else None
+        except ValueError:
+            outcome = None
+        
+        if outcome is None:
+            try:
+                value = extract_json(text, expected_type)
+                outcome = 'recovered'
+            except ValueError:
+                outcome = 'failed'
+        
+        with self._stats_lock:
+            self.parse_stats['attempts'] += 1
+            self.parse_stats[outcome] += 1
+        
+        if outcome == 'failed':
+            raise ValueError(f"Unparseable model output: {text[:80]!r}")
+        return value
+    
+    def generate_response(self, prompt: str, context: Optional[str] = None,
+                          stop_after_json: Union[bool, type] = False, max_tokens: Optional[int] = None,
+                          format: Optional[Union[str, Dict]] = None,
+                          system: Optional[str] = None, model: Optional[str] = None) -> str:
+        import ollama
+        
+        if not self.health.allow_request():
+            print("Skipping generation: Ollama circuit breaker is open")
+            return UNAVAILABLE_RESPONSE
+        
         try:
             full_prompt = prompt
             if context:
                 full_prompt = f"Context: {context}\n\n{prompt}"
             
-            response = self.client.generate(
-                model=self.model,
-                prompt=full_prompt,
-                stream=False
-            )
+            options = {'num_predict': max_tokens} if max_tokens else None
+            format = format if self.structured_output else None
             
-            return response['response']
+            try:
+                text = self._generate(full_prompt, options, stop_after_json, format, system, model)
+            except ollama.ResponseError as e:
+                if format is None:
+                    raise
+                # Servers that predate structured outputs reject the format field.
+                print(f"Structured output unsupported, retrying without it: {e}")
+                self.structured_output = False
+                text = self._generate(full_prompt, options, stop_after_json, None, system, model)
+            
+            self.health.record_success()
+            return text
+        
+        except ollama.ResponseError as e:
+            # The server answered, so this says nothing about its availability.
+            self.health.record_success()
+            print(f"Error generating response: {e}")
+            return UNAVAILABLE_RESPONSE
         
         except Exception as e:
+            self.health.record_failure()
             print(f"Error generating response: {e}")
-            return "I apologize, but I'm unable to generate a response at this time."
+            return UNAVAILABLE_RESPONSE
+    
+    def embed(self, texts: List[str], model: str) -> Optional[List[List[float]]]:
+        import ollama
+        
+        if not self.health.allow_request():
+            return None
+        
+        try:
+            response = self._call(
+                model, lambda client: client.embed(model=model, input=texts, keep_alive=self.keep_alive)
+            )
+        except ollama.ResponseError as e:
+            self.health.record_success()
+            print(f"Error embedding {len(texts)} texts: {e}")
+            return None
+        except Exception as e:
+            self.health.record_failure()
+            print(f"Error embedding {len(texts)} texts: {e}")
+            return None
+        
+        self.health.record_success()
+        return response['embeddings']
+    
+    def _generate(self, prompt: str, options: Optional[Dict], stop_after_json: Union[bool, type],
+                  format: Optional[Union[str, Dict]], system: Optional[str],
+                  model: Optional[str] = None) -> str:
+        model = model or self.model
+        return self._call(model, lambda client: self._generate_on(
+            client, prompt, options, stop_after_json, format, system, model
+        ))
+    
+    def _generate_on(self, client, prompt: str, options: Optional[Dict], stop_after_json: Union[bool, type],
+                     format: Optional[Union[str, Dict]], system: Optional[str], model: str) -> str:
+        stream = getattr(settings, 'ollama_stream_responses', True)
+        
+        if system is None:
+            response = client.generate(
+                model=model,
+                prompt=prompt,
+                stream=stream,
+                options=options,
+                format=format,
+                keep_alive=self.keep_alive
+            )
+            content = lambda chunk: chunk['response']
+        else:
+            response = client.chat(
+                model=model,
+                messages=[
+                    {'role': 'system', 'content': system},
+                    {'role': 'user', 'content': prompt}
+                ],
+                stream=stream,
+                options=options,
+                format=format,
+                keep_alive=self.keep_alive
+            )
+            content = lambda chunk: chunk['message']['content']
+        
+        if not stream:
+            return content(response)
+        
+        return self._consume_stream(response, content, stop_after_json)
+    
+    def _consume_stream(self, stream, content, stop_after_json: Union[bool, type]) -> str:
+        # True accepts any JSON value; a type only accepts values of that type.
+        expected_type = (dict, list) if stop_after_json is True else stop_after_json
+        scanner = JsonStreamScanner(expected_type) if stop_after_json else None
+        parts = []
+        
+        try:
+            for chunk in stream:
+                text = content(chunk)
+                parts.append(text)
+                if scanner is not None and scanner.feed(text):
+                    # Closing the stream drops the connection, which makes
+                    # Ollama stop generating instead of finishing the ramble.
+                    self.early_stops += 1
+                    return scanner.value_text()
+        finally:
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+        
+        return ''.join(parts)
     
     def classify_email(self, email_data: Dict) -> Dict:
-        classification_prompt = f"""
-        Analyze this email and classify it:
-
-        Subject: {email_data['subject']}
-        From: {email_data['sender']}
-        Body: {email_data['body'][:500]}...
-
-        Classify this email and respond with ONLY a JSON object:
-        {{
-            "category": "spam|personal|work|urgent|promotional|newsletter",
-            "priority": "high|medium|low",
-            "requires_response": true|false,
-            "sentiment": "positive|neutral|negative",
-            "action_needed": "reply|acknowledge|schedule|ignore"
-        }}
-        """
+        cached = self._cached_classification(email_data)
+        if cached is not None:
+            return cached
         
         try:
-            response = self.generate_response(classification_prompt)
-            import json
-            return json.loads(response.strip())
+            if self.cascade:
+                try:
+                    candidate = self._request_classification(email_data, self.classification_model)
+                except ValueError:
+                    candidate = None
+                classification = self._settle_cascade(email_data, candidate)
+            else:
+                classification = self._request_classification(email_data, self.classification_model)
         except Exception as e:
             print(f"Error classifying email: {e}")
-            return {
-                "category": "unknown",
-                "priority": "medium",
-                "requires_response": False,
-                "sentiment": "neutral",
-                "action_needed": "ignore"
-            }
+            return dict(FALLBACK_CLASSIFICATION)
+        
+        if self.classification_cache is not None:
+            self.classification_cache.put(email_data, classification)
+        
+        return classification
+    
+    def _classification_request(self, email_data: Dict, model: str) -> Tuple[str, Dict]:
+        # Only the first cascade step asks the model to rate its own confidence.
+        with_confidence = self.cascade and model == self.classification_model
+        prompt = build_classification_prompt(
+            email_data, getattr(settings, 'classification_body_tokens', CLASSIFICATION_BODY_TOKENS)
+        )
+        return prompt, {
+            'stop_after_json': dict,
+            'max_tokens': CLASSIFICATION_MAX_TOKENS,
+            'format': CASCADE_CLASSIFICATION_SCHEMA if with_confidence else CLASSIFICATION_SCHEMA,
+            'system': CASCADE_CLASSIFICATION_SYSTEM_PROMPT if with_confidence else CLASSIFICATION_SYSTEM_PROMPT,
+            'model': model
+        }
+    
+    def _request_classification(self, email_data: Dict, model: str) -> Dict:
+        prompt, request = self._classification_request(email_data, model)
+        start = time.perf_counter()
+        response = self.generate_response(prompt, **request)
+        latency = time.perf_counter() - start
+        self._record_prompt('classification', email_data, estimate_tokens(prompt), latency)
+        self._record_model('classification', model, latency)
+        return self._parse_classification(response)
+    
+    def _parse_classification(self, response: str) -> Dict:
+        classification = self._parse_json(response, dict)
+        # A partial object would be cached and then break the pipeline on every cycle.
+        if not is_valid_classification(classification):
+            raise ValueError(f"Incomplete classification: {classification!r}")
+        return classification
+    
+    def _cached_classification(self, email_data: Dict) -> Optional[Dict]:
+        if self.classification_cache is None:
+            return None
+        cached = self.classification_cache.get(email_data)
+        # Entries written before results were validated may be incomplete.
+        return cached if is_valid_classification(cached) else None
+    
+    def _needs_escalation(self, candidate: Optional[Dict]) -> bool:
+        if not is_valid_classification(candidate):
+            return True
+        
+        confidence = candidate.get('confidence')
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)):
+            return True
+        
+        return candidate['category'] in self.escalation_categories or confidence < self.min_confidence
+    
+    def _accept_candidate(self, candidate: Optional[Dict]) -> Optional[Dict]:
+        escalate = self._needs_escalation(candidate)
+        with self._stats_lock:
+            self.routing_stats['escalated' if escalate else 'classification_model'] += 1
+        
+        if escalate:
+            return None
+        return {field: candidate[field] for field in CLASSIFICATION_VALUES}
+    
+    def _settle_cascade(self, email_data: Dict, candidate: Optional[Dict]) -> Dict:
+        accepted = self._accept_candidate(candidate)
+        if accepted is not None:
+            return accepted
+        return self._request_classification(email_data, self.model)
+    
+    def classify_emails(self, emails: List[Dict]) -> List[Dict]:
+        results: List[Optional[Dict]] = [None] * len(emails)
+        pending = []
+        
+        for position, email_data in enumerate(emails):
+            cached = self._cached_classification(email_data)
+            if cached is not None:
+                results[position] = cached
+            else:
+                pending.append(position)
+        
+        if len(pending) > 1:
+            for position, classification in zip(pending, self._classify_batch([emails[p] for p in pending])):
+                if classification is not None and self.cascade:
+                    try:
+                        classification = self._settle_cascade(emails[position], classification)
+                    except ValueError as e:
+                        print(f"Error classifying escalated email: {e}")
+                        classification = None
+                if classification is not None:
+                    results[position] = classification
+                    if self.classification_cache is not None:
+                        self.classification_cache.put(emails[position], classification)
+        
+        for position, classification in enumerate(results):
+            if classification is None:
+                results[position] = self.classify_email(emails[position])
+        
+        return results
+    
+    def _classify_batch(self, emails: List[Dict]) -> List[Optional[Dict]]:
+        classifications: List[Optional[Dict]] = [None] * len(emails)
+        body_tokens = getattr(settings, 'classification_body_tokens', CLASSIFICATION_BODY_TOKENS)
+        try:
+            start = time.perf_counter()
+            response = self.generate_response(
+                build_batch_classification_prompt(emails, body_tokens),
+                stop_after_json=list,
+                max_tokens=CLASSIFICATION_MAX_TOKENS * len(emails),
+                format=CASCADE_BATCH_CLASSIFICATION_SCHEMA if self.cascade else BATCH_CLASSIFICATION_SCHEMA,
+                system=(CASCADE_BATCH_CLASSIFICATION_SYSTEM_PROMPT if self.cascade
+                        else BATCH_CLASSIFICATION_SYSTEM_PROMPT),
+                model=self.classification_model
+            )
+            # The batch latency is shared evenly between its emails.
+            latency = (time.perf_counter() - start) / len(emails)
+            for email_data in emails:
+                prompt_tokens = estimate_tokens(build_classification_prompt(email_data, body_tokens))
+                self._record_prompt('classification_batch', email_data, prompt_tokens, latency)
+            self._record_model('classification', self.classification_model, latency * len(emails), len(emails))
+            items = self._parse_json(response, list)
+        except ValueError as e:
+            print(f"Error parsing batch classification: {e}")
+            return classifications
+        
+        for position, item in enumerate(items):
+            if isinstance(item, dict) and isinstance(item.get('index'), int):
+                position = item['index'] - 1
+            if not 0 <= position < len(emails) or not is_valid_classification(item):
+                continue
+            classifications[position] = {field: item[field] for field in CLASSIFICATION_VALUES}
+            if self.cascade and 'confidence' in item:
+                classifications[position]['confidence'] = item['confidence']
+        
+        return classifications
     
     def generate_email_response(self, email_data: Dict, classification: Dict) -> str:
-        response_prompt = f"""
-        You are Michael Sigamani's personal AI assistant. Generate a professional email response.
-
-        Original Email:
-        Subject: {email_data['subject']}
-        From: {email_data['sender']}
-        Body: {email_data['body']}
-
-        Email Classification:
-        Category: {classification['category']}
-        Priority: {classification['priority']}
-        Action: {classification['action_needed']}
-
-        Guidelines:
-        - Be professional and concise
-        - Match the tone of the original email
-        - If it's a meeting request, suggest alternative times
-        - If it's a question, provide helpful information
-        - If it's promotional/spam, politely decline
-        - Keep responses under 150 words
-        - Sign as "Michael" or "Best regards, Michael"
-
-        Generate a response:
-        """
-        
-        return self.generate_response(response_prompt)
+        prompt = build_reply_prompt(
+            email_data, classification, getattr(settings, 'reply_body_tokens', REPLY_BODY_TOKENS)
+        )
+        start = time.perf_counter()
+        response = self.generate_response(
+            prompt,
+            max_tokens=getattr(settings, 'reply_max_tokens', REPLY_MAX_TOKENS),
+            system=REPLY_SYSTEM_PROMPT,
+            model=self.model
+        )
+        latency = time.perf_counter() - start
+        self._record_prompt('reply', email_data, estimate_tokens(prompt), latency)
+        self._record_model('reply', self.model, latency)
+        return response
     
     def should_auto_respond(self, classification: Dict) -> bool:
         auto_respond_categories = ['promotional', 'newsletter', 'spam']
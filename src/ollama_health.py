@@ -0,0 +1,148 @@
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class OllamaHealth:
+    def __init__(self, ttl_seconds: float = 30.0, failure_threshold: int = 3,
+                 cooldown_seconds: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        
+        self.state = CLOSED
+        self.available: Optional[bool] = None
+        self.checked_at: Optional[float] = None
+        self.opened_at: Optional[float] = None
+        self.consecutive_failures = 0
+        
+        self.probe_count = 0
+        self.probe_latency_total = 0.0
+        self.probe_latency_max = 0.0
+        self.last_probe_latency: Optional[float] = None
+        self.availability_flips = 0
+        self.breaker_trips = 0
+        self.skipped_requests = 0
+        
+        self._lock = threading.Lock()
+    
+    def check(self, probe: Callable[[], object]) -> bool:
+        known = self._known_state()
+        if known is not None:
+            return known
+        
+        start = self.clock()
+        try:
+            probe()
+            healthy = True
+        except Exception:
+            healthy = False
+        
+        return self._record_probe(healthy, self.clock() - start)
+    
+    async def check_async(self, probe: Callable[[], Awaitable[object]]) -> bool:
+        known = self._known_state()
+        if known is not None:
+            return known
+        
+        start = self.clock()
+        try:
+            await probe()
+            healthy = True
+        except Exception:
+            healthy = False
+        
+        return self._record_probe(healthy, self.clock() - start)
+    
+    def _known_state(self) -> Optional[bool]:
+        with self._lock:
+            if self._breaker_blocks():
+                return False
+            if self.state == CLOSED and self._cache_fresh():
+                return self.available
+            return None
+    
+    def _record_probe(self, healthy: bool, latency: float) -> bool:
+        with self._lock:
+            self.probe_count += 1
+            self.probe_latency_total += latency
+            self.probe_latency_max = max(self.probe_latency_max, latency)
+            self.last_probe_latency = latency
+            self._record(healthy)
+        
+        return healthy
+    
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._breaker_blocks():
+                self.skipped_requests += 1
+                return False
+            return True
+    
+    def is_blocked(self) -> bool:
+        with self._lock:
+            return self._breaker_blocks()
+    
+    def record_success(self):
+        with self._lock:
+            self._record(True)
+    
+    def record_failure(self):
+        with self._lock:
+            self._record(False)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'available': self.available,
+                'consecutive_failures': self.consecutive_failures,
+                'probe_count': self.probe_count,
+                'probe_latency_avg': (
+                    self.probe_latency_total / self.probe_count if self.probe_count else None
+                ),
+                'probe_latency_max': self.probe_latency_max,
+                'probe_latency_last': self.last_probe_latency,
+                'availability_flips': self.availability_flips,
+                'breaker_trips': self.breaker_trips,
+                'skipped_requests': self.skipped_requests
+            }
+    
+    def _cache_fresh(self) -> bool:
+        return (
+            self.available is not None and
+            self.clock() - self.checked_at < self.ttl_seconds
+        )
+    
+    def _breaker_blocks(self) -> bool:
+        if self.state != OPEN:
+            return False
+        if self.clock() - self.opened_at < self.cooldown_seconds:
+            return True
+        # Cooldown over: let the next call through as a trial.
+        self.state = HALF_OPEN
+        return False
+    
+    def _record(self, healthy: bool):
+        now = self.clock()
+        if self.available is not None and self.available != healthy:
+            self.availability_flips += 1
+        self.available = healthy
+        self.checked_at = now
+        
+        if healthy:
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            return
+        
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.breaker_trips += 1
+            self.state = OPEN
+            self.opened_at = now
@@ -0,0 +1,188 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, TypeVar
+from src.ollama_health import OllamaHealth
+
+T = TypeVar('T')
+
+DEFAULT_PS_TTL_SECONDS = 30.0
+# Loading a model onto a host that does not have it costs roughly as much as
+# queueing behind this many requests on a host that already has it loaded.
+DEFAULT_COLD_HOST_PENALTY = 2
+
+
+def default_client_factory(host: str):
+    import ollama
+    return ollama.Client(host=host)
+
+
+def model_key(model: str) -> str:
+    return model if ':' in model else f"{model}:latest"
+
+
+class OllamaHost:
+    def __init__(self, host: str, client_factory: Callable[[str], object], health: OllamaHealth):
+        self.host = host
+        self.health = health
+        self.outstanding = 0
+        self.requests = 0
+        self.served = 0
+        self.failures = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.loaded_models: Set[str] = set()
+        self.warm_up_timings: Dict[str, Optional[float]] = {}
+        self.ps_checked_at: Optional[float] = None
+        self._client_factory = client_factory
+        self._client = None
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._client_factory(self.host)
+        return self._client
+    
+    def avg_latency(self) -> float:
+        return self.latency_total / self.served if self.served else 0.0
+    
+    def stats(self) -> Dict:
+        return {
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'served': self.served,
+            'failures': self.failures,
+            'avg_latency': self.avg_latency(),
+            'max_latency': self.latency_max,
+            'loaded_models': sorted(self.loaded_models),
+            'warm_up': dict(self.warm_up_timings),
+            'health': self.health.snapshot()
+        }
+
+
+class OllamaHostPool:
+    def __init__(self, hosts: List[str], client_factory: Callable[[str], object] = default_client_factory,
+                 health_factory: Callable[[], OllamaHealth] = OllamaHealth,
+                 ps_ttl_seconds: float = DEFAULT_PS_TTL_SECONDS,
+                 cold_host_penalty: int = DEFAULT_COLD_HOST_PENALTY,
+                 clock: Callable[[], float] = time.monotonic):
+        self.hosts = [OllamaHost(host, client_factory, health_factory()) for host in hosts]
+        self.ps_ttl_seconds = ps_ttl_seconds
+        self.cold_host_penalty = cold_host_penalty
+        self.clock = clock
+        self.failovers = 0
+        self._lock = threading.Lock()
+    
+    def is_available(self) -> bool:
+        # Probe every host so each one's cached health stays current.
+        return any([host.health.check(host.client.list) for host in self.hosts])
+    
+    def call(self, model: str, request: Callable[[object], T]) -> T:
+        import ollama
+        
+        tried = set()
+        error = None
+        while True:
+            host = self._acquire(model, tried)
+            if host is None:
+                raise error or ConnectionError("No healthy Ollama host available")
+            if error is not None:
+                with self._lock:
+                    self.failovers += 1
+            
+            start = self.clock()
+            try:
+                result = request(host.client)
+            except ollama.ResponseError:
+                # The host answered, so it is healthy even though the request failed.
+                self._release(host, model, self.clock() - start, healthy=True, served=False)
+                raise
+            except Exception as e:
+                self._release(host, model, self.clock() - start, healthy=False, served=False)
+                tried.add(host.host)
+                error = e
+                continue
+            
+            self._release(host, model, self.clock() - start, healthy=True, served=True)
+            return result
+    
+    def warm_up(self, model: str, load: Callable[[OllamaHost], Optional[float]]) -> Optional[float]:
+        # Hosts are loaded one at a time so an unreachable host does not stop the
+        # rest; hosts behind an open breaker are skipped and load on first use.
+        key = model_key(model)
+        loaded = []
+        for host in self.hosts:
+            if host.health.is_blocked():
+                continue
+            
+            seconds = load(host)
+            with self._lock:
+                host.warm_up_timings[key] = seconds
+                if seconds is not None:
+                    host.loaded_models.add(key)
+            if seconds is not None:
+                loaded.append(seconds)
+        
+        # The model is warm on every reachable host once the slowest one finishes.
+        return max(loaded) if loaded else None
+    
+    def _acquire(self, model: str, tried: Set[str]) -> Optional[OllamaHost]:
+        model = model_key(model)
+        candidates = [
+            host for host in self.hosts
+            if host.host not in tried and not host.health.is_blocked()
+        ]
+        for host in candidates:
+            self._refresh_loaded_models(host)
+        
+        with self._lock:
+            if not candidates:
+                return None
+            
+            host = min(candidates, key=lambda host: (
+                host.outstanding + (0 if model in host.loaded_models else self.cold_host_penalty),
+                host.avg_latency()
+            ))
+            host.outstanding += 1
+            return host
+    
+    def _release(self, host: OllamaHost, model: str, latency: float, healthy: bool, served: bool):
+        with self._lock:
+            host.outstanding -= 1
+            host.requests += 1
+            if not healthy:
+                host.failures += 1
+            if served:
+                host.served += 1
+                host.latency_total += latency
+                host.latency_max = max(host.latency_max, latency)
+                # Serving a request leaves the model loaded until keep_alive expires.
+                host.loaded_models.add(model_key(model))
+        
+        if healthy:
+            host.health.record_success()
+        else:
+            host.health.record_failure()
+    
+    def _refresh_loaded_models(self, host: OllamaHost):
+        now = self.clock()
+        if host.ps_checked_at is not None and now - host.ps_checked_at < self.ps_ttl_seconds:
+            return
+        
+        host.ps_checked_at = now
+        try:
+            response = host.client.ps()
+        except Exception as e:
+            print(f"Could not list loaded models on {host.host}: {e}")
+            host.health.record_failure()
+            return
+        
+        loaded = {model_key(entry['model']) for entry in response['models']}
+        with self._lock:
+            host.loaded_models = loaded
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'hosts': {host.host: host.stats() for host in self.hosts},
+                'failovers': self.failovers
+            }
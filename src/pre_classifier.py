@@ -0,0 +1,93 @@
+import re
+import threading
+from email.utils import parseaddr
+from typing import Dict, Iterable, Optional
+
+# Bulk-mail service domains that only ever send marketing or list traffic.
+DEFAULT_PROMOTIONAL_DOMAINS = (
+    'mailchimp.com', 'mcsv.net', 'mcdlv.net', 'rsgsv.net', 'list-manage.com',
+    'sendgrid.net', 'mailgun.org', 'sparkpostmail.com', 'exacttarget.com',
+    'mktomail.com', 'hubspotemail.net', 'cmail19.com', 'cmail20.com',
+    'createsend.com', 'klaviyomail.com', 'constantcontact.com'
+)
+
+NO_REPLY_SENDER = re.compile(
+    r'^(?:no[-_.]?reply|do[-_.]?not[-_.]?reply)(?:[+._-][^@]*)?@',
+    re.IGNORECASE
+)
+BULK_PRECEDENCE = re.compile(r'^\s*(?:bulk|list|junk)\s*$', re.IGNORECASE)
+
+
+def _classification(category: str) -> Dict:
+    return {
+        "category": category,
+        "priority": "low",
+        "requires_response": False,
+        "sentiment": "neutral",
+        "action_needed": "ignore"
+    }
+
+
+class PreClassifier:
+    def __init__(self, promotional_domains: Iterable[str] = DEFAULT_PROMOTIONAL_DOMAINS,
+                 automated_senders: Iterable[str] = ()):
+        self.promotional_domains = frozenset(domain.lower().strip('.') for domain in promotional_domains)
+        # Opt-in local parts such as 'notifications' or 'mailer-daemon'; bounces
+        # and alerts are left for the LLM unless they are listed here.
+        names = '|'.join(re.escape(name.lower()) for name in automated_senders)
+        self.automated_sender = re.compile(
+            rf'^(?:{names})(?:[+._-][^@]*)?@', re.IGNORECASE
+        ) if names else None
+        self.checked = 0
+        self.matched = 0
+        self.rule_hits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def classify(self, email_data: Dict) -> Optional[Dict]:
+        rule, category = self._match(email_data)
+        
+        with self._lock:
+            self.checked += 1
+            if rule:
+                self.matched += 1
+                self.rule_hits[rule] = self.rule_hits.get(rule, 0) + 1
+        
+        return _classification(category) if rule else None
+    
+    def _match(self, email_data: Dict):
+        headers = email_data.get('headers', {})
+        address = parseaddr(email_data.get('sender', ''))[1].lower()
+        
+        if 'CATEGORY_PROMOTIONS' in email_data.get('labels', []):
+            return 'gmail_promotions', 'promotional'
+        if self._is_promotional_domain(address):
+            return 'promotional_domain', 'promotional'
+        if 'list-unsubscribe' in headers or 'list-id' in headers:
+            return 'mailing_list', 'newsletter'
+        if BULK_PRECEDENCE.match(headers.get('precedence', '')):
+            return 'bulk_precedence', 'newsletter'
+        if headers.get('auto-submitted', 'no').strip().lower() != 'no':
+            return 'auto_submitted', 'newsletter'
+        if NO_REPLY_SENDER.match(address):
+            return 'no_reply_sender', 'newsletter'
+        if self.automated_sender and self.automated_sender.match(address):
+            return 'automated_sender', 'newsletter'
+        
+        return None, None
+    
+    def _is_promotional_domain(self, address: str) -> bool:
+        domain = address.rpartition('@')[2]
+        while domain:
+            if domain in self.promotional_domains:
+                return True
+            domain = domain.partition('.')[2]
+        return False
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "handled_by_rules": self.matched,
+                "handled_fraction": self.matched / self.checked if self.checked else 0.0,
+                "rule_hits": dict(self.rule_hits)
+            }
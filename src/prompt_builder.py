@@ -0,0 +1,106 @@
+import re
+from typing import Dict, List, Optional
+
+# Per-task budgets for the email body, in estimated tokens. Classification
+# only needs the gist; replies get enough of the latest message to answer it.
+CLASSIFICATION_BODY_TOKENS = 160
+REPLY_BODY_TOKENS = 800
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Everything from the first of these markers on is quoted history. A bare
+# "From:/Sent:" header block is not one: Gmail and Outlook forwards start
+# with it, and the forwarded message is usually the only real content.
+HISTORY_MARKERS = re.compile(
+    r"^(?:On\b[^\n]{0,200}(?:\n[^\n]{0,200})?\bwrote:[ \t]*$"
+    r"|-{2,}[ \t]*Original Message[ \t]*-{2,}"
+    r"|_{10,}[ \t]*\nFrom:)",
+    re.MULTILINE | re.IGNORECASE
+)
+FORWARDED_SUBJECT = re.compile(r"^\s*fwd?\s*:", re.IGNORECASE)
+SIGNATURE_DELIMITER = re.compile(r"^--[ \t]*$", re.MULTILINE)
+QUOTED_LINE = re.compile(r"^[ \t]*>.*$\n?", re.MULTILINE)
+MOBILE_FOOTER = re.compile(r"^(?:Sent from my [^\n]*|Get Outlook for [^\n]*)$", re.MULTILINE | re.IGNORECASE)
+BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly one token per four characters of a word, one per punctuation mark.
+    return sum((len(piece) + 2) // 4 or 1 for piece in TOKEN_PATTERN.findall(text))
+
+
+def fit_to_budget(text: str, max_tokens: Optional[int]) -> str:
+    if not max_tokens:
+        return text
+    
+    used = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        used += (len(match.group()) + 2) // 4 or 1
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + " ..."
+    return text
+
+
+def collapse_whitespace(text: str) -> str:
+    lines = (" ".join(line.split()) for line in text.split("\n"))
+    return BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def clean_body(body: str, forwarded: bool = False) -> str:
+    text = body.replace("\r\n", "\n")
+    
+    history = HISTORY_MARKERS.search(text)
+    if history and forwarded:
+        # In a forward the first separator opens the forwarded message; keep it.
+        history = HISTORY_MARKERS.search(text, history.end())
+    if history:
+        text = text[:history.start()]
+    
+    signature = SIGNATURE_DELIMITER.search(text)
+    if signature:
+        text = text[:signature.start()]
+    
+    text = MOBILE_FOOTER.sub("", QUOTED_LINE.sub("", text))
+    cleaned = collapse_whitespace(text)
+    
+    # A message that is nothing but quoted text is better sent as it is.
+    return cleaned or collapse_whitespace(body)
+
+
+def prepare_body(body: str, max_tokens: Optional[int], forwarded: bool = False) -> str:
+    return fit_to_budget(clean_body(body, forwarded), max_tokens)
+
+
+def is_forwarded(email_data: Dict) -> bool:
+    return bool(FORWARDED_SUBJECT.match(email_data.get('subject', '')))
+
+
+def build_classification_prompt(email_data: Dict, body_tokens: Optional[int] = CLASSIFICATION_BODY_TOKENS) -> str:
+    return (
+        f"Subject: {email_data['subject']}\n"
+        f"From: {email_data['sender']}\n"
+        f"Body: {prepare_body(email_data['body'], body_tokens, is_forwarded(email_data))}"
+    )
+
+
+def build_batch_classification_prompt(emails: List[Dict],
+                                      body_tokens: Optional[int] = CLASSIFICATION_BODY_TOKENS) -> str:
+    return "\n\n".join(
+        f"Email {number}:\n{build_classification_prompt(email_data, body_tokens)}"
+        for number, email_data in enumerate(emails, start=1)
+    )
+
+
+def build_reply_prompt(email_data: Dict, classification: Dict,
+                       body_tokens: Optional[int] = REPLY_BODY_TOKENS) -> str:
+    return (
+        "Original Email:\n"
+        f"Subject: {email_data['subject']}\n"
+        f"From: {email_data['sender']}\n"
+        f"Body: {prepare_body(email_data['body'], body_tokens, is_forwarded(email_data))}\n\n"
+        "Email Classification:\n"
+        f"Category: {classification['category']}\n"
+        f"Priority: {classification['priority']}\n"
+        f"Action: {classification['action_needed']}\n\n"
+        "Generate a response:"
+    )
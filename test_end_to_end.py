@@ -80,23 +80,30 @@ def run_end_to_end_test():
 
 def monitor_mode():
     """Continuous monitoring mode"""
+    from src.mailbox_daemon import MailboxDaemon, build_notification_source
+    
     print("\n🔄 Continuous Monitoring Mode")
     print("Press Ctrl+C to stop...")
     
     processor = EmailProcessor()
+    source = build_notification_source(processor.gmail_client)
+    
+    def report(trigger, result):
+        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Checked for new emails ({trigger})")
+        if result['processed'] > 0:
+            print(f"✅ Processed {result['processed']} emails, created {result['drafts_created']} drafts")
+        else:
+            print("📭 No new emails to process")
+    
+    daemon = MailboxDaemon(processor, source=source, poll_interval=60, on_cycle=report)
+    
+    if source:
+        print(f"Waiting for mailbox notifications ({type(source).__name__}), polling every 60 seconds as fallback...")
+    else:
+        print("Polling every 60 seconds...")
     
     try:
-        while True:
-            print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Checking for new emails...")
-            result = processor.process_emails()
-            
-            if result['processed'] > 0:
-                print(f"✅ Processed {result['processed']} emails, created {result['drafts_created']} drafts")
-            else:
-                print("📭 No new emails to process")
-            
-            print("Waiting 60 seconds...")
-            time.sleep(60)
+        daemon.run()
             
     except KeyboardInterrupt:
         print("\n\n👋 Monitoring stopped")
@@ -1,4 +1,6 @@
 import pytest
+import threading
+from collections import Counter, deque
 from unittest.mock import Mock, MagicMock
 import sys
 import os
@@ -52,19 +54,39 @@ def mock_gmail_service():
 def mock_gmail_client(mock_gmail_service):
     """Mock Gmail client with service"""
     from src.gmail_client import GmailClient
+    from src.gmail_quota import GmailRequestExecutor
     
     client = GmailClient.__new__(GmailClient)
     client.service = mock_gmail_service
+    client.history_id = None
+    client._pending_ids = {}
+    client.http_pool = None
+    client.executor = GmailRequestExecutor(sleep=lambda seconds: None)
     return client
 
 @pytest.fixture
 def mock_ollama_client():
     """Mock Ollama client"""
     from src.ollama_client import OllamaClient
+    from src.ollama_health import OllamaHealth
     
     client = OllamaClient.__new__(OllamaClient)
     client.client = Mock()
     client.model = "llama3:8b"
+    client.classification_model = "llama3:8b"
+    client.cascade = False
+    client.health = OllamaHealth()
+    client.pool = None
+    client.parse_stats = Counter()
+    client.prompt_log = deque(maxlen=1000)
+    client.model_stats = {}
+    client.routing_stats = Counter()
+    client._stats_lock = threading.Lock()
+    
+    client.keep_alive = "420s"
+    client.warm_up_stats = {}
+    client._warm_until = {}
+    client.warm_up = Mock(return_value={"llama3:8b": 0.0})
     
     # Mock is_available
     client.is_available = Mock(return_value=True)
@@ -87,6 +109,9 @@ def mock_ollama_client():
         "action_needed": "reply"
     })
     
+    # Mock classify_emails (batch) in terms of classify_email
+    client.classify_emails = Mock(side_effect=lambda emails: [client.classify_email(e) for e in emails])
+    
     # Mock generate_email_response
     client.generate_email_response = Mock(return_value="Thank you for your email. I'll be happy to help you schedule a meeting for next week. Could you please let me know your availability? Best regards, Michael")
     
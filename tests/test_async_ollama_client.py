@@ -0,0 +1,162 @@
+"""
+Tests for the asyncio OllamaClient: request slots, timeouts and cancellation
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import Mock, patch
+
+from src.async_ollama_client import AsyncOllamaClient
+from src.ollama_client import UNAVAILABLE_RESPONSE
+
+
+CLASSIFICATION = {"category": "work", "priority": "medium", "requires_response": True,
+                  "sentiment": "neutral", "action_needed": "reply"}
+
+
+class FakeStream:
+    def __init__(self, pieces, delay):
+        self.pieces = list(pieces)
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.pieces:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delay)
+        return {'message': {'content': self.pieces.pop(0)}}
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeAsyncOllama:
+    """Stands in for ollama.AsyncClient and tracks concurrent requests"""
+
+    def __init__(self, output=json.dumps(CLASSIFICATION), delay=0.01):
+        self.output = output
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.streams = []
+        self.calls = []
+
+    async def chat(self, **kwargs):
+        self.calls.append(kwargs)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        stream = FakeStream([self.output], self.delay)
+        self.streams.append(stream)
+        original_close = stream.aclose
+
+        async def aclose():
+            self.active -= 1
+            await original_close()
+
+        stream.aclose = aclose
+        return stream
+
+    async def list(self):
+        return {'models': []}
+
+
+@pytest.fixture
+def async_client():
+    client = AsyncOllamaClient()
+    client.client = FakeAsyncOllama()
+    return client
+
+
+class TestAsyncOllamaClient:
+    """Test AsyncOllamaClient against a fake ollama.AsyncClient"""
+
+    def test_in_flight_requests_are_capped(self, async_client):
+        """No more than max_in_flight requests reach the server at once"""
+        from config.settings import settings
+
+        with patch.object(settings, 'ollama_num_parallel', 2, create=True):
+            async_client = AsyncOllamaClient()
+        async_client.client = FakeAsyncOllama()
+        emails = [{'subject': f'Subject {i}', 'sender': 'a@example.com', 'body': ''} for i in range(6)]
+
+        results = asyncio.run(async_client.classify_emails(emails))
+
+        assert results == [CLASSIFICATION] * 6
+        assert async_client.client.peak == 2
+        assert async_client.get_request_stats()['completed'] == 6
+        assert async_client.get_request_stats()['in_flight'] == 0
+
+    def test_partial_classification_is_rejected(self, async_client):
+        """An object missing required fields falls back and is not cached"""
+        async_client.client = FakeAsyncOllama(output='{"category": "work"}')
+        async_client.classification_cache = Mock()
+        async_client.classification_cache.get.return_value = None
+        email = {'subject': 'Hello', 'sender': 'a@example.com', 'body': ''}
+
+        result = asyncio.run(async_client.classify_email(email))
+
+        assert result['action_needed'] == 'ignore'
+        async_client.classification_cache.put.assert_not_called()
+
+    def test_slow_request_times_out(self, async_client):
+        """A request exceeding its timeout returns the fallback and closes the stream"""
+        async_client.client.delay = 1.0
+
+        result = asyncio.run(async_client.generate_response("Hello", system="Be brief", timeout=0.01))
+
+        assert result == UNAVAILABLE_RESPONSE
+        assert async_client.get_request_stats()['timed_out'] == 1
+        assert async_client.client.streams[0].closed
+        assert async_client.health.consecutive_failures == 1
+
+    def test_cancellation_releases_slot(self, async_client):
+        """Cancelling a caller aborts its request, closes the stream and frees the slot"""
+        async_client.client.delay = 1.0
+
+        async def cancel_midway():
+            task = asyncio.ensure_future(async_client.generate_response("Hello", system="Be brief"))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_midway())
+
+        stats = async_client.get_request_stats()
+        assert stats['cancelled'] == 1
+        assert stats['in_flight'] == 0
+        assert async_client.client.streams[0].closed
+
+    def test_same_api_as_sync_client(self, async_client):
+        """classify_email / generate_email_response are awaitable; should_auto_respond is unchanged"""
+        classification = asyncio.run(async_client.classify_email(
+            {'subject': 'Hi', 'sender': 'a@example.com', 'body': 'Body'}
+        ))
+        async_client.client.output = "Thanks, Michael"
+        reply = asyncio.run(async_client.generate_email_response(
+            {'subject': 'Hi', 'sender': 'a@example.com', 'body': 'Body'}, classification
+        ))
+
+        assert classification == CLASSIFICATION
+        assert reply == "Thanks, Michael"
+        assert async_client.client.calls[-1]['model'] == async_client.model
+        assert async_client.should_auto_respond(classification) is False
+
+    def test_is_available_probes_asynchronously(self, async_client):
+        assert asyncio.run(async_client.is_available()) is True
+        assert async_client.health.probe_count == 1
+
+    def test_client_pools_one_connection_per_slot(self):
+        """The httpx pool behind ollama.AsyncClient is sized to the request slots"""
+        with patch('ollama.AsyncClient') as mock_client_class:
+            client = AsyncOllamaClient()
+            mock_client_class.assert_not_called()
+            client.client
+
+        limits = mock_client_class.call_args[1]['limits']
+        assert limits.max_connections == client.max_in_flight
+        assert limits.max_keepalive_connections == client.max_in_flight
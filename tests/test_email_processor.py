@@ -0,0 +1,395 @@
+"""
+Tests for EmailProcessor execution modes and processing features
+"""
+
+import pytest
+import threading
+import time
+from unittest.mock import Mock, patch
+
+
+def make_email(index):
+    return {
+        'id': f'email_{index}',
+        'thread_id': f'thread_{index}',
+        'subject': f'Subject {index}',
+        'sender': 'sender@example.com',
+        'date': 'Fri, 27 Jun 2025 09:10:25 +0100',
+        'body': 'Can you help me schedule a meeting for next week?',
+        'snippet': 'Can you help me schedule a meeting for next week?'
+    }
+
+
+@pytest.fixture
+def processor_factory(mock_gmail_client, mock_ollama_client):
+    """Builds an EmailProcessor around the mocked clients with settings overrides"""
+    from src.email_processor import EmailProcessor
+    from config.settings import settings
+
+    patches = []
+
+    def factory(**overrides):
+        for name, value in overrides.items():
+            setting_patch = patch.object(settings, name, value, create=True)
+            setting_patch.start()
+            patches.append(setting_patch)
+
+        with patch('src.email_processor.GmailClient', return_value=mock_gmail_client), \
+             patch('src.email_processor.OllamaClient', return_value=mock_ollama_client):
+            return EmailProcessor()
+
+    yield factory
+
+    for setting_patch in reversed(patches):
+        setting_patch.stop()
+
+
+class TestConcurrentPipeline:
+    """Test the worker-pool execution mode of process_emails"""
+
+    def test_parallel_counters_match_serial(self, processor_factory, mock_gmail_client):
+        """Worker pool produces the same summary as serial processing"""
+        emails = [make_email(i) for i in range(6)]
+        mock_gmail_client.get_unread_emails = Mock(return_value=emails)
+
+        serial = processor_factory(email_worker_count=1).process_emails()
+        parallel = processor_factory(email_worker_count=4).process_emails()
+
+        for key in ('processed', 'responded', 'drafts_created'):
+            assert serial[key] == parallel[key]
+        assert parallel['drafts_created'] == 6
+
+    def test_parallel_errors_are_isolated(self, processor_factory, mock_gmail_client, mock_ollama_client):
+        """A failing email does not abort the other workers"""
+        emails = [make_email(i) for i in range(4)]
+        mock_gmail_client.get_unread_emails = Mock(return_value=emails)
+
+        def classify(email):
+            if email['id'] == 'email_2':
+                raise RuntimeError("model crashed")
+            return {"category": "work", "priority": "medium", "requires_response": False,
+                    "sentiment": "neutral", "action_needed": "acknowledge"}
+
+        mock_ollama_client.classify_email.side_effect = classify
+
+        result = processor_factory(email_worker_count=4).process_emails()
+
+        assert result['processed'] == 3
+
+    def test_ollama_concurrency_is_capped(self, processor_factory, mock_gmail_client, mock_ollama_client):
+        """No more than ollama_max_concurrency inference calls run at once"""
+        emails = [make_email(i) for i in range(8)]
+        mock_gmail_client.get_unread_emails = Mock(return_value=emails)
+
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'peak': 0}
+
+        def slow_classify(email):
+            with lock:
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+            time.sleep(0.02)
+            with lock:
+                state['in_flight'] -= 1
+            return {"category": "newsletter", "priority": "low", "requires_response": False,
+                    "sentiment": "neutral", "action_needed": "ignore"}
+
+        mock_ollama_client.classify_email.side_effect = slow_classify
+
+        result = processor_factory(email_worker_count=8, ollama_max_concurrency=2,
+                                   classification_batch_size=1).process_emails()
+
+        assert result['processed'] == 8
+        assert state['peak'] == 2
+
+
+class TestDurableJobs:
+    """Test crash-safe resumption through the job store"""
+
+    @pytest.fixture
+    def store_path(self, tmp_path):
+        return str(tmp_path / 'state' / 'jobs.db')
+
+    def test_crash_before_draft_resumes_without_inference(self, processor_factory, mock_gmail_client,
+                                                          mock_ollama_client, store_path):
+        """A restart after generation reuses the stored reply"""
+        email = make_email(1)
+        mock_gmail_client.get_unread_emails = Mock(return_value=[email])
+        mock_gmail_client.create_draft_reply = Mock(side_effect=RuntimeError("process killed"))
+
+        first = processor_factory(job_store_file=store_path)
+        assert first.process_emails()['processed'] == 0
+        first.job_store.close()
+
+        mock_gmail_client.create_draft_reply = Mock(return_value=True)
+        second = processor_factory(job_store_file=store_path)
+        result = second.process_emails()
+
+        assert result['drafts_created'] == 1
+        assert mock_ollama_client.classify_email.call_count == 1
+        assert mock_ollama_client.generate_email_response.call_count == 1
+        mock_gmail_client.create_draft_reply.assert_called_once_with(
+            email, mock_ollama_client.generate_email_response.return_value
+        )
+
+    def test_crash_after_draft_does_not_duplicate(self, processor_factory, mock_gmail_client,
+                                                  mock_ollama_client, store_path):
+        """A restart after drafting only retries the acknowledgement"""
+        mock_gmail_client.get_unread_emails = Mock(return_value=[make_email(1)])
+        mock_gmail_client.create_draft_reply = Mock(return_value=True)
+        mock_gmail_client.mark_many_as_read = Mock(side_effect=RuntimeError("process killed"))
+
+        first = processor_factory(job_store_file=store_path)
+        first.process_emails()
+        first.job_store.close()
+
+        mock_gmail_client.mark_many_as_read = Mock(return_value={'email_1': True})
+        second = processor_factory(job_store_file=store_path)
+        result = second.process_emails()
+
+        assert result['drafts_created'] == 1
+        assert mock_gmail_client.create_draft_reply.call_count == 1
+        mock_gmail_client.mark_many_as_read.assert_called_once_with(['email_1'])
+        assert second.job_store.get('email_1')['stage'] == 'acknowledged'
+
+    def test_acknowledged_email_is_not_reprocessed(self, processor_factory, mock_gmail_client,
+                                                   mock_ollama_client, store_path):
+        """An email that reappears after acknowledgement returns its stored result"""
+        mock_gmail_client.get_unread_emails = Mock(return_value=[make_email(1)])
+        processor = processor_factory(job_store_file=store_path)
+
+        processor.process_emails()
+        result = processor.process_emails()
+
+        assert result['drafts_created'] == 1
+        assert mock_ollama_client.generate_email_response.call_count == 1
+
+
+class TestBatchedAcknowledgement:
+    """Test buffering of mark-as-read calls into batchModify requests"""
+
+    def test_cycle_marks_all_emails_read_in_one_call(self, processor_factory, mock_gmail_client):
+        """A cycle ends with a single batchModify covering every processed email"""
+        mock_gmail_client.get_unread_emails = Mock(return_value=[make_email(i) for i in range(5)])
+        messages = mock_gmail_client.service.users().messages()
+
+        processor_factory().process_emails()
+
+        messages.batchModify.assert_called_once_with(
+            userId='me',
+            body={'ids': [f'email_{i}' for i in range(5)], 'removeLabelIds': ['UNREAD']}
+        )
+        messages.modify.assert_not_called()
+
+    def test_buffer_flushes_on_size_and_age(self):
+        """The buffer flushes once it is full or its oldest entry is too old"""
+        from src.acknowledgement_buffer import AcknowledgementBuffer
+
+        now = [0.0]
+        flushed = []
+        buffer = AcknowledgementBuffer(
+            lambda ids: flushed.append(ids) or dict.fromkeys(ids, True),
+            max_size=3, max_age_seconds=10, clock=lambda: now[0]
+        )
+
+        for message_id in ('a', 'b', 'c'):
+            buffer.add(message_id)
+        assert flushed == [['a', 'b', 'c']]
+
+        buffer.add('d')
+        now[0] = 11.0
+        buffer.add('e')
+        assert flushed[-1] == ['d', 'e']
+        assert buffer.stats() == {'pending': 0, 'flushes': 2, 'acknowledged': 5, 'failed': 0}
+
+    def test_only_acknowledged_emails_are_recorded(self, processor_factory, mock_gmail_client, tmp_path):
+        """Emails whose flush failed stay unacknowledged in the job store"""
+        mock_gmail_client.get_unread_emails = Mock(return_value=[make_email(1), make_email(2)])
+        mock_gmail_client.create_draft_reply = Mock(return_value=True)
+        mock_gmail_client.mark_many_as_read = Mock(return_value={'email_1': True, 'email_2': False})
+
+        processor = processor_factory(job_store_file=str(tmp_path / 'jobs.db'))
+        result = processor.process_emails()
+
+        assert result['drafts_created'] == 2
+        assert processor.job_store.get('email_1')['stage'] == 'acknowledged'
+        assert processor.job_store.get('email_2')['stage'] == 'drafted'
+
+
+class TestBatchedReplies:
+    """Test delivering a cycle's replies through one batch submission"""
+
+    def test_replies_are_submitted_together(self, processor_factory, mock_gmail_client,
+                                            mock_ollama_client, tmp_path):
+        """All drafts of a cycle go out in a single submit_replies call"""
+        mock_gmail_client.get_unread_emails = Mock(return_value=[make_email(i) for i in range(3)])
+        mock_gmail_client.submit_replies = Mock(side_effect=lambda replies: {e['id']: True for e, _, _ in replies})
+        mock_gmail_client.create_draft_reply = Mock(return_value=True)
+
+        processor = processor_factory(gmail_batch_replies=True, job_store_file=str(tmp_path / 'jobs.db'))
+        result = processor.process_emails()
+
+        assert result['drafts_created'] == 3
+        mock_gmail_client.submit_replies.assert_called_once()
+        mock_gmail_client.create_draft_reply.assert_not_called()
+        assert processor.job_store.get('email_0')['stage'] == 'acknowledged'
+
+    def test_failed_send_falls_back_to_draft(self, processor_factory, mock_gmail_client, mock_ollama_client):
+        """A reply that could not be sent is resubmitted as a draft"""
+        mock_gmail_client.get_unread_emails = Mock(return_value=[make_email(1)])
+        mock_gmail_client.submit_replies = Mock(side_effect=[{'email_1': False}, {'email_1': True}])
+        mock_ollama_client.should_auto_respond = Mock(return_value=True)
+
+        processor = processor_factory(gmail_batch_replies=True, auto_send_responses=True)
+        result = processor.process_emails()
+
+        assert result['drafts_created'] == 1
+        assert result['responded'] == 0
+        sends = [call.args[0][0][2] for call in mock_gmail_client.submit_replies.call_args_list]
+        assert sends == [True, False]
+
+
+class TestLazyBodies:
+    """Test that only emails headed for the LLM download their body"""
+
+    def test_rule_classified_email_body_is_never_fetched(self, processor_factory, mock_gmail_client,
+                                                         mock_ollama_client):
+        """Bulk mail handled by rules is processed from metadata alone"""
+        from src.gmail_client import LazyEmail
+
+        loader = Mock(return_value='Full body')
+        bulk = LazyEmail(make_email(1), loader=loader)
+        personal = LazyEmail(make_email(2), loader=loader)
+        del bulk['body'], personal['body']
+        bulk['headers'] = {'list-unsubscribe': '<mailto:unsubscribe@example.com>'}
+        mock_gmail_client.get_unread_emails = Mock(return_value=[bulk, personal])
+        mock_gmail_client.load_bodies = Mock()
+
+        processor_factory().process_emails()
+
+        mock_gmail_client.load_bodies.assert_called_once_with([personal])
+        assert 'body' not in bulk
+
+    def test_email_without_body_is_left_for_next_cycle(self, processor_factory, mock_gmail_client,
+                                                       mock_ollama_client):
+        """An email whose body cannot be downloaded is neither classified nor marked read"""
+        from src.gmail_client import LazyEmail
+
+        failing = LazyEmail(make_email(1), loader=Mock(return_value=None))
+        del failing['body']
+        mock_gmail_client.get_unread_emails = Mock(return_value=[failing, make_email(2)])
+        mock_gmail_client.load_bodies = Mock()
+        mock_gmail_client.mark_many_as_read = Mock(side_effect=lambda ids: dict.fromkeys(ids, True))
+        mock_gmail_client.mark_as_read = Mock(return_value=True)
+
+        result = processor_factory().process_emails()
+
+        assert result['processed'] == 1
+        classified = [call.args[0]['id'] for call in mock_ollama_client.classify_email.call_args_list]
+        assert classified == ['email_2']
+        marked = [call.args[0] for call in mock_gmail_client.mark_many_as_read.call_args_list]
+        marked += [[call.args[0]] for call in mock_gmail_client.mark_as_read.call_args_list]
+        assert all('email_1' not in ids for ids in marked)
+
+
+class TestEmbeddingClassification:
+    """Test the nearest-neighbour classifier in front of the LLM"""
+
+    def test_repeated_pattern_skips_llm(self, processor_factory, mock_gmail_client, mock_ollama_client,
+                                        tmp_path):
+        """Labels from one cycle answer similar mail in the next without a generative call"""
+        mock_ollama_client.embed = Mock(side_effect=lambda texts, model: [[1.0, 0.0] for _ in texts])
+        processor = processor_factory(embedding_index_file=str(tmp_path / 'embeddings.npy'),
+                                      embedding_neighbours=1)
+
+        mock_gmail_client.get_unread_emails = Mock(return_value=[make_email(1)])
+        processor.process_emails()
+        assert mock_ollama_client.classify_email.call_count == 1
+
+        mock_gmail_client.get_unread_emails = Mock(return_value=[make_email(2), make_email(3)])
+        processor.process_emails()
+
+        assert mock_ollama_client.classify_email.call_count == 1
+        assert processor.get_processing_stats()['embedding_index']['hits'] == 2
+
+    def test_disabled_by_default(self, processor_factory):
+        assert processor_factory().embedding_classifier is None
+
+
+class TestWarmUp:
+    """Test the background model warm-up started with the processor"""
+
+    def test_models_are_warmed_before_first_classification(self, processor_factory, mock_gmail_client,
+                                                           mock_ollama_client):
+        order = []
+        mock_ollama_client.warm_up = Mock(side_effect=lambda: order.append('warm_up') or {})
+        mock_ollama_client.classify_email.side_effect = lambda email: order.append('classify') or {
+            "category": "work", "priority": "medium", "requires_response": False,
+            "sentiment": "neutral", "action_needed": "acknowledge"
+        }
+        mock_gmail_client.get_unread_emails = Mock(return_value=[make_email(1)])
+
+        processor_factory().process_emails()
+
+        assert order == ['warm_up', 'classify']
+
+    def test_warm_up_skipped_when_ollama_is_down(self, processor_factory, mock_ollama_client):
+        mock_ollama_client.is_available.return_value = False
+
+        processor = processor_factory()
+        processor._wait_for_warm_up()
+
+        mock_ollama_client.warm_up.assert_not_called()
+
+    def test_warm_up_can_be_disabled(self, processor_factory, mock_ollama_client):
+        processor = processor_factory(ollama_warm_up=False)
+
+        assert processor._warm_up_thread is None
+        mock_ollama_client.warm_up.assert_not_called()
+
+
+class TestJobStore:
+    """Test batched and durable commits of the job store"""
+
+    def test_inference_stages_commit_in_batches(self, tmp_path):
+        import sqlite3
+        from src.job_store import JobStore, CLASSIFIED, DRAFTED
+
+        path = str(tmp_path / 'jobs.db')
+        store = JobStore(path, commit_every=3, commit_interval=3600)
+        reader = sqlite3.connect(path)
+
+        def committed_stage(message_id):
+            row = reader.execute('SELECT stage FROM jobs WHERE message_id = ?', (message_id,)).fetchone()
+            return row[0] if row else None
+
+        store.record('a', CLASSIFIED, classification={'category': 'work'})
+        assert committed_stage('a') is None
+
+        store.record('b', DRAFTED, durable=True)
+        assert committed_stage('a') == CLASSIFIED
+        assert committed_stage('b') == DRAFTED
+
+        store.record('c', CLASSIFIED, classification={'category': 'work'})
+        store.flush()
+        assert committed_stage('c') == CLASSIFIED
+
+        reader.close()
+        store.close()
+
+    def test_later_stages_keep_earlier_results(self, tmp_path):
+        from src.job_store import JobStore, CLASSIFIED, GENERATED, ACKNOWLEDGED
+
+        store = JobStore(str(tmp_path / 'jobs.db'))
+        store.record('a', CLASSIFIED, classification={'category': 'work'})
+        store.record('a', GENERATED, response='Hello')
+        store.record('a', ACKNOWLEDGED, result={'action': 'draft_created'})
+
+        job = store.get('a')
+        assert job == {
+            'stage': ACKNOWLEDGED,
+            'classification': {'category': 'work'},
+            'response': 'Hello',
+            'result': {'action': 'draft_created'}
+        }
+        store.close()
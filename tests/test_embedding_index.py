@@ -0,0 +1,122 @@
+"""
+Tests for the embedding index and nearest-neighbour classifier
+"""
+
+import pytest
+from unittest.mock import Mock
+
+from src.embedding_index import EmbeddingIndex
+from src.embedding_classifier import EmbeddingClassifier, embedding_text
+
+
+WORK = {"category": "work", "priority": "medium", "requires_response": True,
+        "sentiment": "neutral", "action_needed": "reply"}
+NEWSLETTER = {"category": "newsletter", "priority": "low", "requires_response": False,
+              "sentiment": "neutral", "action_needed": "ignore"}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return EmbeddingIndex(str(tmp_path / 'index' / 'embeddings.npy'), 'nomic-embed-text',
+                          max_entries=4, neighbours=3, min_similarity=0.9)
+
+
+class TestEmbeddingIndex:
+    """Test the memory-mapped cosine-similarity index"""
+
+    def test_majority_of_similar_neighbours_wins(self, index):
+        """The label held by most of the k nearest, similar neighbours is returned"""
+        index.add([1.0, 0.0, 0.0], NEWSLETTER)
+        index.add([0.99, 0.05, 0.0], NEWSLETTER)
+        index.add([0.98, 0.0, 0.1], WORK)
+
+        assert index.query([2.0, 0.0, 0.0]) == NEWSLETTER
+        assert index.stats()['hits'] == 1
+
+    def test_dissimilar_neighbours_do_not_vote(self, index):
+        """Without a majority of similar neighbours the lookup misses"""
+        index.add([1.0, 0.0, 0.0], NEWSLETTER)
+        index.add([0.0, 1.0, 0.0], NEWSLETTER)
+        index.add([0.0, 0.0, 1.0], NEWSLETTER)
+
+        assert index.query([1.0, 0.0, 0.0]) is None
+        assert index.stats()['misses'] == 1
+
+    def test_empty_index_misses(self, index):
+        assert index.query([1.0, 0.0, 0.0]) is None
+
+    def test_oldest_entry_is_overwritten_when_full(self, index):
+        """The index keeps at most max_entries vectors"""
+        index.add([0.0, 1.0, 0.0], WORK)
+        for _ in range(4):
+            index.add([1.0, 0.0, 0.0], NEWSLETTER)
+
+        assert len(index) == 4
+        assert index.query([0.0, 1.0, 0.0]) is None
+
+    def test_flushed_index_is_reloaded(self, index):
+        """Vectors and labels survive a restart once flushed"""
+        index.add([1.0, 0.0, 0.0], NEWSLETTER)
+        index.add([0.0, 1.0, 0.0], WORK)
+        index.flush()
+
+        reopened = EmbeddingIndex(index.path, 'nomic-embed-text', max_entries=4, neighbours=1)
+
+        assert len(reopened) == 2
+        assert reopened.query([0.0, 1.0, 0.0]) == WORK
+
+    def test_model_change_discards_index(self, index):
+        """Vectors from another embedding model are never compared"""
+        index.add([1.0, 0.0, 0.0], NEWSLETTER)
+        index.flush()
+
+        reopened = EmbeddingIndex(index.path, 'mxbai-embed-large', max_entries=4)
+
+        assert len(reopened) == 0
+
+
+class TestEmbeddingClassifier:
+    """Test the embedding lookup in front of the generative classifier"""
+
+    @pytest.fixture
+    def ollama_client(self):
+        client = Mock()
+        client.embed = Mock(side_effect=lambda texts, model: [[1.0, 0.0, 0.0] for _ in texts])
+        client.classify_email = Mock(return_value=NEWSLETTER)
+        return client
+
+    def test_miss_falls_back_to_classify_email_and_learns(self, index, ollama_client):
+        """A miss is classified by the LLM and the result is added to the index"""
+        classifier = EmbeddingClassifier(ollama_client, index)
+        email = {'id': 'a', 'subject': 'Digest', 'sender': 'news@example.com', 'snippet': 'Top stories'}
+
+        assert classifier.classify(email) == NEWSLETTER
+        assert classifier.classify(dict(email, id='b')) == NEWSLETTER
+
+        assert ollama_client.classify_email.call_count == 1
+        assert len(index) == 1
+
+    def test_only_missed_emails_are_learned(self, index, ollama_client):
+        """Emails the index never looked up, and failed classifications, are not learned"""
+        classifier = EmbeddingClassifier(ollama_client, index)
+        emails = [{'id': 'a', 'subject': 'One'}, {'id': 'b', 'subject': 'Two'}]
+
+        classifier.lookup_many(emails)
+        classifier.learn(emails[0], dict(WORK, category='unknown'))
+        classifier.learn({'id': 'rules'}, NEWSLETTER)
+        classifier.learn(emails[1], WORK)
+
+        assert len(index) == 1
+
+    def test_embedding_failure_misses(self, index, ollama_client):
+        """When Ollama cannot embed, every email falls through to the LLM"""
+        ollama_client.embed = Mock(return_value=None)
+        classifier = EmbeddingClassifier(ollama_client, index)
+
+        assert classifier.lookup_many([{'id': 'a'}, {'id': 'b'}]) == [None, None]
+
+    def test_embedding_text_uses_metadata_only(self):
+        text = embedding_text({'subject': 'Hi', 'sender': 'a@example.com', 'snippet': 'Hello', 'body': 'Secret'})
+
+        assert 'Hi' in text and 'a@example.com' in text and 'Hello' in text
+        assert 'Secret' not in text
@@ -53,7 +53,7 @@ class TestEndToEndWorkflow:
             mock_gmail_client.service.users().drafts().create.assert_called()
             
             # 5. Gmail should mark email as read
-            mock_gmail_client.service.users().messages().modify.assert_called()
+            mock_gmail_client.service.users().messages().batchModify.assert_called()
             
             # Verify results
             assert result['processed'] > 0
@@ -89,7 +89,7 @@ class TestEndToEndWorkflow:
             mock_gmail_client.service.users().drafts().create.assert_called()
             
             # Should mark as read
-            mock_gmail_client.service.users().messages().modify.assert_called()
+            mock_gmail_client.service.users().messages().batchModify.assert_called()
             
             assert result['drafts_created'] > 0
     
@@ -122,7 +122,7 @@ class TestEndToEndWorkflow:
             mock_gmail_client.service.users().drafts().create.assert_not_called()
             
             # Should still mark as read
-            mock_gmail_client.service.users().messages().modify.assert_called()
+            mock_gmail_client.service.users().messages().batchModify.assert_called()
             
             assert result['drafts_created'] == 0
     
@@ -143,7 +143,7 @@ class TestEndToEndWorkflow:
             
             # Should still process emails (mark as read only)
             mock_gmail_client.service.users().messages().list.assert_called()
-            mock_gmail_client.service.users().messages().modify.assert_called()
+            mock_gmail_client.service.users().messages().batchModify.assert_called()
             
             # Should not attempt AI processing
             mock_ollama_client.classify_email.assert_not_called()
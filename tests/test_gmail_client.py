@@ -0,0 +1,429 @@
+"""
+Tests for GmailClient fetch and write paths
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from googleapiclient.errors import HttpError
+
+
+def make_api_message(message_id):
+    return {
+        'id': message_id,
+        'threadId': f'thread_{message_id}',
+        'snippet': f'Snippet {message_id}',
+        'payload': {
+            'mimeType': 'text/plain',
+            'headers': [
+                {'name': 'Subject', 'value': f'Subject {message_id}'},
+                {'name': 'From', 'value': 'sender@example.com'},
+                {'name': 'Date', 'value': 'Fri, 27 Jun 2025 09:10:25 +0100'}
+            ],
+            'body': {'data': 'SGVsbG8='}  # "Hello"
+        }
+    }
+
+
+class FakeBatch:
+    """Minimal BatchHttpRequest stand-in that answers sub-requests from a dict
+
+    A list value answers successive batches with successive items.
+    """
+
+    def __init__(self, callback, responses, batches):
+        self.callback = callback
+        self.responses = responses
+        self.request_ids = []
+        batches.append(self)
+
+    def add(self, request, request_id=None):
+        self.request_ids.append(request_id)
+
+    def execute(self):
+        for request_id in self.request_ids:
+            response = self.responses.get(request_id)
+            if isinstance(response, list):
+                response = response.pop(0)
+            if isinstance(response, Exception):
+                self.callback(request_id, None, response)
+            else:
+                self.callback(request_id, response, None)
+
+
+def http_error(status):
+    return HttpError(Mock(status=status, reason='error'), b'{}')
+
+
+@pytest.fixture
+def batch_gmail_client(mock_gmail_client):
+    """Gmail client whose service answers HTTP batches from `client.batch_responses`"""
+    client = mock_gmail_client
+    client.batch_responses = {}
+    client.batches = []
+    client.service.new_batch_http_request.side_effect = (
+        lambda callback=None: FakeBatch(callback, client.batch_responses, client.batches)
+    )
+    return client
+
+
+class TestBatchFetch:
+    """Test batched retrieval of message details"""
+
+    def test_batch_fetch_preserves_order_and_shape(self, batch_gmail_client):
+        """Batched fetch returns the same email dicts as get_email_details"""
+        ids = ['a', 'b', 'c']
+        batch_gmail_client.batch_responses.update({i: make_api_message(i) for i in ids})
+
+        emails = batch_gmail_client.get_emails_details(ids)
+
+        assert [email['id'] for email in emails] == ids
+        assert emails[0] == {
+            'id': 'a',
+            'thread_id': 'thread_a',
+            'subject': 'Subject a',
+            'sender': 'sender@example.com',
+            'date': 'Fri, 27 Jun 2025 09:10:25 +0100',
+            'body': 'Hello',
+            'snippet': 'Snippet a',
+            'labels': [],
+            'headers': {}
+        }
+        assert len(batch_gmail_client.batches) == 1
+
+    def test_batches_are_chunked(self, batch_gmail_client):
+        """Message ids are split into batches of gmail_fetch_batch_size"""
+        ids = [f'm{i}' for i in range(7)]
+        batch_gmail_client.batch_responses.update({i: make_api_message(i) for i in ids})
+
+        with patch('src.gmail_client.settings') as mock_settings:
+            mock_settings.gmail_fetch_batch_size = 3
+            mock_settings.gmail_body_max_bytes = 16384
+            mock_settings.gmail_batch_retries = 2
+            emails = batch_gmail_client.get_emails_details(ids)
+
+        assert len(emails) == 7
+        assert [len(b.request_ids) for b in batch_gmail_client.batches] == [3, 3, 1]
+
+    def test_failed_sub_request_is_isolated(self, batch_gmail_client):
+        """A failing message is skipped without losing the rest of the batch"""
+        batch_gmail_client.batch_responses.update({
+            'a': make_api_message('a'),
+            'b': http_error(404),
+            'c': make_api_message('c')
+        })
+
+        emails = batch_gmail_client.get_emails_details(['a', 'b', 'c'])
+
+        assert [email['id'] for email in emails] == ['a', 'c']
+
+    def test_throttled_sub_requests_are_retried(self, batch_gmail_client):
+        """Rate-limited messages are resubmitted in a later batch and counted"""
+        batch_gmail_client.batch_responses.update({
+            'a': make_api_message('a'),
+            'b': [http_error(429), make_api_message('b')],
+            'c': [http_error(503), make_api_message('c')]
+        })
+
+        with patch('src.gmail_client.settings') as mock_settings:
+            mock_settings.gmail_fetch_batch_size = 50
+            mock_settings.gmail_body_max_bytes = 16384
+            mock_settings.gmail_batch_retries = 2
+            mock_settings.gmail_batch_retry_delay = 0
+            emails = batch_gmail_client.get_emails_details(['a', 'b', 'c'])
+
+        assert [email['id'] for email in emails] == ['a', 'b', 'c']
+        assert [batch.request_ids for batch in batch_gmail_client.batches] == [['a', 'b', 'c'], ['b', 'c']]
+        stats = batch_gmail_client.get_quota_stats()
+        assert stats['rate_limited'] == 1
+        assert stats['server_errors'] == 1
+        assert stats['retries'] == 2
+
+    def test_still_throttled_messages_are_fetched_individually(self, batch_gmail_client):
+        """Messages throttled on every batch attempt fall back to single gets"""
+        batch_gmail_client.batch_responses.update({
+            'test_email_1': [http_error(429), http_error(429)]
+        })
+
+        with patch('src.gmail_client.settings') as mock_settings:
+            mock_settings.gmail_fetch_batch_size = 50
+            mock_settings.gmail_body_max_bytes = 16384
+            mock_settings.gmail_batch_retries = 1
+            mock_settings.gmail_batch_retry_delay = 0
+            emails = batch_gmail_client.get_emails_details(['test_email_1'])
+
+        assert [email['id'] for email in emails] == ['test_email_1']
+        assert emails[0]['subject'] == 'Test Email for AI Assistant'
+        assert batch_gmail_client.get_quota_stats()['rate_limited'] == 2
+
+    def test_failed_batch_falls_back_to_single_gets(self, mock_gmail_client):
+        """If the whole batch request fails, messages are fetched individually"""
+        batch = Mock()
+        batch.execute.side_effect = http_error(500)
+        mock_gmail_client.service.new_batch_http_request.return_value = batch
+
+        emails = mock_gmail_client.get_emails_details(['test_email_1', 'test_email_2'])
+
+        assert [email['id'] for email in emails] == ['test_email_1', 'test_email_2']
+        assert emails[0]['subject'] == 'Test Email for AI Assistant'
+
+
+def make_reply(message_id, send=False):
+    email = {'id': message_id, 'thread_id': f'thread_{message_id}',
+             'sender': 'sender@example.com', 'subject': f'Subject {message_id}'}
+    return email, f'Reply to {message_id}', send
+
+
+class TestBatchReplies:
+    """Test batched draft creation and sending"""
+
+    def test_results_map_back_to_each_email(self, batch_gmail_client):
+        """One batch carries drafts and sends, and callbacks map results per email"""
+        batch_gmail_client.batch_responses.update({'a': {'id': 'draft_a'}, 'b': {'id': 'sent_b'}})
+        messages = batch_gmail_client.service.users().messages()
+        drafts = batch_gmail_client.service.users().drafts()
+
+        results = batch_gmail_client.submit_replies([make_reply('a'), make_reply('b', send=True)])
+
+        assert results == {'a': True, 'b': True}
+        assert len(batch_gmail_client.batches) == 1
+        assert drafts.create.call_args.kwargs['body']['message']['threadId'] == 'thread_a'
+        assert messages.send.call_args.kwargs['body']['threadId'] == 'thread_b'
+
+    def test_only_failed_sub_requests_are_retried(self, batch_gmail_client):
+        """Throttled sub-requests are resubmitted, rejected ones are not"""
+        batch_gmail_client.batch_responses.update({
+            'a': {'id': 'draft_a'},
+            'b': [http_error(429), {'id': 'draft_b'}],
+            'c': http_error(400)
+        })
+
+        with patch('src.gmail_client.settings') as mock_settings:
+            mock_settings.gmail_batch_retries = 2
+            mock_settings.gmail_batch_retry_delay = 0
+            results = batch_gmail_client.submit_replies([make_reply(i) for i in 'abc'])
+
+        assert results == {'a': True, 'b': True, 'c': False}
+        assert [batch.request_ids for batch in batch_gmail_client.batches] == [['a', 'b', 'c'], ['b']]
+
+    def test_unanswered_replies_fall_back_to_single_calls(self, mock_gmail_client):
+        """If the batch itself fails, each reply is submitted individually"""
+        batch = Mock()
+        batch.execute.side_effect = http_error(500)
+        mock_gmail_client.service.new_batch_http_request.return_value = batch
+        mock_gmail_client.create_draft_reply = Mock(return_value=True)
+
+        results = mock_gmail_client.submit_replies([make_reply('a'), make_reply('b')])
+
+        assert results == {'a': True, 'b': True}
+        assert mock_gmail_client.create_draft_reply.call_count == 2
+
+
+@pytest.fixture
+def incremental_settings():
+    with patch('src.gmail_client.settings') as mock_settings:
+        mock_settings.gmail_incremental_sync = True
+        mock_settings.gmail_fetch_batch_size = 1
+        yield mock_settings
+
+
+class TestIncrementalSync:
+    """Test historyId-based incremental mailbox sync"""
+
+    def test_first_sync_lists_unread_and_stores_history_id(self, mock_gmail_client, incremental_settings):
+        """Without a cursor the client does a full listing and records historyId"""
+        service = mock_gmail_client.service
+        service.users().getProfile.return_value.execute.return_value = {'historyId': '100'}
+
+        emails = mock_gmail_client.get_unread_emails(max_results=10)
+
+        assert [email['id'] for email in emails] == ['test_email_1', 'test_email_2']
+        assert mock_gmail_client.history_id == '100'
+        service.users().history().list.assert_not_called()
+
+    def test_quiet_mailbox_skips_listing(self, mock_gmail_client, incremental_settings):
+        """With a cursor and no history, no search or message fetch is made"""
+        service = mock_gmail_client.service
+        mock_gmail_client.history_id = '100'
+        service.users().history().list.return_value.execute.return_value = {'historyId': '100'}
+
+        emails = mock_gmail_client.get_unread_emails(max_results=10)
+
+        assert emails == []
+        service.users().messages().list.assert_not_called()
+        service.users().messages().get.assert_not_called()
+
+    def test_history_adds_and_removes_pending_messages(self, mock_gmail_client, incremental_settings):
+        """Added unread messages are queued; ones marked read are dropped"""
+        service = mock_gmail_client.service
+        mock_gmail_client.history_id = '100'
+        mock_gmail_client._pending_ids = dict.fromkeys(['old_unread', 'read_elsewhere'])
+        service.users().history().list.return_value.execute.return_value = {
+            'historyId': '105',
+            'history': [
+                {'messagesAdded': [{'message': {'id': 'new_1', 'labelIds': ['INBOX', 'UNREAD']}}]},
+                {'messagesAdded': [{'message': {'id': 'sent_1', 'labelIds': ['SENT']}}]},
+                {'messagesAdded': [{'message': {'id': 'spam_1', 'labelIds': ['SPAM', 'UNREAD']}}]},
+                {'labelsRemoved': [{'message': {'id': 'read_elsewhere'}, 'labelIds': ['UNREAD']}]}
+            ]
+        }
+
+        message_ids = mock_gmail_client._get_unread_ids_incremental(max_results=10)
+
+        assert message_ids == ['old_unread', 'new_1']
+        assert mock_gmail_client.history_id == '105'
+        _, kwargs = service.users().history().list.call_args
+        assert kwargs['startHistoryId'] == '100'
+
+    def test_expired_history_falls_back_to_full_sync(self, mock_gmail_client, incremental_settings):
+        """A 404 from history.list triggers a fresh full listing"""
+        service = mock_gmail_client.service
+        mock_gmail_client.history_id = '1'
+        service.users().history().list.return_value.execute.side_effect = http_error(404)
+        service.users().getProfile.return_value.execute.return_value = {'historyId': '500'}
+
+        message_ids = mock_gmail_client._get_unread_ids_incremental(max_results=10)
+
+        assert message_ids == ['test_email_1', 'test_email_2']
+        assert mock_gmail_client.history_id == '500'
+
+
+class TestBatchModify:
+    """Test marking many messages as read with messages.batchModify"""
+
+    def test_ids_are_chunked_per_call(self, mock_gmail_client):
+        """Each batchModify call carries at most 1000 message IDs"""
+        ids = [f'msg_{i}' for i in range(2500)]
+        messages = mock_gmail_client.service.users().messages()
+
+        results = mock_gmail_client.mark_many_as_read(ids)
+
+        assert results == dict.fromkeys(ids, True)
+        chunks = [call.kwargs['body']['ids'] for call in messages.batchModify.call_args_list]
+        assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+        assert messages.batchModify.call_args.kwargs['body']['removeLabelIds'] == ['UNREAD']
+
+    def test_failed_batch_falls_back_to_single_calls(self, mock_gmail_client):
+        """A rejected batchModify is retried per message for per-email results"""
+        messages = mock_gmail_client.service.users().messages()
+        messages.batchModify.return_value.execute.side_effect = http_error(500)
+        mock_gmail_client.mark_as_read = Mock(side_effect=lambda message_id: message_id != 'msg_2')
+
+        results = mock_gmail_client.mark_many_as_read(['msg_1', 'msg_2'])
+
+        assert results == {'msg_1': True, 'msg_2': False}
+
+
+class TestLazyStartup:
+    """Test that construction defers credentials, discovery and heavy imports"""
+
+    def test_client_authenticates_on_first_use(self):
+        """GmailClient() does no auth work until the service is needed"""
+        from src.gmail_client import GmailClient
+
+        service = Mock()
+        with patch.object(GmailClient, 'authenticate', autospec=True) as authenticate:
+            authenticate.side_effect = lambda client: setattr(client, 'service', service)
+            client = GmailClient()
+            assert not client.authenticated
+            authenticate.assert_not_called()
+
+            assert client.service is service
+            assert client.service is service
+
+        authenticate.assert_called_once()
+        assert client.authenticated
+
+    def test_processing_stats_do_not_authenticate(self, mock_ollama_client):
+        """status reports an unauthenticated client without loading credentials"""
+        from src.gmail_client import GmailClient
+        from src.email_processor import EmailProcessor
+
+        with patch.object(GmailClient, 'authenticate', autospec=True) as authenticate, \
+             patch('src.email_processor.OllamaClient', return_value=mock_ollama_client):
+            stats = EmailProcessor().get_processing_stats()
+
+        assert stats['gmail_authenticated'] is False
+        authenticate.assert_not_called()
+
+    def test_discovery_document_is_bundled_and_cached(self):
+        """The Gmail discovery document is parsed once from the static copy"""
+        from src.gmail_client import load_discovery_document
+
+        document = load_discovery_document()
+
+        assert document['name'] == 'gmail'
+        assert load_discovery_document() is document
+
+    def test_processor_import_skips_heavy_modules(self):
+        """Importing the processor does not pull in ollama or API discovery"""
+        import subprocess
+        import sys
+
+        output = subprocess.run(
+            [sys.executable, '-c',
+             "import sys, src.email_processor; "
+             "print(sorted(m for m in ('ollama', 'googleapiclient.discovery', "
+             "'google_auth_oauthlib.flow') if m in sys.modules))"],
+            capture_output=True, text=True, check=True
+        ).stdout
+
+        assert output.strip() == '[]'
+
+
+class TestMetadataFirstFetch:
+    """Test metadata-only retrieval with lazily downloaded bodies"""
+
+    def test_unread_fetch_requests_metadata_only(self, mock_gmail_client):
+        """Phase one asks for headers and snippet, not the full MIME tree"""
+        messages = mock_gmail_client.service.users().messages()
+
+        with patch('src.gmail_client.settings') as mock_settings:
+            mock_settings.gmail_metadata_first = True
+            mock_settings.gmail_incremental_sync = False
+            mock_settings.gmail_fetch_batch_size = 1
+            emails = mock_gmail_client.get_unread_emails()
+
+        kwargs = messages.get.call_args.kwargs
+        assert kwargs['format'] == 'metadata'
+        assert 'List-Unsubscribe' in kwargs['metadataHeaders']
+        assert emails[0]['subject'] == 'Test Email for AI Assistant'
+        assert 'body' not in emails[0]
+
+    def test_body_is_downloaded_on_first_read(self, mock_gmail_client):
+        """Reading email['body'] fetches the full message once"""
+        email = mock_gmail_client.get_email_details('test_email_1', metadata_only=True)
+        messages = mock_gmail_client.service.users().messages()
+        messages.get.reset_mock()
+
+        assert email['body'] == 'Can you help me schedule a meeting for next week?'
+        assert email['body'] == 'Can you help me schedule a meeting for next week?'
+        messages.get.assert_called_once_with(userId='me', id='test_email_1', format='full')
+        assert email.get('missing') is None
+
+    def test_load_bodies_batches_missing_bodies(self, batch_gmail_client):
+        """Bodies still missing are fetched together in one batch"""
+        batch_gmail_client.batch_responses.update({i: make_api_message(i) for i in 'abc'})
+        emails = batch_gmail_client.get_emails_details(['a', 'b', 'c'], metadata_only=True)
+        batch_gmail_client.batches.clear()
+
+        batch_gmail_client.load_bodies(emails[:2])
+
+        assert [batch.request_ids for batch in batch_gmail_client.batches] == [['a', 'b']]
+        assert emails[0]['body'] == 'Hello'
+        assert 'body' not in emails[2]
+
+    def test_failed_body_download_is_not_stored(self, batch_gmail_client):
+        """A body that could not be downloaded stays unset and is retried on read"""
+        batch_gmail_client.batch_responses.update({i: make_api_message(i) for i in 'ab'})
+        emails = batch_gmail_client.get_emails_details(['a', 'b'], metadata_only=True)
+        batch_gmail_client.batch_responses['b'] = http_error(404)
+        batch_gmail_client.get_email_details = Mock(side_effect=[None, {'body': 'Hello b'}])
+
+        batch_gmail_client.load_bodies(emails)
+
+        assert emails[0]['body'] == 'Hello'
+        assert 'body' not in emails[1]
+        with pytest.raises(KeyError):
+            emails[1]['body']
+        assert 'body' not in emails[1]
+        assert emails[1]['body'] == 'Hello b'
@@ -0,0 +1,94 @@
+"""
+Tests for the pooled Gmail HTTP transports
+"""
+
+import threading
+import pytest
+from unittest.mock import Mock
+
+from src.gmail_pool import GmailHttpPool
+
+
+@pytest.fixture
+def credentials():
+    return Mock(valid=True)
+
+
+def make_pool(credentials, size=2):
+    return GmailHttpPool(credentials, size=size, http_factory=lambda: object())
+
+
+class TestGmailHttpPool:
+    """Test checkout, reuse and credential sharing"""
+
+    def test_connections_are_reused(self, credentials):
+        """Sequential callers share one transport instead of building new ones"""
+        pool = make_pool(credentials)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert first is second
+        assert pool.stats()['created'] == 1
+
+    def test_concurrent_callers_get_distinct_transports(self, credentials):
+        """No transport is handed to two threads at once"""
+        pool = make_pool(credentials, size=3)
+        barrier = threading.Barrier(3)
+        held = []
+
+        def worker():
+            with pool.connection() as http:
+                held.append(http)
+                barrier.wait(timeout=2)
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(map(id, held))) == 3
+
+    def test_pool_size_bounds_transports(self, credentials):
+        """Callers beyond the pool size wait for a transport to be returned"""
+        pool = make_pool(credentials, size=1)
+        acquired = threading.Event()
+
+        def wait_for_transport():
+            with pool.connection():
+                acquired.set()
+
+        with pool.connection():
+            waiter = threading.Thread(target=wait_for_transport)
+            waiter.start()
+            assert not acquired.wait(0.1)
+
+        waiter.join(timeout=2)
+        assert acquired.is_set()
+        assert pool.stats()['created'] == 1
+        assert pool.stats()['waits'] == 1
+
+    def test_expired_credential_is_refreshed_once(self, credentials):
+        """The shared credential is refreshed before checkout, not per transport"""
+        credentials.valid = False
+        credentials.refresh.side_effect = lambda request: setattr(credentials, 'valid', True)
+        pool = make_pool(credentials)
+
+        with pool.connection():
+            with pool.connection():
+                pass
+
+        credentials.refresh.assert_called_once()
+        assert pool.stats()['refreshes'] == 1
+
+    def test_requests_execute_on_pooled_transport(self, mock_gmail_client, credentials):
+        """GmailClient passes a pooled transport to every execute()"""
+        transport = object()
+        mock_gmail_client.http_pool = GmailHttpPool(credentials, http_factory=lambda: transport)
+        request = mock_gmail_client.service.users().messages().modify.return_value
+
+        assert mock_gmail_client.mark_as_read('msg_1')
+        request.execute.assert_called_once_with(http=transport)
@@ -0,0 +1,141 @@
+"""
+Tests for the quota-aware Gmail request executor
+"""
+
+import json
+import pytest
+from unittest.mock import Mock
+from googleapiclient.errors import HttpError
+
+from src.gmail_quota import GmailRequestExecutor, TokenBucket, quota_units
+
+
+class FakeClock:
+    """Clock whose sleep advances time instead of blocking"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def http_error(status, reason='error', headers=None):
+    resp = {'status': str(status)}
+    resp.update(headers or {})
+    resp = Mock(status=status, reason=reason, get=resp.get)
+    content = json.dumps({'error': {'errors': [{'reason': reason}]}}).encode()
+    return HttpError(resp, content)
+
+
+def make_request(*outcomes, method_id='gmail.users.messages.get'):
+    request = Mock(methodId=method_id)
+    request.execute.side_effect = list(outcomes)
+    return request
+
+
+def make_executor(clock, **kwargs):
+    return GmailRequestExecutor(clock=clock, sleep=clock.sleep, jitter=lambda: 1.0, **kwargs)
+
+
+class TestTokenBucket:
+    """Test quota-unit pacing"""
+
+    def test_requests_within_burst_do_not_wait(self, clock):
+        """The bucket starts full, so a burst up to capacity passes immediately"""
+        bucket = TokenBucket(250, clock=clock, sleep=clock.sleep)
+
+        for _ in range(50):
+            bucket.acquire(5)
+
+        assert clock.sleeps == []
+
+    def test_exhausted_bucket_waits_for_refill(self, clock):
+        """Once the burst is spent, callers wait for the units they need"""
+        bucket = TokenBucket(250, clock=clock, sleep=clock.sleep)
+        bucket.acquire(250)
+
+        assert bucket.acquire(100) == pytest.approx(0.4)
+        assert bucket.acquire(50) == pytest.approx(0.2)
+
+    def test_units_follow_method_costs(self):
+        """Quota cost is looked up from the request's method id"""
+        assert quota_units(Mock(methodId='gmail.users.messages.send')) == 100
+        assert quota_units(Mock(methodId='gmail.users.history.list')) == 2
+        assert quota_units(Mock(methodId='gmail.users.unknown')) == 5
+
+
+class TestGmailRequestExecutor:
+    """Test retry and backoff around execute()"""
+
+    def test_rate_limited_request_is_retried(self, clock):
+        """429 and 403 rateLimitExceeded are retried with exponential backoff"""
+        executor = make_executor(clock, base_delay=1.0)
+        request = make_request(http_error(429), http_error(403, 'rateLimitExceeded'), {'ok': True})
+
+        assert executor.execute(request) == {'ok': True}
+        assert clock.sleeps == [1.0, 2.0]
+        stats = executor.snapshot()
+        assert stats['rate_limited'] == 2
+        assert stats['retries'] == 2
+        assert stats['requests'] == 3
+
+    def test_server_errors_are_retried(self, clock):
+        """5xx responses are retried and counted separately from throttling"""
+        executor = make_executor(clock)
+        request = make_request(http_error(503), {'ok': True})
+
+        assert executor.execute(request) == {'ok': True}
+        assert executor.snapshot()['server_errors'] == 1
+
+    def test_client_errors_are_not_retried(self, clock):
+        """A 404 or a plain 403 is raised straight away"""
+        executor = make_executor(clock)
+
+        for error in (http_error(404), http_error(403, 'forbidden')):
+            with pytest.raises(HttpError):
+                executor.execute(make_request(error))
+
+        assert clock.sleeps == []
+        assert 'retries' not in executor.snapshot()
+
+    def test_gives_up_after_max_retries(self, clock):
+        """Persistent throttling is re-raised once retries are exhausted"""
+        executor = make_executor(clock, max_retries=2, base_delay=1.0, max_delay=1.5)
+        request = make_request(*[http_error(429)] * 3)
+
+        with pytest.raises(HttpError):
+            executor.execute(request)
+
+        assert clock.sleeps == [1.0, 1.5]
+        assert executor.snapshot()['gave_up'] == 1
+
+    def test_retry_after_header_is_honoured(self, clock):
+        """A server-supplied Retry-After overrides the computed delay"""
+        executor = make_executor(clock)
+        request = make_request(http_error(429, headers={'retry-after': '7'}), {'ok': True})
+
+        executor.execute(request)
+
+        assert clock.sleeps == [7.0]
+
+    def test_unread_fetch_survives_transient_throttling(self, mock_gmail_client):
+        """A quota spike no longer drops the whole cycle"""
+        messages = mock_gmail_client.service.users().messages()
+        listing = messages.list.return_value.execute.return_value
+        messages.list.return_value.execute.side_effect = [http_error(429), listing]
+
+        emails = mock_gmail_client.get_unread_emails()
+
+        assert len(emails) == 2
+        assert mock_gmail_client.get_quota_stats()['rate_limited'] == 1
@@ -0,0 +1,109 @@
+"""
+Tests for the notification-driven mailbox daemon
+"""
+
+import pytest
+import socket
+import threading
+import time
+from unittest.mock import Mock
+
+from src.mailbox_daemon import MailboxDaemon, SocketNotificationSource
+
+
+def notify(port, count=1):
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for _ in range(count):
+        sender.sendto(b'changed', ('127.0.0.1', port))
+    sender.close()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def processor():
+    processor = Mock()
+    processor.process_emails.return_value = {"processed": 1, "responded": 0, "drafts_created": 1}
+    return processor
+
+
+@pytest.fixture
+def run_daemon():
+    """Starts a daemon in a background thread and stops it after the test"""
+    started = []
+
+    def start(daemon):
+        thread = threading.Thread(target=daemon.run, kwargs={'run_immediately': False}, daemon=True)
+        thread.start()
+        started.append((daemon, thread))
+        return daemon
+
+    yield start
+
+    for daemon, thread in started:
+        daemon.stop()
+        thread.join(timeout=2)
+
+
+class TestMailboxDaemon:
+    """Test event-driven triggering with polling fallback"""
+
+    def test_notification_burst_triggers_one_cycle(self, processor, run_daemon):
+        """A burst of notifications is debounced into a single processing cycle"""
+        source = SocketNotificationSource()
+        daemon = MailboxDaemon(processor, source=source, poll_interval=60,
+                               debounce_seconds=0.1, max_debounce_seconds=1)
+        run_daemon(daemon)
+        assert wait_for(lambda: source.port != 0)
+
+        notify(source.port, count=3)
+        time.sleep(0.02)
+        notify(source.port, count=2)
+
+        assert wait_for(lambda: processor.process_emails.call_count == 1)
+        time.sleep(0.2)
+        assert processor.process_emails.call_count == 1
+        assert daemon.stats['notifications'] == 5
+        assert daemon.stats['notification_cycles'] == 1
+        assert daemon.stats['poll_cycles'] == 0
+
+    def test_polling_fallback_without_notifications(self, processor, run_daemon):
+        """With no notifications the daemon still polls on the interval"""
+        source = SocketNotificationSource()
+        daemon = MailboxDaemon(processor, source=source, poll_interval=0.1, debounce_seconds=0.01)
+        run_daemon(daemon)
+
+        assert wait_for(lambda: processor.process_emails.call_count >= 2)
+        assert daemon.stats['poll_cycles'] >= 2
+        assert daemon.stats['notification_cycles'] == 0
+
+    def test_polling_only_mode(self, processor, run_daemon):
+        """Without a notification source the daemon behaves like the fixed-interval loop"""
+        daemon = MailboxDaemon(processor, source=None, poll_interval=0.05)
+        run_daemon(daemon)
+
+        assert wait_for(lambda: processor.process_emails.call_count >= 2)
+
+    def test_cycle_errors_do_not_stop_daemon(self, processor, run_daemon):
+        """A failing processing cycle is logged and the daemon keeps running"""
+        processor.process_emails.side_effect = [RuntimeError("boom"), {"processed": 0}]
+        daemon = MailboxDaemon(processor, source=None, poll_interval=0.05)
+        run_daemon(daemon)
+
+        assert wait_for(lambda: processor.process_emails.call_count >= 2)
+
+    def test_startup_cycle(self, processor):
+        """run() processes the mailbox once before waiting by default"""
+        daemon = MailboxDaemon(processor, source=None, poll_interval=60)
+        processor.process_emails.side_effect = lambda: daemon.stop() or {"processed": 0}
+
+        daemon.run()
+
+        assert daemon.stats['startup_cycles'] == 1
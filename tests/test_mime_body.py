@@ -0,0 +1,76 @@
+"""
+Tests for MIME body extraction
+"""
+
+import base64
+
+from src.mime_body import extract_body, html_to_text
+
+
+def encode(text, charset='utf-8'):
+    return base64.urlsafe_b64encode(text.encode(charset)).decode('ascii').rstrip('=')
+
+
+def part(mime_type, text='', charset='utf-8', filename='', parts=None):
+    node = {
+        'mimeType': mime_type,
+        'filename': filename,
+        'headers': [{'name': 'Content-Type', 'value': f'{mime_type}; charset="{charset}"'}],
+        'body': {'data': encode(text, charset)} if text else {'size': 0}
+    }
+    if parts is not None:
+        node['parts'] = parts
+    return node
+
+
+class TestExtractBody:
+    """Test walking the MIME tree for the readable body"""
+
+    def test_nested_alternative_prefers_plain_text(self):
+        """text/plain inside mixed > alternative wins over the HTML sibling"""
+        payload = part('multipart/mixed', parts=[
+            part('multipart/alternative', parts=[
+                part('text/html', '<p>HTML version</p>'),
+                part('text/plain', 'Plain version')
+            ]),
+            part('text/plain', 'attached notes', filename='notes.txt')
+        ])
+
+        assert extract_body(payload) == 'Plain version'
+
+    def test_html_only_is_converted_to_text(self):
+        """HTML-only mail is stripped of markup, scripts and entities"""
+        payload = part('multipart/alternative', parts=[part(
+            'text/html',
+            '<html><head><style>p {color: red}</style></head><body>'
+            '<p>Hello&nbsp;Michael,</p><script>track()</script>'
+            '<div>Fish &amp; chips<br>on Friday?</div></body></html>'
+        )])
+
+        assert extract_body(payload) == 'Hello Michael,\nFish & chips\non Friday?'
+
+    def test_declared_charset_is_respected(self):
+        """Parts are decoded with their declared charset rather than UTF-8"""
+        payload = part('text/plain', 'Café déjà vu', charset='iso-8859-1')
+
+        assert extract_body(payload) == 'Café déjà vu'
+
+    def test_decoding_stops_at_byte_budget(self):
+        """Only the budgeted prefix is decoded, without a split character"""
+        payload = part('text/plain', 'é' * 1000)
+
+        body = extract_body(payload, max_bytes=101)
+
+        assert body == 'é' * 50
+
+    def test_truncated_html_drops_partial_tag(self):
+        """An HTML budget cut inside a tag leaves no markup behind"""
+        html = '<p>Short intro</p><a href="https://example.com/' + 'x' * 500 + '">link</a>'
+
+        assert html_to_text(html[:60]) == 'Short intro'
+
+    def test_missing_text_parts_give_empty_body(self):
+        """Attachment-only messages have no body"""
+        payload = part('multipart/mixed', parts=[part('application/pdf', 'PDF', filename='a.pdf')])
+
+        assert extract_body(payload) == ''
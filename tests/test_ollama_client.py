@@ -0,0 +1,796 @@
+"""
+Tests for OllamaClient health tracking and inference paths
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+
+from src.ollama_health import OllamaHealth, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def health(clock):
+    return OllamaHealth(ttl_seconds=30, failure_threshold=3, cooldown_seconds=60, clock=clock)
+
+
+class TestOllamaHealth:
+    """Test TTL caching and circuit breaking of the availability probe"""
+
+    def test_availability_is_cached_within_ttl(self, health, clock):
+        """Only one probe is made while the cached status is fresh"""
+        probe = Mock()
+
+        assert health.check(probe) is True
+        clock.advance(10)
+        assert health.check(probe) is True
+        assert probe.call_count == 1
+
+        clock.advance(25)
+        assert health.check(probe) is True
+        assert probe.call_count == 2
+
+    def test_breaker_opens_after_repeated_failures(self, health, clock):
+        """Consecutive failures open the breaker and short-circuit callers"""
+        probe = Mock(side_effect=ConnectionError("refused"))
+
+        for _ in range(3):
+            assert health.check(probe) is False
+            clock.advance(31)
+
+        assert health.state == OPEN
+        assert health.allow_request() is False
+        calls = probe.call_count
+        assert health.check(probe) is False
+        assert probe.call_count == calls
+        assert health.snapshot()['breaker_trips'] == 1
+
+    def test_half_open_trial_closes_breaker(self, health, clock):
+        """After the cooldown a successful trial closes the breaker"""
+        for _ in range(3):
+            health.record_failure()
+        assert health.state == OPEN
+
+        clock.advance(61)
+        assert health.allow_request() is True
+        assert health.state == HALF_OPEN
+
+        health.record_success()
+        assert health.state == CLOSED
+        assert health.snapshot()['availability_flips'] == 1
+
+    def test_half_open_failure_reopens(self, health, clock):
+        """A failed trial reopens the breaker for another cooldown"""
+        for _ in range(3):
+            health.record_failure()
+        clock.advance(61)
+
+        assert health.check(Mock(side_effect=ConnectionError())) is False
+        assert health.state == OPEN
+        assert health.allow_request() is False
+
+    def test_probe_latency_metrics(self, health, clock):
+        """Probe latency is recorded in the snapshot"""
+        health.check(lambda: clock.advance(0.25))
+
+        stats = health.snapshot()
+        assert stats['probe_count'] == 1
+        assert stats['probe_latency_last'] == pytest.approx(0.25)
+        assert stats['probe_latency_max'] == pytest.approx(0.25)
+
+
+class TestOllamaClientHealth:
+    """Test that OllamaClient consults its health state"""
+
+    def test_generate_skips_when_breaker_open(self):
+        """An open breaker returns the fallback without calling the model"""
+        from src.ollama_client import OllamaClient, UNAVAILABLE_RESPONSE
+
+        with patch('ollama.Client') as mock_client_class:
+            mock_client = Mock()
+            mock_client_class.return_value = mock_client
+
+            client = OllamaClient()
+            for _ in range(client.health.failure_threshold):
+                client.health.record_failure()
+
+            assert client.generate_response("Hello") == UNAVAILABLE_RESPONSE
+            mock_client.generate.assert_not_called()
+
+    def test_client_is_created_on_first_use(self):
+        """Constructing OllamaClient does not create the HTTP client"""
+        from src.ollama_client import OllamaClient
+
+        with patch('ollama.Client') as mock_client_class:
+            client = OllamaClient()
+            mock_client_class.assert_not_called()
+
+            client.is_available()
+
+        mock_client_class.assert_called_once_with(host=client.host)
+
+    def test_embed_batches_texts_in_one_request(self):
+        """All texts go to the embed endpoint in one call; failures return None"""
+        from src.ollama_client import OllamaClient
+
+        client = OllamaClient()
+        client.client = Mock()
+        client.client.embed.return_value = {'embeddings': [[0.1, 0.2], [0.3, 0.4]]}
+
+        assert client.embed(['a', 'b'], 'nomic-embed-text') == [[0.1, 0.2], [0.3, 0.4]]
+        client.client.embed.assert_called_once_with(model='nomic-embed-text', input=['a', 'b'],
+                                                    keep_alive=client.keep_alive)
+
+        client.client.embed.side_effect = ConnectionError("refused")
+        assert client.embed(['a'], 'nomic-embed-text') is None
+
+    def test_generate_failures_feed_breaker(self):
+        """Connection errors during generation count towards the breaker"""
+        from src.ollama_client import OllamaClient
+
+        with patch('ollama.Client') as mock_client_class:
+            mock_client = Mock()
+            mock_client.generate.side_effect = ConnectionError("refused")
+            mock_client_class.return_value = mock_client
+
+            client = OllamaClient()
+            for _ in range(client.health.failure_threshold):
+                client.generate_response("Hello")
+
+            assert client.health.state == OPEN
+            assert client.is_available() is False
+            mock_client.list.assert_not_called()
+
+
+VALID_CLASSIFICATION = '{"category": "newsletter", "priority": "low", "requires_response": false, "sentiment": "neutral", "action_needed": "ignore"}'
+
+
+@pytest.fixture
+def cached_ollama_client(tmp_path):
+    """Real OllamaClient with a mocked ollama.Client and an on-disk classification cache"""
+    from src.ollama_client import OllamaClient
+
+    with patch('ollama.Client'), patch('src.ollama_client.settings') as mock_settings:
+        mock_settings.ollama_model = 'llama3:8b'
+        mock_settings.ollama_classification_model = None
+        mock_settings.classification_cascade = False
+        mock_settings.ollama_health_ttl_seconds = 30
+        mock_settings.ollama_failure_threshold = 3
+        mock_settings.ollama_cooldown_seconds = 60
+        mock_settings.classification_cache_file = str(tmp_path / 'cache' / 'classifications.db')
+        mock_settings.classification_cache_max_entries = 2
+        client = OllamaClient()
+
+    client.generate_response = Mock(return_value=VALID_CLASSIFICATION)
+    yield client
+    client.classification_cache.close()
+
+
+class TestClassificationCache:
+    """Test the persistent classification cache"""
+
+    def test_repeat_email_skips_model(self, cached_ollama_client):
+        """A repeated email is answered from the cache"""
+        email = {'subject': 'Weekly digest', 'sender': 'news@example.com', 'body': 'Top stories'}
+
+        first = cached_ollama_client.classify_email(email)
+        second = cached_ollama_client.classify_email(dict(email))
+
+        assert first == second
+        assert cached_ollama_client.generate_response.call_count == 1
+        assert cached_ollama_client.classification_cache.hits == 1
+
+    def test_failed_classification_is_not_cached(self, cached_ollama_client):
+        """Fallback results are never stored"""
+        cached_ollama_client.generate_response.return_value = "not json"
+        email = {'subject': 'Hello', 'sender': 'a@example.com', 'body': 'Hi'}
+
+        cached_ollama_client.classify_email(email)
+        cached_ollama_client.classify_email(email)
+
+        assert cached_ollama_client.generate_response.call_count == 2
+        assert len(cached_ollama_client.classification_cache) == 0
+
+    def test_partial_classification_is_not_returned_or_cached(self, cached_ollama_client):
+        """An object missing required fields counts as a failure"""
+        import json
+
+        email = {'subject': 'Hello', 'sender': 'a@example.com', 'body': 'Hi'}
+        cached_ollama_client.generate_response.return_value = '{"category": "work"}'
+
+        first = cached_ollama_client.classify_email(email)
+
+        assert first['action_needed'] == 'ignore'
+        assert len(cached_ollama_client.classification_cache) == 0
+
+        cached_ollama_client.generate_response.return_value = json.dumps(make_classification('work'))
+        assert cached_ollama_client.classify_email(email) == make_classification('work')
+
+    def test_incomplete_cached_entry_is_ignored(self, cached_ollama_client):
+        """Partial results cached by older versions are inferred again"""
+        import json
+
+        email = {'subject': 'Hello', 'sender': 'a@example.com', 'body': 'Hi'}
+        cached_ollama_client.classification_cache.put(email, {'category': 'work'})
+        cached_ollama_client.generate_response.return_value = json.dumps(make_classification('work'))
+
+        assert cached_ollama_client.classify_email(email) == make_classification('work')
+        assert cached_ollama_client.generate_response.call_count == 1
+
+    def test_least_recently_used_entry_is_evicted(self, cached_ollama_client):
+        """The cache keeps at most max_entries rows, dropping the least recently used"""
+        cache = cached_ollama_client.classification_cache
+        emails = [{'subject': f'Subject {i}', 'sender': 's@example.com', 'body': ''} for i in range(3)]
+
+        cached_ollama_client.classify_email(emails[0])
+        cached_ollama_client.classify_email(emails[1])
+        cached_ollama_client.classify_email(emails[0])
+        cached_ollama_client.classify_email(emails[2])
+
+        assert len(cache) == 2
+        assert cache.get(emails[0]) is not None
+        assert cache.get(emails[1]) is None
+
+    def test_model_change_invalidates_entries(self, tmp_path):
+        """Opening the cache for a different model discards old results"""
+        from src.classification_cache import ClassificationCache
+
+        path = str(tmp_path / 'classifications.db')
+        email = {'subject': 'Hi', 'sender': 's@example.com', 'body': 'Body'}
+
+        old = ClassificationCache(path, 'llama3:8b')
+        old.put(email, {'category': 'work'})
+        old.close()
+
+        new = ClassificationCache(path, 'qwen2.5:3b')
+        assert new.get(email) is None
+        assert len(new) == 0
+        new.close()
+
+
+def make_classification(category='work', index=None):
+    item = {"category": category, "priority": "medium", "requires_response": True,
+            "sentiment": "neutral", "action_needed": "reply"}
+    if index is not None:
+        item['index'] = index
+    return item
+
+
+@pytest.fixture
+def batch_ollama_client():
+    from src.ollama_client import OllamaClient
+
+    with patch('ollama.Client'):
+        client = OllamaClient()
+    client.classification_cache = None
+    client.classify_email = Mock(return_value=make_classification('personal'))
+    return client
+
+
+class TestBatchClassification:
+    """Test classifying several emails in one prompt"""
+
+    emails = [{'subject': f'Subject {i}', 'sender': 's@example.com', 'body': 'Body'} for i in range(3)]
+
+    def test_batch_result_is_mapped_by_index(self, batch_ollama_client):
+        """Array items are matched back to emails by their index field"""
+        import json
+
+        batch_ollama_client.generate_response = Mock(return_value=json.dumps([
+            make_classification('urgent', index=3),
+            make_classification('work', index=1),
+            make_classification('newsletter', index=2)
+        ]))
+
+        results = batch_ollama_client.classify_emails(self.emails)
+
+        assert [r['category'] for r in results] == ['work', 'newsletter', 'urgent']
+        assert 'index' not in results[0]
+        assert batch_ollama_client.generate_response.call_count == 1
+        batch_ollama_client.classify_email.assert_not_called()
+
+    def test_invalid_items_fall_back_to_single_classification(self, batch_ollama_client):
+        """Only items that fail validation are re-classified individually"""
+        import json
+
+        invalid = make_classification('work', index=2)
+        invalid['priority'] = 'whenever'
+        batch_ollama_client.generate_response = Mock(return_value=json.dumps([
+            make_classification('work', index=1), invalid
+        ]))
+
+        results = batch_ollama_client.classify_emails(self.emails)
+
+        assert [r['category'] for r in results] == ['work', 'personal', 'personal']
+        assert batch_ollama_client.classify_email.call_count == 2
+
+    def test_unparseable_batch_falls_back_for_all(self, batch_ollama_client):
+        """A response that is not a JSON array falls back per email"""
+        batch_ollama_client.generate_response = Mock(return_value="Sorry, I can't do that")
+
+        results = batch_ollama_client.classify_emails(self.emails)
+
+        assert [r['category'] for r in results] == ['personal'] * 3
+        assert batch_ollama_client.classify_email.call_count == 3
+
+    def test_processor_batches_multi_email_cycles(self, mock_gmail_client, mock_ollama_client):
+        """With a batch size set, EmailProcessor classifies a cycle through classify_emails"""
+        from config.settings import settings
+        from src.email_processor import EmailProcessor
+
+        with patch('src.email_processor.GmailClient', return_value=mock_gmail_client), \
+             patch('src.email_processor.OllamaClient', return_value=mock_ollama_client), \
+             patch.object(settings, 'classification_batch_size', 8, create=True):
+            processor = EmailProcessor()
+            result = processor.process_emails()
+
+        mock_ollama_client.classify_emails.assert_called_once()
+        assert len(mock_ollama_client.classify_emails.call_args[0][0]) == 2
+        assert result['drafts_created'] == 2
+
+    def test_processor_does_not_batch_by_default(self, mock_gmail_client, mock_ollama_client):
+        """Without a batch size, each email is classified on its own"""
+        from src.email_processor import EmailProcessor
+
+        with patch('src.email_processor.GmailClient', return_value=mock_gmail_client), \
+             patch('src.email_processor.OllamaClient', return_value=mock_ollama_client):
+            processor = EmailProcessor()
+            result = processor.process_emails()
+
+        mock_ollama_client.classify_emails.assert_not_called()
+        assert mock_ollama_client.classify_email.call_count == 2
+        assert result['drafts_created'] == 2
+
+
+class TestStreamingGeneration:
+    """Test streamed generation with early termination"""
+
+    @pytest.fixture
+    def streaming_client(self):
+        from src.ollama_client import OllamaClient
+
+        client = OllamaClient()
+        client.client = Mock()
+        return client
+
+    @staticmethod
+    def make_stream(pieces, chat=False):
+        consumed = []
+
+        def stream():
+            for piece in pieces:
+                consumed.append(piece)
+                yield {'message': {'role': 'assistant', 'content': piece}} if chat else {'response': piece}
+
+        return stream(), consumed
+
+    def test_json_task_stops_after_balanced_object(self, streaming_client):
+        """Classification streaming stops once the JSON object closes"""
+        pieces = ['Sure! ', '{"category": "work", ', '"note": "a } in a string"', '}', ' Hope', ' this', ' helps']
+        stream, consumed = self.make_stream(pieces)
+        streaming_client.client.generate.return_value = stream
+
+        text = streaming_client.generate_response("Classify", stop_after_json=True)
+
+        assert text == '{"category": "work", "note": "a } in a string"}'
+        assert consumed == pieces[:4]
+        assert streaming_client.early_stops == 1
+
+    def test_classification_skips_bracketed_prose(self, streaming_client):
+        """A bracketed label before the object does not end the stream early"""
+        import json
+
+        body = json.dumps(make_classification('urgent'))
+        stream, _ = self.make_stream(['Classification [email 1]: ', body, ' Done.'], chat=True)
+        streaming_client.client.chat.return_value = stream
+
+        result = streaming_client.classify_email({'subject': 'Down', 'sender': 'ops@example.com', 'body': ''})
+
+        assert result['category'] == 'urgent'
+
+    def test_reply_streams_to_completion_with_token_cap(self, streaming_client):
+        """Replies are streamed fully and capped with num_predict"""
+        stream, _ = self.make_stream(['Thanks ', 'for ', 'writing. ', '{not json}'], chat=True)
+        streaming_client.client.chat.return_value = stream
+
+        text = streaming_client.generate_email_response(
+            {'subject': 'Hi', 'sender': 'a@example.com', 'body': 'Hello'},
+            make_classification()
+        )
+
+        assert text == 'Thanks for writing. {not json}'
+        _, kwargs = streaming_client.client.chat.call_args
+        assert kwargs['stream'] is True
+        assert kwargs['options']['num_predict'] > 0
+
+    def test_classify_email_uses_early_stop(self, streaming_client):
+        """classify_email parses the object returned by an early-stopped stream"""
+        import json
+
+        body = json.dumps(make_classification('urgent'))
+        stream, _ = self.make_stream([body[:20], body[20:], '\n\nExplanation: ...'], chat=True)
+        streaming_client.client.chat.return_value = stream
+
+        result = streaming_client.classify_email({'subject': 'Down', 'sender': 'ops@example.com', 'body': ''})
+
+        assert result['category'] == 'urgent'
+
+
+class TestJsonStreamScanner:
+    """Test detection of the end of a streamed JSON value"""
+
+    def test_nested_value_split_across_chunks(self):
+        from src.json_parsing import JsonStreamScanner
+
+        scanner = JsonStreamScanner()
+        assert scanner.feed('[{"a": [1, 2') is False
+        assert scanner.feed(']}, {"b": "\\"]"}') is False
+        assert scanner.feed('] trailing') is True
+        assert scanner.value_text() == '[{"a": [1, 2]}, {"b": "\\"]"}]'
+
+    def test_balanced_prose_is_skipped(self):
+        from src.json_parsing import JsonStreamScanner
+
+        scanner = JsonStreamScanner(dict)
+        assert scanner.feed('Classification [email 1]: ') is False
+        assert scanner.feed('{"category": "work"}') is True
+        assert scanner.value_text() == '{"category": "work"}'
+
+    def test_value_of_unexpected_type_is_skipped(self):
+        from src.json_parsing import JsonStreamScanner
+
+        scanner = JsonStreamScanner(list)
+        assert scanner.feed('{"note": "x"} [{"category": "work"}]') is True
+        assert scanner.value_text() == '[{"category": "work"}]'
+
+    def test_value_nested_in_prose_brackets_is_found(self):
+        from src.json_parsing import JsonStreamScanner
+
+        scanner = JsonStreamScanner(dict)
+        assert scanner.feed('(see [result {"category": "work"}]) ') is True
+        assert scanner.value_text() == '{"category": "work"}'
+
+
+class TestStructuredClassification:
+    """Test JSON-schema output and tolerant parsing of classifications"""
+
+    @pytest.mark.parametrize('output', [
+        '```json\n{"category": "work", "priority": "low", "requires_response": false, "sentiment": "neutral", "action_needed": "ignore"}\n```',
+        'Here is the classification: {"category": "work", "priority": "low", "requires_response": false, "sentiment": "neutral", "action_needed": "ignore"} Let me know!',
+    ])
+    def test_noisy_output_is_recovered(self, output):
+        """Preambles and markdown fences no longer force the ignore fallback"""
+        from src.ollama_client import OllamaClient
+
+        with patch('ollama.Client'):
+            client = OllamaClient()
+        client.generate_response = Mock(return_value=output)
+
+        result = client.classify_email({'subject': 'Hi', 'sender': 'a@example.com', 'body': ''})
+
+        assert result['category'] == 'work'
+        stats = client.get_parse_stats()
+        assert stats['recovered'] == 1
+        assert stats['failure_rate'] == 0.0
+
+    def test_parse_failures_are_counted(self):
+        """Unrecoverable output is counted as a parse failure"""
+        from src.ollama_client import OllamaClient
+
+        with patch('ollama.Client'):
+            client = OllamaClient()
+        client.generate_response = Mock(side_effect=['{"category": "work", "priority": "low", '
+                                                     '"requires_response": false, "sentiment": "neutral", '
+                                                     '"action_needed": "ignore"}',
+                                                     'no json here'])
+        email = {'subject': 'Hi', 'sender': 'a@example.com', 'body': ''}
+
+        client.classify_email(email)
+        result = client.classify_email(email)
+
+        assert result['category'] == 'unknown'
+        stats = client.get_parse_stats()
+        assert stats['attempts'] == 2
+        assert stats['clean'] == 1
+        assert stats['failed'] == 1
+        assert stats['failure_rate'] == 0.5
+
+    def test_schema_is_sent_as_format(self):
+        """Classification requests carry the JSON schema in the format field"""
+        from src.ollama_client import OllamaClient, CLASSIFICATION_SCHEMA
+
+        client = OllamaClient()
+        client.client = Mock()
+        client.client.chat.return_value = iter([{'message': {'content': json_classification()}}])
+
+        client.classify_email({'subject': 'Hi', 'sender': 'a@example.com', 'body': ''})
+
+        _, kwargs = client.client.chat.call_args
+        assert kwargs['format'] == CLASSIFICATION_SCHEMA
+        assert set(kwargs['format']['required']) == {
+            'category', 'priority', 'requires_response', 'sentiment', 'action_needed'
+        }
+
+    def test_unsupported_format_falls_back_to_free_text(self):
+        """A server that rejects the format field is retried without it"""
+        import ollama
+        from src.ollama_client import OllamaClient
+
+        client = OllamaClient()
+        client.client = Mock()
+        client.client.chat.side_effect = [
+            ollama.ResponseError('invalid format', 400),
+            iter([{'message': {'content': json_classification()}}])
+        ]
+
+        result = client.classify_email({'subject': 'Hi', 'sender': 'a@example.com', 'body': ''})
+
+        assert result['category'] == 'work'
+        assert client.structured_output is False
+        assert client.client.chat.call_args[1]['format'] is None
+
+
+def json_classification():
+    import json
+    return json.dumps(make_classification('work'))
+
+
+class TestExtractJson:
+    """Test the tolerant JSON extractor"""
+
+    def test_skips_non_matching_braces(self):
+        from src.json_parsing import extract_json
+
+        text = 'Use {curly} braces? Sure: {"a": [1, {"b": 2}]} and more {"c": 3}'
+        assert extract_json(text) == {"a": [1, {"b": 2}]}
+
+    def test_extracts_arrays(self):
+        from src.json_parsing import extract_json
+
+        assert extract_json('Result:\n[{"index": 1}]\nDone', list) == [{"index": 1}]
+
+    def test_raises_when_absent(self):
+        from src.json_parsing import extract_json
+
+        with pytest.raises(ValueError):
+            extract_json('nothing to see here')
+
+
+class TestPromptLayout:
+    """Test the stable-prefix prompt layout sent through the chat API"""
+
+    def test_system_prompt_is_identical_across_emails(self):
+        """Per-email content goes in the user message; the system prefix never changes"""
+        from src.ollama_client import OllamaClient, CLASSIFICATION_SYSTEM_PROMPT
+
+        client = OllamaClient()
+        client.client = Mock()
+        client.client.chat.side_effect = lambda **kwargs: iter([{'message': {'content': json_classification()}}])
+
+        client.classify_email({'subject': 'First', 'sender': 'a@example.com', 'body': 'One'})
+        client.classify_email({'subject': 'Second', 'sender': 'b@example.com', 'body': 'Two'})
+
+        first, second = [call[1] for call in client.client.chat.call_args_list]
+        assert first['messages'][0] == second['messages'][0] == {
+            'role': 'system', 'content': CLASSIFICATION_SYSTEM_PROMPT
+        }
+        assert 'First' in first['messages'][1]['content']
+        assert 'Second' in second['messages'][1]['content']
+        assert first['keep_alive'] == client.keep_alive
+
+
+def cascade_output(category='newsletter', confidence=0.9):
+    import json
+    return json.dumps(dict(make_classification(category), confidence=confidence))
+
+
+@pytest.fixture
+def cascade_client():
+    """Real OllamaClient routing classification to a small model with cascade enabled"""
+    from src.ollama_client import OllamaClient
+
+    with patch('src.ollama_client.settings') as mock_settings:
+        mock_settings.ollama_model = 'llama3:8b'
+        mock_settings.ollama_classification_model = 'qwen2.5:1.5b'
+        mock_settings.classification_cascade = True
+        mock_settings.cascade_min_confidence = 0.7
+        mock_settings.cascade_escalation_categories = ['urgent', 'work']
+        mock_settings.classification_cache_file = None
+        mock_settings.ollama_health_ttl_seconds = 30
+        mock_settings.ollama_failure_threshold = 3
+        mock_settings.ollama_cooldown_seconds = 60
+        client = OllamaClient()
+    client.generate_response = Mock()
+    return client
+
+
+class TestClassificationCascade:
+    """Test per-task model routing and the small-model-first cascade"""
+
+    EMAIL = {'subject': 'Hi', 'sender': 'a@example.com', 'body': 'Body'}
+
+    def test_confident_answer_stays_on_small_model(self, cascade_client):
+        """A confident, low-stakes answer from the small model is final"""
+        from src.ollama_client import CASCADE_CLASSIFICATION_SCHEMA
+
+        cascade_client.generate_response.return_value = cascade_output('newsletter', 0.95)
+
+        result = cascade_client.classify_email(self.EMAIL)
+
+        assert result == make_classification('newsletter')
+        assert cascade_client.generate_response.call_count == 1
+        _, kwargs = cascade_client.generate_response.call_args
+        assert kwargs['model'] == 'qwen2.5:1.5b'
+        assert kwargs['format'] == CASCADE_CLASSIFICATION_SCHEMA
+
+    @pytest.mark.parametrize('small_output', [
+        cascade_output('work', 0.99),
+        cascade_output('newsletter', 0.4),
+        json_classification(),
+        'not json',
+    ])
+    def test_uncertain_or_high_stakes_answers_escalate(self, cascade_client, small_output):
+        """Work/urgent mail, low or missing confidence and bad output go to the large model"""
+        from src.ollama_client import CLASSIFICATION_SCHEMA
+
+        cascade_client.generate_response.side_effect = [small_output, json_classification()]
+
+        result = cascade_client.classify_email(self.EMAIL)
+
+        assert result == make_classification('work')
+        _, kwargs = cascade_client.generate_response.call_args
+        assert kwargs['model'] == 'llama3:8b'
+        assert kwargs['format'] == CLASSIFICATION_SCHEMA
+        assert cascade_client.get_model_stats()['escalated'] == 1
+
+    def test_batch_escalates_only_uncertain_items(self, cascade_client):
+        """Batch results the small model is sure of are kept; the rest are re-asked individually"""
+        import json
+
+        batch = [dict(make_classification('newsletter', index=1), confidence=0.9),
+                 dict(make_classification('urgent', index=2), confidence=0.9)]
+        cascade_client.generate_response.side_effect = [
+            json.dumps(batch), json.dumps(make_classification('urgent'))
+        ]
+        emails = [dict(self.EMAIL, subject=f'Subject {i}') for i in range(2)]
+
+        results = cascade_client.classify_emails(emails)
+
+        assert [r['category'] for r in results] == ['newsletter', 'urgent']
+        assert 'confidence' not in results[0]
+        models = [call[1]['model'] for call in cascade_client.generate_response.call_args_list]
+        assert models == ['qwen2.5:1.5b', 'llama3:8b']
+
+    def test_model_stats_report_split_and_latency_saved(self, cascade_client):
+        """Stats count kept and escalated answers and estimate the latency saved"""
+        for latency in (0.1, 0.1, 0.1, 0.1):
+            cascade_client._record_model('classification', 'qwen2.5:1.5b', latency)
+        cascade_client._record_model('classification', 'llama3:8b', 1.0)
+        cascade_client.routing_stats.update(classification_model=3, escalated=1)
+
+        stats = cascade_client.get_model_stats()
+
+        assert stats['cascade'] is True
+        assert stats['kept_by_classification_model'] == 3
+        assert stats['escalation_rate'] == 0.25
+        assert stats['models']['llama3:8b']['classification']['requests'] == 1
+        assert stats['estimated_latency_saved'] == pytest.approx(3 * 0.9 - 0.1)
+
+    def test_replies_use_generation_model(self, cascade_client):
+        """Reply generation always runs on ollama_model"""
+        cascade_client.generate_response.return_value = "Thanks, Michael"
+
+        cascade_client.generate_email_response(self.EMAIL, make_classification('work'))
+
+        assert cascade_client.generate_response.call_args[1]['model'] == 'llama3:8b'
+        assert cascade_client.get_model_stats()['models']['llama3:8b']['reply']['requests'] == 1
+
+    def test_cascade_is_off_without_a_separate_model(self):
+        """With a single model there is nothing to escalate to"""
+        from src.ollama_client import OllamaClient
+
+        client = OllamaClient()
+        assert client.classification_model == client.model
+        assert client.cascade is False
+
+
+class TestWarmUp:
+    """Test model preloading, keep_alive tuning and cold/warm latency stats"""
+
+    EMAIL = {'subject': 'Hi', 'sender': 'a@example.com', 'body': 'Body'}
+
+    def test_warm_up_preloads_each_model_once(self, cascade_client):
+        """Both the classification and generation models are loaded with an empty prompt"""
+        cascade_client.client = Mock()
+
+        timings = cascade_client.warm_up()
+
+        assert set(timings) == {'qwen2.5:1.5b', 'llama3:8b'}
+        loaded = [call[1] for call in cascade_client.client.generate.call_args_list]
+        assert [call['model'] for call in loaded] == ['qwen2.5:1.5b', 'llama3:8b']
+        assert all(call['prompt'] == '' and call['keep_alive'] == cascade_client.keep_alive
+                   for call in loaded)
+        assert set(cascade_client.get_model_stats()['warm_up']) == {'qwen2.5:1.5b', 'llama3:8b'}
+
+    def test_failed_warm_up_is_reported(self):
+        from src.ollama_client import OllamaClient
+
+        client = OllamaClient()
+        client.client = Mock()
+        client.client.generate.side_effect = ConnectionError("refused")
+
+        assert client.warm_up() == {client.model: None}
+
+    def test_cold_and_warm_latency_are_separate(self):
+        """Only the first request after start (or after keep_alive lapses) counts as cold"""
+        from src.ollama_client import OllamaClient
+
+        client = OllamaClient()
+        client.generate_response = Mock(return_value="Thanks, Michael")
+
+        client.generate_email_response(self.EMAIL, make_classification('work'))
+        client.generate_email_response(self.EMAIL, make_classification('work'))
+
+        reply = client.get_model_stats()['models'][client.model]['reply']
+        assert reply['requests'] == 2
+        assert reply['cold_requests'] == 1
+        assert reply['avg_cold_latency'] is not None
+        assert reply['avg_warm_latency'] is not None
+
+    def test_warmed_model_serves_warm_requests(self):
+        from src.ollama_client import OllamaClient
+
+        client = OllamaClient()
+        client.client = Mock()
+        client.warm_up()
+        client.generate_response = Mock(return_value="Thanks, Michael")
+
+        client.generate_email_response(self.EMAIL, make_classification('work'))
+
+        assert client.get_model_stats()['models'][client.model]['reply']['cold_requests'] == 0
+
+    def test_lapsed_keep_alive_counts_as_cold(self):
+        from src.ollama_client import OllamaClient
+
+        client = OllamaClient()
+        client.keep_alive = 0
+        client.generate_response = Mock(return_value="Thanks, Michael")
+
+        client.generate_email_response(self.EMAIL, make_classification('work'))
+        client.generate_email_response(self.EMAIL, make_classification('work'))
+
+        assert client.get_model_stats()['models'][client.model]['reply']['cold_requests'] == 2
+
+    def test_keep_alive_follows_polling_interval(self):
+        """Without an explicit setting, models stay loaded a little past the next poll"""
+        from config.settings import settings
+        from src.ollama_client import OllamaClient, KEEP_ALIVE_MARGIN_SECONDS
+
+        with patch.object(settings, 'check_interval_minutes', 10):
+            client = OllamaClient()
+
+        assert client.keep_alive == f"{600 + KEEP_ALIVE_MARGIN_SECONDS}s"
+
+    @pytest.mark.parametrize('keep_alive, seconds', [
+        ('30m', 1800), ('1h30m', 5400), ('420s', 420), ('500ms', 0.5), (300, 300), (0, 0),
+        (-1, None), ('-1m', None),
+    ])
+    def test_keep_alive_durations_are_parsed(self, keep_alive, seconds):
+        from src.ollama_client import keep_alive_seconds
+
+        assert keep_alive_seconds(keep_alive) == seconds
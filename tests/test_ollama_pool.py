@@ -0,0 +1,175 @@
+"""
+Tests for routing OllamaClient requests across several Ollama hosts
+"""
+
+import socket
+import threading
+import pytest
+from unittest.mock import patch
+
+from benchmarks.fake_ollama_server import FakeOllamaServer
+from src.ollama_health import OllamaHealth, OPEN
+from src.ollama_pool import OllamaHostPool
+
+
+FAST = dict(request_overhead=0.0, prompt_token_cost=0.0, output_token_cost=0.0)
+
+
+def dead_host():
+    """Address of a port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f'http://127.0.0.1:{port}'
+
+
+def make_pool(hosts, **kwargs):
+    return OllamaHostPool(hosts, health_factory=lambda: OllamaHealth(failure_threshold=2), **kwargs)
+
+
+def chat(client):
+    return client.chat(model='llama3:8b', messages=[{'role': 'user', 'content': 'Hello'}])
+
+
+class TestOllamaHostPool:
+    """Test host selection, health and per-host stats against fake Ollama servers"""
+
+    def test_least_outstanding_host_is_chosen(self):
+        """Concurrent requests spread over idle hosts before queueing on a busy one"""
+        with FakeOllamaServer(**FAST) as first, FakeOllamaServer(**FAST) as second:
+            pool = make_pool([first.host, second.host])
+
+            one = pool._acquire('llama3:8b', set())
+            two = pool._acquire('llama3:8b', set())
+
+            assert {one.host, two.host} == {first.host, second.host}
+
+    def test_requests_are_spread_across_hosts(self):
+        slow = dict(FAST, request_overhead=0.05)
+        with FakeOllamaServer(num_parallel=1, **slow) as first, FakeOllamaServer(num_parallel=1, **slow) as second:
+            pool = make_pool([first.host, second.host])
+
+            threads = [threading.Thread(target=pool.call, args=('llama3:8b', chat)) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert first.state.request_count >= 2
+            assert second.state.request_count >= 2
+            assert first.state.request_count + second.state.request_count == 6
+
+    def test_host_with_model_loaded_is_preferred(self):
+        """An idle host that would have to load the model loses to one that has it"""
+        with FakeOllamaServer(loaded_models=[], **FAST) as cold, FakeOllamaServer(**FAST) as warm:
+            pool = make_pool([cold.host, warm.host])
+
+            for _ in range(3):
+                pool.call('llama3:8b', chat)
+
+            assert warm.state.request_count == 3
+            assert cold.state.request_count == 0
+            assert cold.state.loads == 0
+
+    def test_unhealthy_host_fails_over_and_is_skipped(self):
+        """Connection errors move the request to another host and open that host's breaker"""
+        with FakeOllamaServer(**FAST) as live:
+            pool = make_pool([dead_host(), live.host])
+            pool.hosts[0].loaded_models = {'llama3:8b'}
+            pool.hosts[0].ps_checked_at = float('inf')
+
+            for _ in range(4):
+                response = pool.call('llama3:8b', chat)
+                assert response['message']['content']
+
+            stats = pool.stats()
+            dead = pool.hosts[0]
+            assert dead.health.state == OPEN
+            assert dead.requests == 2
+            assert stats['failovers'] == 2
+            assert live.state.request_count == 4
+
+    def test_all_hosts_down_raises(self):
+        pool = make_pool([dead_host(), dead_host()])
+
+        with pytest.raises(Exception):
+            pool.call('llama3:8b', chat)
+
+    def test_per_host_latency_is_recorded(self):
+        with FakeOllamaServer(**FAST) as first, FakeOllamaServer(**FAST) as second:
+            pool = make_pool([first.host, second.host])
+
+            pool.call('llama3:8b', chat)
+
+            hosts = pool.stats()['hosts']
+            served = [stats for stats in hosts.values() if stats['served']]
+            assert len(served) == 1
+            assert served[0]['avg_latency'] > 0
+            assert served[0]['loaded_models'] == ['llama3:8b']
+
+
+class TestOllamaClientHosts:
+    """Test OllamaClient with the ollama_hosts setting"""
+
+    def test_classification_is_routed_through_the_pool(self):
+        from config.settings import settings
+        from src.ollama_client import OllamaClient
+
+        with FakeOllamaServer(**FAST) as first, FakeOllamaServer(**FAST) as second, \
+             patch.object(settings, 'ollama_hosts', [first.host, second.host], create=True):
+            client = OllamaClient()
+            client.classification_cache = None
+
+            assert client.is_available() is True
+            result = client.classify_email({'subject': 'Hi', 'sender': 'a@example.com', 'body': 'Body'})
+            vectors = client.embed(['Hi there'], 'nomic-embed-text')
+
+            assert result['category'] == 'work'
+            assert len(vectors) == 1
+            assert first.state.request_count + second.state.request_count == 1
+            assert sum(host['served'] for host in client.get_host_stats()['hosts'].values()) == 2
+
+    def test_warm_up_loads_model_on_every_host(self):
+        from config.settings import settings
+        from src.ollama_client import OllamaClient
+
+        with FakeOllamaServer(loaded_models=[], **FAST) as first, \
+             FakeOllamaServer(loaded_models=[], **FAST) as second, \
+             patch.object(settings, 'ollama_hosts', [first.host, second.host], create=True):
+            client = OllamaClient()
+
+            client.warm_up()
+
+            assert first.state.loaded_models == second.state.loaded_models == {client.model}
+
+    def test_unreachable_host_does_not_stop_warm_up(self):
+        """Each host is warmed on its own and blocked hosts are skipped"""
+        from config.settings import settings
+        from src.ollama_client import OllamaClient
+
+        unreachable = dead_host()
+        with FakeOllamaServer(loaded_models=[], **FAST) as first, \
+             FakeOllamaServer(loaded_models=[], **FAST) as blocked, \
+             patch.object(settings, 'ollama_hosts', [unreachable, first.host, blocked.host], create=True):
+            client = OllamaClient()
+            breaker = client.pool.hosts[2].health
+            while breaker.state != OPEN:
+                breaker.record_failure()
+
+            timings = client.warm_up([client.model])
+
+            assert timings[client.model] is not None
+            assert first.state.loaded_models == {client.model}
+            assert blocked.state.loaded_models == set()
+            hosts = client.get_host_stats()['hosts']
+            assert hosts[unreachable]['warm_up'] == {'llama3:8b': None}
+            assert hosts[first.host]['warm_up']['llama3:8b'] is not None
+            assert hosts[blocked.host]['warm_up'] == {}
+
+    def test_single_host_uses_ollama_host(self):
+        from src.ollama_client import OllamaClient
+
+        client = OllamaClient()
+
+        assert client.pool is None
+        assert client.get_host_stats() is None
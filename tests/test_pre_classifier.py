@@ -0,0 +1,105 @@
+"""
+Tests for rule-based pre-classification of bulk mail
+"""
+
+import pytest
+
+from src.pre_classifier import PreClassifier
+
+
+@pytest.fixture
+def pre_classifier():
+    return PreClassifier()
+
+
+def make_email(sender='friend@example.com', headers=None, labels=None):
+    return {
+        'id': 'email_1',
+        'subject': 'Hello',
+        'sender': sender,
+        'body': '',
+        'headers': headers or {},
+        'labels': labels or []
+    }
+
+
+class TestPreClassifier:
+    """Test header and sender rules"""
+
+    @pytest.mark.parametrize('email, category', [
+        (make_email(headers={'list-unsubscribe': '<mailto:unsub@example.com>'}), 'newsletter'),
+        (make_email(headers={'list-id': '<dev.lists.example.com>'}), 'newsletter'),
+        (make_email(headers={'precedence': 'bulk'}), 'newsletter'),
+        (make_email(headers={'auto-submitted': 'auto-generated'}), 'newsletter'),
+        (make_email(sender='GitHub <noreply@github.com>'), 'newsletter'),
+        (make_email(sender='do-not-reply+billing@bank.example'), 'newsletter'),
+        (make_email(sender='Deals <offers@news.mcsv.net>'), 'promotional'),
+        (make_email(labels=['INBOX', 'CATEGORY_PROMOTIONS']), 'promotional'),
+    ])
+    def test_bulk_mail_is_classified(self, pre_classifier, email, category):
+        """Obvious bulk mail gets an ignore classification without the LLM"""
+        result = pre_classifier.classify(email)
+
+        assert result == {
+            "category": category,
+            "priority": "low",
+            "requires_response": False,
+            "sentiment": "neutral",
+            "action_needed": "ignore"
+        }
+
+    @pytest.mark.parametrize('email', [
+        make_email(),
+        make_email(sender='Colleague <replyto@company.com>'),
+        make_email(headers={'auto-submitted': 'no', 'precedence': 'first-class'}),
+        make_email(sender='Mail Delivery Subsystem <mailer-daemon@googlemail.com>'),
+        make_email(sender='bounces+123@mail.example.com'),
+        make_email(sender='notifications@github.com'),
+        {'subject': 'No headers at all', 'sender': 'test@example.com', 'body': ''},
+    ])
+    def test_ambiguous_mail_is_left_for_llm(self, pre_classifier, email):
+        """Mail without bulk signals falls through"""
+        assert pre_classifier.classify(email) is None
+
+    def test_automated_senders_are_opt_in(self):
+        """Configured local parts are handled like no-reply senders"""
+        pre_classifier = PreClassifier(automated_senders=['notifications', 'mailer-daemon'])
+
+        assert pre_classifier.classify(make_email(sender='notifications@github.com'))['category'] == 'newsletter'
+        assert pre_classifier.classify(make_email(sender='MAILER-DAEMON@example.com')) is not None
+        assert pre_classifier.classify(make_email(sender='bounces@example.com')) is None
+        assert pre_classifier.stats()['rule_hits'] == {'automated_sender': 2}
+
+    def test_stats_report_handled_fraction(self, pre_classifier):
+        """Stats show what fraction of mail the rules handled"""
+        pre_classifier.classify(make_email(headers={'precedence': 'list'}))
+        pre_classifier.classify(make_email())
+
+        stats = pre_classifier.stats()
+        assert stats['checked'] == 2
+        assert stats['handled_by_rules'] == 1
+        assert stats['handled_fraction'] == 0.5
+        assert stats['rule_hits'] == {'bulk_precedence': 1}
+
+
+class TestPreClassifierInProcessor:
+    """Test the pre-classification stage in EmailProcessor"""
+
+    def test_bulk_mail_skips_llm(self, mock_gmail_client, mock_ollama_client):
+        """Rule-matched mail is marked read without calling Ollama"""
+        from unittest.mock import Mock, patch
+        from src.email_processor import EmailProcessor
+
+        mock_gmail_client.get_unread_emails = Mock(return_value=[
+            make_email(sender='noreply@service.example')
+        ])
+
+        with patch('src.email_processor.GmailClient', return_value=mock_gmail_client), \
+             patch('src.email_processor.OllamaClient', return_value=mock_ollama_client):
+            processor = EmailProcessor()
+            result = processor.process_emails()
+
+        assert result['processed'] == 1
+        mock_ollama_client.classify_email.assert_not_called()
+        mock_gmail_client.service.users().messages().batchModify.assert_called()
+        assert processor.get_processing_stats()['pre_classifier']['handled_by_rules'] == 1
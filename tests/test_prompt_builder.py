@@ -0,0 +1,134 @@
+"""
+Tests for token-budgeted prompt construction
+"""
+
+from unittest.mock import Mock
+
+from src.prompt_builder import (
+    build_classification_prompt, build_reply_prompt, clean_body, estimate_tokens, fit_to_budget
+)
+
+THREAD = """Hi Michael,
+
+Can we   move the meeting to Thursday?
+
+
+
+Thanks,
+Anna
+--
+Anna Smith | Head of Operations
+Sent from my iPhone
+
+On Mon, 3 Mar 2025 at 09:00, Michael <michael@example.com> wrote:
+> Let's meet on Tuesday.
+>
+> On Fri, 28 Feb 2025, Anna <anna@example.com> wrote:
+>> When suits you?
+"""
+
+
+def make_email(body):
+    return {'id': 'email_1', 'subject': 'Meeting', 'sender': 'anna@example.com', 'body': body}
+
+
+class TestCleanBody:
+    """Test removal of quoted history, signatures and whitespace"""
+
+    def test_reply_chain_and_signature_are_stripped(self):
+        assert clean_body(THREAD) == 'Hi Michael,\n\nCan we move the meeting to Thursday?\n\nThanks,\nAnna'
+
+    def test_outlook_history_is_stripped(self):
+        body = ("Approved.\n\n-----Original Message-----\nFrom: Bob\nSent: Monday\n"
+                "Subject: Budget\n\nPlease approve the budget.")
+
+        assert clean_body(body) == 'Approved.'
+
+    def test_gmail_forward_keeps_forwarded_message(self):
+        body = ("FYI, can you handle this?\n\n---------- Forwarded message ---------\n"
+                "From: Billing <billing@vendor.example>\nDate: Mon, 3 Mar 2025 at 09:00\n"
+                "Subject: Invoice 42\nTo: anna@example.com\n\n"
+                "Invoice 42 for 300 EUR is due on 31 March.")
+
+        cleaned = clean_body(body)
+
+        assert cleaned.startswith('FYI, can you handle this?')
+        assert cleaned.endswith('Invoice 42 for 300 EUR is due on 31 March.')
+
+    def test_outlook_forward_keeps_forwarded_message(self):
+        body = ("Please see below.\n\nFrom: Bob <bob@example.com>\nSent: Monday, 3 March 2025 09:00\n"
+                "To: Anna\nSubject: Budget\n\nThe budget needs sign-off by Friday.")
+
+        assert clean_body(body).endswith('The budget needs sign-off by Friday.')
+
+    def test_forward_keeps_first_block_and_drops_older_history(self):
+        body = ("Please see below.\n\n________________________________\nFrom: Bob\nSent: Monday\n"
+                "Subject: Budget\n\nCan you sign this off?\n\n"
+                "On Fri, 28 Feb 2025, Carol <carol@example.com> wrote:\n> Draft attached.")
+
+        assert clean_body(body) == 'Please see below.'
+        cleaned = clean_body(body, forwarded=True)
+        assert cleaned.endswith('Can you sign this off?')
+        assert 'Draft attached' not in cleaned
+
+    def test_forwarded_subject_keeps_forwarded_block_in_prompt(self):
+        email = make_email("FYI\n\n________________________________\nFrom: Bob\nSent: Monday\n\n"
+                           "The server is down.")
+        email['subject'] = 'Fwd: Outage'
+
+        assert 'The server is down.' in build_classification_prompt(email)
+
+    def test_inline_quotes_are_removed(self):
+        body = "> Are you coming?\nYes, see you there.\n> And Bob?\nHe is too."
+
+        assert clean_body(body) == 'Yes, see you there.\nHe is too.'
+
+    def test_fully_quoted_body_is_kept(self):
+        assert clean_body("> only   quoted text") == '> only quoted text'
+
+
+class TestTokenBudget:
+    """Test fitting prompts to per-task token budgets"""
+
+    def test_text_is_cut_at_the_budget(self):
+        text = ' '.join(['word'] * 100)
+
+        fitted = fit_to_budget(text, 10)
+
+        assert fitted == ' '.join(['word'] * 10) + ' ...'
+        assert fit_to_budget(text, None) == text
+
+    def test_estimate_counts_words_and_punctuation(self):
+        assert estimate_tokens('Hello, world!') == 4
+        assert estimate_tokens('internationalisation') == 5
+
+    def test_prompts_stay_within_budget_for_long_threads(self):
+        body = ('New message text. ' * 400) + '\nOn Mon, Bob wrote:\n' + ('> old text\n' * 2000)
+
+        classification = build_classification_prompt(make_email(body), body_tokens=50)
+        reply = build_reply_prompt(make_email(body), {
+            'category': 'work', 'priority': 'medium', 'action_needed': 'reply'
+        }, body_tokens=200)
+
+        assert estimate_tokens(classification) < 70
+        assert estimate_tokens(reply) < 250
+        assert 'old text' not in reply
+
+    def test_prompt_tokens_are_recorded_per_email(self):
+        """OllamaClient logs prompt size and latency for every request"""
+        from src.ollama_client import OllamaClient
+
+        client = OllamaClient()
+        client.client = Mock()
+        client.generate_response = Mock(return_value='Thanks, Thursday works.')
+
+        classification = {'category': 'work', 'priority': 'medium', 'action_needed': 'reply'}
+
+        client.generate_email_response(make_email(THREAD), classification)
+
+        entry = client.prompt_log[-1]
+        assert entry['email_id'] == 'email_1'
+        assert entry['task'] == 'reply'
+        assert entry['prompt_tokens'] == estimate_tokens(build_reply_prompt(make_email(THREAD), classification))
+        assert entry['body_tokens'] == estimate_tokens(THREAD)
+        assert client.get_prompt_stats()['reply']['count'] == 1